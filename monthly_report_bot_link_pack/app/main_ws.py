@@ -16,7 +16,6 @@ from typing import Any, Dict, List, Optional
 from pathlib import Path
 
 import pytz
-import requests
 
 
 # 确保以脚本直接运行时也能找到项目根目录的模块
@@ -25,6 +24,8 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from app.ws_wrapper import create_ws_handler
 from card_design_ws_v1_1 import build_welcome_card, build_monthly_task_card, build_final_reminder_card, build_help_card
 from smart_interaction_ws_v1_1 import SmartInteractionEngine
+from tenant_token import get_tenant_token_provider, token_rejected
+import feishu_http
 
 logger = logging.getLogger(__name__)
 
@@ -119,9 +120,9 @@ class MonthlyReportBot:
             return []
     
     async def tenant_token(self) -> Optional[str]:
-        """获取租户令牌"""
+        """获取租户令牌（进程内共享缓存，临近过期时后台刷新）"""
         try:
-            return await self.handler._get_tenant_token()
+            return await get_tenant_token_provider(APP_ID, APP_SECRET).aget_token()
         except Exception as e:
             logger.error("获取租户令牌失败: %s", e)
             return None
@@ -134,10 +135,6 @@ class MonthlyReportBot:
                 return False
             
             url = "https://open.feishu.cn/open-apis/im/v1/messages?receive_id_type=chat_id"
-            headers = {
-                "Authorization": f"Bearer {token}",
-                "Content-Type": "application/json"
-            }
             
             # 确保卡片包含必要的 config 字段
             if isinstance(card, dict) and "config" not in card:
@@ -155,10 +152,23 @@ class MonthlyReportBot:
                 "content": json.dumps(card, ensure_ascii=False)
             }
             
-            response = requests.post(url, json=payload, headers=headers, timeout=30)
+            for attempt in range(2):
+                headers = {
+                    "Authorization": f"Bearer {token}",
+                    "Content-Type": "application/json"
+                }
+                response = await feishu_http.apost(url, json=payload, headers=headers, timeout=30)
+                # 令牌被吊销/失效：作废缓存后用新令牌重试一次
+                if attempt == 0 and token_rejected(response):
+                    get_tenant_token_provider(APP_ID, APP_SECRET).invalidate()
+                    token = await self.tenant_token()
+                    if not token:
+                        return False
+                    continue
+                break
             try:
                 response.raise_for_status()
-            except requests.exceptions.HTTPError as e:
+            except feishu_http.HTTPStatusError as e:
                 try:
                     err_text = response.text
                 except Exception:
@@ -174,10 +184,10 @@ class MonthlyReportBot:
                 logger.error("卡片发送失败: %s", data.get("msg", "未知错误"))
                 return False
                 
-        except requests.exceptions.Timeout:
+        except feishu_http.TimeoutException:
             logger.error("发送卡片超时")
             return False
-        except requests.exceptions.HTTPError as e:
+        except feishu_http.HTTPStatusError as e:
             logger.error("发送卡片HTTP错误: %s", e)
             return False
         except Exception as e:
@@ -9,6 +9,8 @@ import os
 import io
 import base64
 import logging
+import tempfile
+import threading
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
 import matplotlib.pyplot as plt
@@ -18,198 +20,177 @@ import numpy as np
 from collections import Counter
 import json
 
+from chart_image import (
+    DEFAULT_PROFILE, KIND_CHART, KIND_EMPTY, KIND_ERROR, ChartImage, encode_within_budget, get_render_profile,
+    save_chart_image,
+)
+from stats_archive import daily_progress_from_stats
+
 # 设置日志
 logger = logging.getLogger(__name__)
 
-# 设置中文字体 - 支持自定义字体文件
-def setup_chinese_fonts():
-    """配置中文字体 - 优先使用项目目录的自定义字体"""
-    print("DEBUG: setup_chinese_fonts() 被调用")  # 直接输出到 stdout
-    try:
-        print("DEBUG: 进入 try 块")
-        logger.info("===== 开始配置中文和 emoji 字体 =====")
+# ---------------------- 中文与 emoji 字体 ----------------------
+# 字体只在进程内解析一次；解析结果（中文/emoji 字体文件与名称）写入本地索引，
+# 以候选字体文件及字体目录的 mtime 作为有效性依据，之后的进程直接读取索引，
+# 每次生成图表前只需重新应用 rcParams（样式可能会覆盖字体设置）
+# 索引默认放在用户缓存目录（$XDG_CACHE_HOME 或 ~/.cache）下，不写入源码目录；可用 CHART_FONT_INDEX 指定
 
-        # 强制重建字体缓存（兼容不同版本的 matplotlib）
-        # 注意：这会重新加载 fontManager，所以必须在此之后再添加自定义字体
-        try:
-            fm._load_fontmanager(try_read_cache=False)
-            logger.info("字体缓存已重建")
-        except (TypeError, AttributeError) as e:
-            logger.info(f"跳过字体缓存重建: {e}")
+FONT_INDEX_FILE = os.environ.get("CHART_FONT_INDEX", "").strip() or os.path.join(
+    os.environ.get("XDG_CACHE_HOME", "").strip() or os.path.join(os.path.expanduser("~"), ".cache"),
+    "monthly_report_bot", "font_index.json",
+)
+_FONT_INDEX_VERSION = 1
+_CUSTOM_FONT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fonts')
+_CUSTOM_FONT_FILES = ('simhei.ttf', 'SimHei.ttf')
+_SYSTEM_FONT_DIR = '/usr/share/fonts'
+_SYMBOLA_PATH = '/usr/share/fonts/truetype/ancient-scripts/Symbola_hint.ttf'
+_FALLBACK_FONT_LIST = ['Noto Sans CJK SC', 'Noto Sans CJK TC', 'DejaVu Sans']
 
-        # 定义 Symbola 路径（后面会用到）
-        symbola_path = '/usr/share/fonts/truetype/ancient-scripts/Symbola_hint.ttf'
+_font_config: Optional[Dict[str, Any]] = None
+_font_lock = threading.Lock()
 
-        # 1. 首先检查项目目录的自定义字体（最高优先级）
-        custom_font_dir = os.path.join(os.path.dirname(__file__), 'fonts')
-        custom_fonts = {
-            'simhei': os.path.join(custom_font_dir, 'simhei.ttf'),
-            'SimHei': os.path.join(custom_font_dir, 'SimHei.ttf'),
-        }
 
-        # 收集所有需要的字体路径
-        font_list = []
-        emoji_font_paths = []
-
-        # 查找 emoji 字体（symbola_path 已在前面定义）
-        noto_emoji_path = '/usr/share/fonts/truetype/noto/NotoColorEmoji.ttf'
-
-        if os.path.exists(symbola_path):
-            emoji_font_paths.append(symbola_path)
-            logger.info(f"找到 Symbola 字体: {symbola_path}")
-        if os.path.exists(noto_emoji_path):
-            emoji_font_paths.append(noto_emoji_path)
-            logger.info(f"找到 Noto Color Emoji 字体: {noto_emoji_path}")
-
-        for font_name, font_path in custom_fonts.items():
-            if os.path.exists(font_path):
-                try:
-                    # 注册中文字体
-                    font_prop = fm.FontProperties(fname=font_path)
-                    chinese_font_name = font_prop.get_name()
-                    font_list = [chinese_font_name]  # 先添加中文字体
-
-                    # 注册 Symbola emoji 字体（作为第二顺位fallback）
-                    if os.path.exists(symbola_path):
-                        print(f"DEBUG: 找到 Symbola 字体: {symbola_path}")
-                        try:
-                            # 获取 Symbola 字体的真实名称
-                            symbola_prop = fm.FontProperties(fname=symbola_path)
-                            symbola_font_name = symbola_prop.get_name()
-                            print(f"DEBUG: Symbola 字体的真实名称: {symbola_font_name}")
-
-                            # 检查是否已经在 fontManager 中（避免重复添加）
-                            symbola_fonts_in_manager = [f.name for f in fm.fontManager.ttflist if symbola_font_name in f.name]
-                            if not symbola_fonts_in_manager:
-                                # 只有不存在时才添加
-                                fm.fontManager.addfont(symbola_path)
-                                print(f"DEBUG: ✅ Symbola 已添加到 fontManager")
-                            else:
-                                print(f"DEBUG: ✅ Symbola 已存在于 fontManager，跳过添加")
-
-                            # 验证字体
-                            symbola_fonts_in_manager = [f.name for f in fm.fontManager.ttflist if symbola_font_name in f.name]
-                            print(f"DEBUG: fontManager 中的 Symbola 字体数量: {len(symbola_fonts_in_manager)}")
-                            print(f"DEBUG: fontManager 字体总数: {len(fm.fontManager.ttflist)}")
-
-                            # 添加 Symbola 到字体列表（作为第二优先级）
-                            font_list.append(symbola_font_name)
-                            print(f"DEBUG: ✅ 成功加载 Symbola emoji 字体，名称: {symbola_font_name}")
-                            logger.info(f"✅ 成功加载 Symbola emoji 字体，名称: {symbola_font_name}")
-                        except Exception as e:
-                            print(f"DEBUG: ❌ 加载 Symbola 字体失败: {e}")
-                            logger.warning(f"加载 Symbola 字体失败: {e}")
-
-                    # 添加后备字体
-                    font_list.append('DejaVu Sans')
-
-                    # 配置所有字体族，确保 emoji 在任何情况下都能显示
-                    plt.rcParams['font.sans-serif'] = font_list
-                    plt.rcParams['font.serif'] = font_list
-                    plt.rcParams['font.monospace'] = font_list  # 关键：很多图表标签用 monospace
-                    plt.rcParams['font.family'] = 'sans-serif'
-                    plt.rcParams['axes.unicode_minus'] = False
-                    print(f"DEBUG: ✅ 使用自定义字体: {font_name} ({font_path})")
-                    print(f"DEBUG: ✅ 字体列表: {font_list}")
-                    print(f"DEBUG: ✅ 最终 rcParams['font.sans-serif']: {plt.rcParams['font.sans-serif']}")
-
-                    # 测试字体 fallback 是否工作（放在单独的 try-except 中，避免影响主流程）
-                    try:
-                        from matplotlib.font_manager import findfont, FontProperties
-                        # 不要使用 family='sans-serif'，因为这会触发 parse 错误
-                        # 直接测试查找 SimHei 和 Symbola
-                        simhei_font = findfont(FontProperties(fname=font_path))
-                        print(f"DEBUG: ✅ findfont(SimHei) 返回: {simhei_font}")
-
-                        symbola_font = findfont(FontProperties(fname=symbola_path))
-                        print(f"DEBUG: ✅ findfont(Symbola) 返回: {symbola_font}")
-                    except Exception as e:
-                        print(f"DEBUG: ⚠️  findfont() 测试失败: {e}")
-
-                    logger.info(f"✅ 使用自定义字体: {font_name} ({font_path})")
-                    logger.info(f"✅ 字体列表: {font_list}")
-                    return
-                except Exception as e:
-                    logger.warning(f"加载自定义字体失败: {font_path}, 错误: {e}")
-
-        # 2. 如果没有自定义字体，查找系统中文字体
-        font_paths = fm.findSystemFonts(fontpaths=['/usr/share/fonts'])
-
-        # 优先查找 SimHei（黑体）
-        simhei_fonts = [f for f in font_paths if 'simhei' in f.lower() or 'SimHei' in f]
+def _mtime_ns(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _font_index_key() -> Dict[str, Optional[int]]:
+    """索引有效性依据：候选字体文件与各级字体目录的 mtime（安装/删除字体后目录 mtime 会变化）"""
+    paths = [os.path.join(_CUSTOM_FONT_DIR, name) for name in _CUSTOM_FONT_FILES]
+    paths += [_CUSTOM_FONT_DIR, _SYMBOLA_PATH]
+    if os.path.isdir(_SYSTEM_FONT_DIR):
+        paths += [root for root, _, _ in os.walk(_SYSTEM_FONT_DIR)]
+    return {path: _mtime_ns(path) for path in paths}
+
+
+def _discover_fonts() -> Dict[str, Any]:
+    """扫描字体：项目目录自定义字体优先，其次系统中文字体；Symbola 作为 emoji 后备"""
+    chinese_font = None
+    for name in _CUSTOM_FONT_FILES:
+        path = os.path.join(_CUSTOM_FONT_DIR, name)
+        if os.path.exists(path):
+            chinese_font = path
+            logger.info(f"✅ 使用自定义字体: {path}")
+            break
+
+    if chinese_font is None:
+        font_paths = fm.findSystemFonts(fontpaths=[_SYSTEM_FONT_DIR])
+        # 优先查找 SimHei（黑体），其次思源黑体/宋体
+        simhei_fonts = [f for f in font_paths if 'simhei' in f.lower()]
         noto_sc_fonts = [f for f in font_paths if 'NotoSansCJK' in f and 'SC' in f]
         noto_serif_fonts = [f for f in font_paths if 'NotoSerifCJK' in f]
+        candidates = simhei_fonts or noto_sc_fonts or noto_serif_fonts
+        if candidates:
+            chinese_font = sorted(candidates)[0]
+            logger.info(f"使用系统字体: {chinese_font}")
+
+    if chinese_font is None:
+        logger.warning("⚠️ 未找到中文字体，中文可能显示为方框")
+        logger.warning(f"请上传字体文件到: {_CUSTOM_FONT_DIR}/simhei.ttf")
+        return {"font_list": list(_FALLBACK_FONT_LIST), "font_files": [], "all_families": False}
+
+    font_list = [fm.FontProperties(fname=chinese_font).get_name()]
+    font_files = [chinese_font]
+    if os.path.exists(_SYMBOLA_PATH):
+        try:
+            font_list.append(fm.FontProperties(fname=_SYMBOLA_PATH).get_name())
+            font_files.append(_SYMBOLA_PATH)
+        except Exception as e:
+            logger.warning(f"加载 Symbola 字体失败: {e}")
+    font_list.append('DejaVu Sans')
+    return {"font_list": font_list, "font_files": font_files, "all_families": True}
 
-        chinese_font = None
-        if simhei_fonts:
-            chinese_font = simhei_fonts[0]
-        elif noto_sc_fonts:
-            chinese_font = noto_sc_fonts[0]
-        elif noto_serif_fonts:
-            chinese_font = noto_serif_fonts[0]
-
-        if chinese_font:
-            font_prop = fm.FontProperties(fname=chinese_font)
-            font_name = font_prop.get_name()
-            font_list = [font_name]
-
-            # 添加 Symbola emoji 字体（优先使用，跳过Noto Color Emoji）
-            if os.path.exists(symbola_path):
-                try:
-                    # 获取 Symbola 字体的真实名称
-                    symbola_prop = fm.FontProperties(fname=symbola_path)
-                    symbola_font_name = symbola_prop.get_name()
-                    print(f"DEBUG: Symbola 字体的真实名称: {symbola_font_name}")
-
-                    # 检查是否已经在 fontManager 中（避免重复添加）
-                    symbola_fonts_in_manager = [f.name for f in fm.fontManager.ttflist if symbola_font_name in f.name]
-                    if not symbola_fonts_in_manager:
-                        fm.fontManager.addfont(symbola_path)
-                        print(f"DEBUG: ✅ Symbola 已添加到 fontManager")
-                    else:
-                        print(f"DEBUG: ✅ Symbola 已存在于 fontManager，跳过添加")
-
-                    # 使用真实名称添加到字体列表
-                    font_list.append(symbola_font_name)
-                    print(f"DEBUG: ✅ 成功加载 Symbola emoji 字体，名称: {symbola_font_name}")
-                    logger.info(f"✅ 成功加载 Symbola emoji 字体，名称: {symbola_font_name}")
-                except Exception as e:
-                    print(f"DEBUG: ❌ 加载 Symbola 字体失败: {e}")
-                    logger.warning(f"加载 Symbola 字体失败: {e}")
-
-            font_list.append('DejaVu Sans')
-
-            # 配置所有字体族，确保 emoji 在任何情况下都能显示
-            plt.rcParams['font.sans-serif'] = font_list
-            plt.rcParams['font.serif'] = font_list
-            plt.rcParams['font.monospace'] = font_list  # 关键：很多图表标签用 monospace
-            plt.rcParams['font.family'] = 'sans-serif'
-            logger.info(f"使用系统字体: {font_name} ({chinese_font})")
-            logger.info(f"✅ 字体列表: {font_list}")
-        else:
-            logger.warning("⚠️ 未找到中文字体，中文可能显示为方框")
-            logger.warning(f"请上传字体文件到: {custom_font_dir}/simhei.ttf")
-            plt.rcParams['font.sans-serif'] = ['Noto Sans CJK SC', 'Noto Sans CJK TC', 'DejaVu Sans']
-
-        plt.rcParams['axes.unicode_minus'] = False
-        logger.info("===== 字体配置完成 =====")
 
+def _load_font_index(key: Dict[str, Optional[int]]) -> Optional[Dict[str, Any]]:
+    try:
+        with open(FONT_INDEX_FILE, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get("version") != _FONT_INDEX_VERSION or index.get("key") != key:
+        return None
+    config = index.get("config") or {}
+    # 已解析的字体文件被替换（mtime 变化）同样视为失效
+    if any(_mtime_ns(path) != mtime for path, mtime in config.get("file_mtimes", {}).items()):
+        return None
+    return config
+
+
+def _save_font_index(key: Dict[str, Optional[int]], config: Dict[str, Any]) -> None:
+    try:
+        directory = os.path.dirname(os.path.abspath(FONT_INDEX_FILE))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".font_index_", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"version": _FONT_INDEX_VERSION, "key": key, "config": config}, f, ensure_ascii=False)
+        os.replace(tmp_path, FONT_INDEX_FILE)
+    except Exception as e:
+        logger.warning(f"写入字体索引失败: {e}")
+
+
+def _resolve_font_config(force_rescan: bool = False) -> Dict[str, Any]:
+    """读取字体索引；索引缺失或字体文件有变化时重新扫描并写回"""
+    key = _font_index_key()
+    if not force_rescan:
+        config = _load_font_index(key)
+        if config is not None:
+            logger.info(f"使用字体索引: {config['font_list']}")
+            return config
+    else:
+        # 强制重建 matplotlib 字体缓存（新装系统字体后使用）
+        try:
+            fm._load_fontmanager(try_read_cache=False)
+            logger.info("字体缓存已重建")
+        except (TypeError, AttributeError) as e:
+            logger.info(f"跳过字体缓存重建: {e}")
+    config = _discover_fonts()
+    config["file_mtimes"] = {path: _mtime_ns(path) for path in config["font_files"]}
+    _save_font_index(key, config)
+    logger.info(f"✅ 字体列表: {config['font_list']}")
+    return config
+
+
+def _register_fonts(font_files: List[str]) -> None:
+    """把字体文件加入 fontManager（已存在的跳过），rcParams 中按名称引用"""
+    known = {entry.fname for entry in fm.fontManager.ttflist}
+    for path in font_files:
+        if path not in known and os.path.exists(path):
+            fm.fontManager.addfont(path)
+
+
+def _apply_font_config(config: Dict[str, Any]) -> None:
+    plt.rcParams['font.sans-serif'] = list(config["font_list"])
+    if config.get("all_families"):
+        # 配置所有字体族，确保 emoji 在任何情况下都能显示（很多图表标签用 monospace）
+        plt.rcParams['font.serif'] = list(config["font_list"])
+        plt.rcParams['font.monospace'] = list(config["font_list"])
+        plt.rcParams['font.family'] = 'sans-serif'
+    plt.rcParams['axes.unicode_minus'] = False
+
+
+def setup_chinese_fonts(force_rescan: bool = False) -> None:
+    """配置中文和 emoji 字体：进程内首次调用时解析（优先读索引），之后只重新应用 rcParams"""
+    global _font_config
+    try:
+        with _font_lock:
+            if _font_config is None or force_rescan:
+                config = _resolve_font_config(force_rescan)
+                _register_fonts(config["font_files"])
+                _font_config = config
+        _apply_font_config(_font_config)
     except Exception as e:
-        print(f"DEBUG: ❌ 字体配置失败: {e}")
-        import traceback
-        traceback.print_exc()
         logger.error(f"❌ 字体配置失败: {e}", exc_info=True)
         plt.rcParams['font.sans-serif'] = ['DejaVu Sans']
         plt.rcParams['axes.unicode_minus'] = False
 
-# 执行字体配置
-setup_chinese_fonts()
-
-# 设置图表样式
+# 设置图表样式（样式会覆盖字体设置，因此先设置样式再配置字体）
 sns.set_style("whitegrid")
 plt.style.use('seaborn-v0_8')
 
-# 重新应用字体配置（样式可能会覆盖）
+# 执行字体配置
 setup_chinese_fonts()
 
 class ChartGenerator:
@@ -219,8 +200,8 @@ class ChartGenerator:
         # 立即配置字体（在任何图表生成之前）
         setup_chinese_fonts()
 
+        # 图表默认只在内存中生成，保存文件时才创建目录（见 save_image）
         self.chart_dir = "charts"
-        self.ensure_chart_dir()
 
         # 设置颜色主题
         self.colors = {
@@ -244,7 +225,7 @@ class ChartGenerator:
         if not os.path.exists(self.chart_dir):
             os.makedirs(self.chart_dir)
     
-    def generate_task_completion_pie_chart(self, stats: Dict[str, Any]) -> str:
+    def render_task_completion_pie_chart(self, stats: Dict[str, Any], profile: str = DEFAULT_PROFILE) -> ChartImage:
         """生成任务完成情况饼状图"""
         try:
             # 确保字体配置在每次生成图表前都被应用
@@ -256,7 +237,7 @@ class ChartGenerator:
             total = stats.get('total_tasks', 0)
             
             if total == 0:
-                return self._generate_empty_chart("暂无任务数据")
+                return self._render_empty_chart("暂无任务数据")
             
             # 创建图表
             fig, ax = plt.subplots(figsize=(10, 8))
@@ -304,21 +285,15 @@ class ChartGenerator:
             
             plt.tight_layout()
             
-            # 保存图表
-            filename = f"task_completion_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-            filepath = os.path.join(self.chart_dir, filename)
-            plt.savefig(filepath, dpi=300, bbox_inches='tight', 
-                       facecolor='white', edgecolor='none')
-            plt.close()
-            
-            logger.info(f"任务完成情况饼状图已生成: {filepath}")
-            return filepath
+            # 编码为 PNG（在内存中，不落盘）
+            return self._figure_image("task_completion", "任务完成情况饼状图", profile=profile,
+                                      facecolor='white', edgecolor='none')
             
         except Exception as e:
             logger.error(f"生成任务完成情况饼状图失败: {e}")
-            return self._generate_error_chart("图表生成失败")
+            return self._render_error_chart("图表生成失败")
     
-    def generate_user_participation_chart(self, stats: Dict[str, Any]) -> str:
+    def render_user_participation_chart(self, stats: Dict[str, Any], profile: str = DEFAULT_PROFILE) -> ChartImage:
         """生成用户参与度图表"""
         try:
             # 确保字体配置在每次生成图表前都被应用
@@ -341,7 +316,7 @@ class ChartGenerator:
                         user_stats[user_id]['completed'] += 1
             
             if not user_stats:
-                return self._generate_empty_chart("暂无用户参与数据")
+                return self._render_empty_chart("暂无用户参与数据")
             
             # 准备数据
             users = list(user_stats.keys())
@@ -398,62 +373,65 @@ class ChartGenerator:
             
             plt.tight_layout()
             
-            # 保存图表
-            filename = f"user_participation_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-            filepath = os.path.join(self.chart_dir, filename)
-            plt.savefig(filepath, dpi=300, bbox_inches='tight', 
-                       facecolor='white', edgecolor='none')
-            plt.close()
-            
-            logger.info(f"用户参与度图表已生成: {filepath}")
-            return filepath
+            # 编码为 PNG（在内存中，不落盘）
+            return self._figure_image("user_participation", "用户参与度图表", profile=profile,
+                                      facecolor='white', edgecolor='none')
             
         except Exception as e:
             logger.error(f"生成用户参与度图表失败: {e}")
-            return self._generate_error_chart("图表生成失败")
+            return self._render_error_chart("图表生成失败")
     
-    def generate_progress_trend_chart(self, stats: Dict[str, Any]) -> str:
-        """生成进度趋势图"""
+    def render_progress_trend_chart(self, stats: Dict[str, Any],
+                                    history: Optional[Dict[str, List[Tuple[int, float]]]] = None,
+                                    profile: str = DEFAULT_PROFILE) -> ChartImage:
+        """生成进度趋势图
+
+        Args:
+            stats: 当月统计（含 tasks，按各任务真实完成时间计算逐日进度）
+            history: 历史归档月份的逐日进度 {month: [(第几天, 完成率)]}，作为对比曲线
+        """
         try:
             # 确保字体配置在每次生成图表前都被应用
             setup_chinese_fonts()
 
-            # 模拟进度趋势数据（实际应用中可以从历史数据获取）
             current_rate = stats.get('completion_rate', 0)
             total_tasks = stats.get('total_tasks', 0)
             
             if total_tasks == 0:
-                return self._generate_empty_chart("暂无进度数据")
+                return self._render_empty_chart("暂无进度数据")
             
-            # 生成模拟的每日进度数据
-            days = 30  # 假设30天
-            daily_progress = []
-            target_progress = []
+            # 当月真实逐日进度；没有完成时间明细时只标注当前完成率
+            progress = daily_progress_from_stats(stats) if stats.get('tasks') else []
+            if not progress:
+                progress = [(datetime.now().day, current_rate)]
+            days = max([30, progress[-1][0]] + [p[-1][0] for p in (history or {}).values() if p])
             
-            for day in range(1, days + 1):
-                # 模拟实际进度（非线性增长）
-                actual_rate = min(current_rate * (day / days) ** 0.8, 100)
-                daily_progress.append(actual_rate)
-                
-                # 目标进度（线性增长）
-                target_rate = min(100 * day / days, 100)
-                target_progress.append(target_rate)
+            # 目标进度（线性增长）
+            target_progress = [min(100 * day / days, 100) for day in range(1, days + 1)]
             
             # 创建图表
             fig, ax = plt.subplots(figsize=(12, 6))
             
+            # 历史月份对比曲线
+            for i, (month, points) in enumerate(sorted((history or {}).items())):
+                if not points:
+                    continue
+                ax.plot([p[0] for p in points], [p[1] for p in points], label=month,
+                       color=self.pie_colors[i % len(self.pie_colors)], linewidth=1.5, alpha=0.6)
+            
             # 绘制趋势线
-            x = range(1, days + 1)
+            x = [p[0] for p in progress]
+            daily_progress = [p[1] for p in progress]
             ax.plot(x, daily_progress, label='实际进度', 
                    color=self.colors['primary'], linewidth=3, marker='o', markersize=4)
-            ax.plot(x, target_progress, label='目标进度', 
+            ax.plot(range(1, days + 1), target_progress, label='目标进度', 
                    color=self.colors['danger'], linewidth=2, linestyle='--', alpha=0.7)
             
             # 填充区域
             ax.fill_between(x, daily_progress, alpha=0.3, color=self.colors['primary'])
             
             # 添加当前进度标记
-            current_day = int(days * current_rate / 100) if current_rate > 0 else 1
+            current_day = x[-1]
             ax.axvline(x=current_day, color=self.colors['warning'], 
                       linestyle=':', linewidth=2, alpha=0.8)
             ax.text(current_day, current_rate + 5, f'当前: {current_rate}%', 
@@ -478,21 +456,71 @@ class ChartGenerator:
             
             plt.tight_layout()
             
-            # 保存图表
-            filename = f"progress_trend_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-            filepath = os.path.join(self.chart_dir, filename)
-            plt.savefig(filepath, dpi=300, bbox_inches='tight', 
-                       facecolor='white', edgecolor='none')
-            plt.close()
-            
-            logger.info(f"进度趋势图已生成: {filepath}")
-            return filepath
+            # 编码为 PNG（在内存中，不落盘）
+            return self._figure_image("progress_trend", "进度趋势图", profile=profile,
+                                      facecolor='white', edgecolor='none')
             
         except Exception as e:
             logger.error(f"生成进度趋势图失败: {e}")
-            return self._generate_error_chart("图表生成失败")
-    
-    def generate_comprehensive_dashboard(self, stats: Dict[str, Any]) -> str:
+            return self._render_error_chart("图表生成失败")
+
+    def render_monthly_history_chart(self, monthly: List[Dict[str, Any]],
+                                     ranking: List[Tuple[str, int, float]],
+                                     profile: str = DEFAULT_PROFILE) -> ChartImage:
+        """生成多月历史趋势图
+
+        Args:
+            monthly: 按月完成率 [{"month", "total", "completed", "completion_rate"}]（升序）
+            ranking: 区间内负责人排行 [(显示名, 完成数, 完成率)]（已排序）
+        """
+        try:
+            setup_chinese_fonts()
+
+            if not monthly:
+                return self._render_empty_chart("暂无历史数据")
+
+            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6), gridspec_kw={'width_ratios': [3, 2]})
+
+            # 左：按月完成率
+            months = [row['month'] for row in monthly]
+            rates = [row['completion_rate'] for row in monthly]
+            bars = ax1.bar(months, rates, color=self.colors['primary'], alpha=0.8)
+            ax1.plot(months, rates, color=self.colors['warning'], linewidth=2, marker='o')
+            for bar, row in zip(bars, monthly):
+                ax1.text(bar.get_x() + bar.get_width() / 2, bar.get_height() + 2,
+                        f"{row['completion_rate']}%\n({row['completed']}/{row['total']})",
+                        ha='center', va='bottom', fontsize=9)
+            ax1.set_ylim(0, 120)
+            ax1.set_ylabel('完成率 (%)', fontsize=12, fontweight='bold')
+            ax1.set_title('月度完成率趋势', fontsize=14, fontweight='bold')
+            ax1.grid(True, axis='y', alpha=0.3)
+            ax1.tick_params(axis='x', rotation=30)
+
+            # 右：负责人排行
+            top = ranking[:10]
+            if top:
+                names = [item[0] for item in reversed(top)]
+                counts = [item[1] for item in reversed(top)]
+                bars = ax2.barh(names, counts, color=self.colors['success'], alpha=0.8)
+                for bar, item in zip(bars, reversed(top)):
+                    ax2.text(bar.get_width() + 0.1, bar.get_y() + bar.get_height() / 2,
+                            f"{item[1]} ({item[2]}%)", va='center', fontsize=9)
+            else:
+                ax2.text(0.5, 0.5, '暂无完成记录', ha='center', va='center', transform=ax2.transAxes)
+            ax2.set_xlabel('完成任务数', fontsize=12, fontweight='bold')
+            ax2.set_title('多月完成排行 TOP 10', fontsize=14, fontweight='bold')
+            ax2.grid(True, axis='x', alpha=0.3)
+
+            plt.tight_layout()
+
+            return self._figure_image("monthly_history", "历史趋势图", profile=profile,
+                                      facecolor='white', edgecolor='none')
+
+        except Exception as e:
+            logger.error(f"生成历史趋势图失败: {e}")
+            return self._render_error_chart("图表生成失败")
+
+    def render_comprehensive_dashboard(self, stats: Dict[str, Any], profile: str = DEFAULT_PROFILE) -> ChartImage:
         """生成美化版综合仪表板"""
         try:
             # 确保字体配置在每次生成图表前都被应用
@@ -750,21 +778,15 @@ class ChartGenerator:
             if max(values) > 0:
                 ax5.set_ylim(0, max(values) * 1.2)
 
-            # 保存图表
-            filename = f"dashboard_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-            filepath = os.path.join(self.chart_dir, filename)
-            plt.savefig(filepath, dpi=300, bbox_inches='tight',
-                       facecolor='#F8F9FA', edgecolor='none')
-            plt.close()
-
-            logger.info(f"美化版综合仪表板已生成: {filepath}")
-            return filepath
+            # 编码为 PNG（在内存中，不落盘）
+            return self._figure_image("dashboard", "美化版综合仪表板", profile=profile,
+                                      facecolor='#F8F9FA', edgecolor='none')
 
         except Exception as e:
             logger.error(f"生成综合仪表板失败: {e}")
-            return self._generate_error_chart("仪表板生成失败")
+            return self._render_error_chart("仪表板生成失败")
     
-    def _generate_empty_chart(self, message: str) -> str:
+    def _render_empty_chart(self, message: str) -> Optional[ChartImage]:
         """生成空数据图表"""
         try:
             fig, ax = plt.subplots(figsize=(8, 6))
@@ -775,17 +797,12 @@ class ChartGenerator:
             ax.set_ylim(0, 1)
             ax.axis('off')
             
-            filename = f"empty_chart_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-            filepath = os.path.join(self.chart_dir, filename)
-            plt.savefig(filepath, dpi=300, bbox_inches='tight')
-            plt.close()
-            
-            return filepath
+            return self._figure_image("empty_chart", "占位图", kind=KIND_EMPTY)
         except Exception as e:
             logger.error(f"生成空数据图表失败: {e}")
-            return ""
+            return None
     
-    def _generate_error_chart(self, message: str) -> str:
+    def _render_error_chart(self, message: str) -> Optional[ChartImage]:
         """生成错误图表"""
         try:
             fig, ax = plt.subplots(figsize=(8, 6))
@@ -796,22 +813,69 @@ class ChartGenerator:
             ax.set_ylim(0, 1)
             ax.axis('off')
             
-            filename = f"error_chart_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-            filepath = os.path.join(self.chart_dir, filename)
-            plt.savefig(filepath, dpi=300, bbox_inches='tight')
-            plt.close()
-            
-            return filepath
+            return self._figure_image("error_chart", "占位图", kind=KIND_ERROR)
         except Exception as e:
             logger.error(f"生成错误图表失败: {e}")
-            return ""
+            return None
     
+    def _figure_image(self, prefix: str, label: str, kind: str = KIND_CHART, profile: str = DEFAULT_PROFILE,
+                      **savefig_kwargs: Any) -> ChartImage:
+        """按渲染配置把当前图形编码为 PNG 写入内存（不落盘）并关闭图形"""
+        render_profile = get_render_profile(profile)
+        fig = plt.gcf()
+
+        def encode(dpi: float) -> bytes:
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight', **savefig_kwargs)
+            return buffer.getvalue()
+
+        try:
+            data, dpi = encode_within_budget(encode, render_profile, fig.get_size_inches()[0])
+        finally:
+            plt.close(fig)
+        filename = f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+        image = ChartImage(filename, data, kind)
+        logger.info(f"{label}已生成: {filename}（{render_profile.name}，{dpi:.0f} DPI，{len(image)} 字节）")
+        return image
+
+    def save_image(self, image: Optional[ChartImage]) -> str:
+        """把渲染结果写入图表目录，返回文件路径（失败时返回空字符串）"""
+        if image is None:
+            return ""
+        path = save_chart_image(image, self.chart_dir)
+        if path:
+            logger.info(f"图表已保存: {path}")
+        return path
+
+    # 兼容接口：渲染并写入图表目录，返回文件路径
+
+    def generate_task_completion_pie_chart(self, stats: Dict[str, Any], profile: str = DEFAULT_PROFILE) -> str:
+        return self.save_image(self.render_task_completion_pie_chart(stats, profile))
+
+    def generate_user_participation_chart(self, stats: Dict[str, Any], profile: str = DEFAULT_PROFILE) -> str:
+        return self.save_image(self.render_user_participation_chart(stats, profile))
+
+    def generate_progress_trend_chart(self, stats: Dict[str, Any],
+                                      history: Optional[Dict[str, List[Tuple[int, float]]]] = None,
+                                      profile: str = DEFAULT_PROFILE) -> str:
+        return self.save_image(self.render_progress_trend_chart(stats, history, profile))
+
+    def generate_monthly_history_chart(self, monthly: List[Dict[str, Any]],
+                                       ranking: List[Tuple[str, int, float]],
+                                       profile: str = DEFAULT_PROFILE) -> str:
+        return self.save_image(self.render_monthly_history_chart(monthly, ranking, profile))
+
+    def generate_comprehensive_dashboard(self, stats: Dict[str, Any], profile: str = DEFAULT_PROFILE) -> str:
+        return self.save_image(self.render_comprehensive_dashboard(stats, profile))
+
     def cleanup_old_charts(self, max_age_hours: int = 24):
         """清理旧图表文件"""
         try:
             current_time = datetime.now()
             max_age = timedelta(hours=max_age_hours)
-            
+            if not os.path.isdir(self.chart_dir):
+                return
+
             for filename in os.listdir(self.chart_dir):
                 if filename.endswith('.png'):
                     filepath = os.path.join(self.chart_dir, filename)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内存中的图表图片
+
+渲染结果直接保存在内存中（savefig 写入 BytesIO），上传时原样交给 CreateImageRequest，
+不再经过 "写入 charts/ -> 检查路径 -> 读回内存" 的磁盘往返。
+落盘是可选的，由调用方在后台执行（见 save_chart_image）。
+
+渲染配置（RenderProfile）决定 DPI 与最大像素宽度，并给出字节预算：
+编码结果超出预算时按比例降低 DPI 重新编码，直到满足预算或降到最低 DPI（见 encode_within_budget）。
+- card：卡片预览（默认），飞书卡片中显示，宽度不超过 1800 像素，约 1 MB 以内
+- full：全尺寸查看，宽度不超过 4000 像素，4 MB 以内
+- print：打印，300 DPI，不超过飞书图片上传上限 10 MB
+
+本模块只依赖标准库，机器人进程与渲染进程都可以导入（图片对象可 pickle 跨进程传递）。
+"""
+
+from __future__ import annotations
+import logging
+import math
+import os
+import tempfile
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+KIND_CHART = "chart"
+KIND_EMPTY = "empty"
+KIND_ERROR = "error"
+
+PROFILE_CARD = "card"
+PROFILE_FULL = "full"
+PROFILE_PRINT = "print"
+DEFAULT_PROFILE = PROFILE_CARD
+
+
+class RenderProfile:
+    """图表渲染配置：DPI、最大像素宽度与字节预算"""
+
+    __slots__ = ("name", "dpi", "max_width_px", "max_bytes", "min_dpi")
+
+    def __init__(self, name: str, dpi: float, max_width_px: Optional[int], max_bytes: int, min_dpi: float = 50):
+        """
+        Args:
+            name: 配置名（同时是渲染缓存键的一部分）
+            dpi: 目标 DPI
+            max_width_px: 最大像素宽度，图形较宽时相应降低 DPI；None 表示不限制
+            max_bytes: PNG 字节预算
+            min_dpi: 为满足字节预算降低 DPI 时的下限
+        """
+        self.name = name
+        self.dpi = dpi
+        self.max_width_px = max_width_px
+        self.max_bytes = max_bytes
+        self.min_dpi = min_dpi
+
+    def initial_dpi(self, width_inches: float) -> float:
+        """目标 DPI，图形宽度乘以 DPI 超出最大像素宽度时取较小值"""
+        if self.max_width_px and width_inches > 0:
+            return max(self.min_dpi, min(self.dpi, self.max_width_px / width_inches))
+        return self.dpi
+
+    def __repr__(self) -> str:
+        return (f"RenderProfile({self.name!r}, dpi={self.dpi}, max_width_px={self.max_width_px}, "
+                f"max_bytes={self.max_bytes})")
+
+
+RENDER_PROFILES: Dict[str, RenderProfile] = {
+    PROFILE_CARD: RenderProfile(PROFILE_CARD, dpi=120, max_width_px=1800, max_bytes=1024 * 1024),
+    PROFILE_FULL: RenderProfile(PROFILE_FULL, dpi=200, max_width_px=4000, max_bytes=4 * 1024 * 1024),
+    PROFILE_PRINT: RenderProfile(PROFILE_PRINT, dpi=300, max_width_px=None, max_bytes=10 * 1024 * 1024,
+                                 min_dpi=150),
+}
+
+
+def get_render_profile(name: Optional[str]) -> RenderProfile:
+    """按名称取渲染配置；未知名称回退到卡片预览"""
+    profile = RENDER_PROFILES.get(name or DEFAULT_PROFILE)
+    if profile is None:
+        logger.warning("未知的图表渲染配置 %s，使用 %s", name, DEFAULT_PROFILE)
+        profile = RENDER_PROFILES[DEFAULT_PROFILE]
+    return profile
+
+
+def encode_within_budget(encode: Callable[[float], bytes], profile: RenderProfile,
+                         width_inches: float) -> Tuple[bytes, float]:
+    """按配置编码图片，超出字节预算时逐步降低 DPI 重新编码，返回 (PNG 字节, 实际 DPI)
+
+    PNG 大小大致与像素数（DPI 的平方）成正比：按超出比例估算下一次的 DPI，每次至少降低 10%。
+    降到最低 DPI 仍超出预算时返回最后一次结果。
+    """
+    dpi = profile.initial_dpi(width_inches)
+    while True:
+        data = encode(dpi)
+        if len(data) <= profile.max_bytes or dpi <= profile.min_dpi:
+            break
+        estimate = dpi * math.sqrt(profile.max_bytes / len(data)) * 0.95
+        dpi = max(profile.min_dpi, min(dpi * 0.9, estimate))
+        logger.info("图片 %d 字节超出 %s 配置预算 %d，降低 DPI 至 %.0f 重新编码",
+                    len(data), profile.name, profile.max_bytes, dpi)
+    if len(data) > profile.max_bytes:
+        logger.warning("图片在最低 DPI 下仍超出 %s 配置预算: %d 字节", profile.name, len(data))
+    return data, dpi
+
+
+class ChartImage:
+    """一张已编码的 PNG 图表"""
+
+    __slots__ = ("filename", "data", "kind")
+
+    def __init__(self, filename: str, data: bytes, kind: str = KIND_CHART):
+        """
+        Args:
+            filename: 建议的文件名（上传时作为文件名，落盘时使用）
+            data: PNG 字节
+            kind: chart 为正常图表；empty/error 为无数据或生成失败时的占位图
+        """
+        self.filename = filename
+        self.data = data
+        self.kind = kind
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __repr__(self) -> str:
+        return f"ChartImage({self.filename!r}, {len(self.data)} bytes, kind={self.kind!r})"
+
+
+def save_chart_image(image: ChartImage, directory: str) -> str:
+    """把图片写入目录（先写临时文件再原子替换），返回文件路径；失败时返回空字符串"""
+    try:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, image.filename)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".chart_", suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(image.data)
+        os.replace(tmp_path, path)
+        return path
+    except OSError as e:
+        logger.error("保存图表文件失败: %s %s", image.filename, e)
+        return ""
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图表渲染服务（独立进程池）
+
+matplotlib 渲染大尺寸仪表板是 CPU 密集的同步操作，放在事件循环中会冻结长连接事件与定时节拍。
+这里把渲染交给一个小的进程池，事件循环只等待结果：
+- 并发上限：同时渲染的图表数不超过工作进程数，多余请求排队等待
+- 超时：单次渲染超时后终止整个进程池（无法单独取消进程中的任务），下次使用时重建
+- 内存上限：工作进程启动时设置 RLIMIT_AS，超出时该次渲染以 MemoryError 失败，不影响机器人进程
+- 工作进程处理一定数量的任务后自动替换，避免 matplotlib 长期运行的内存增长
+- 使用 spawn 启动方式：机器人进程有多个线程，fork 可能继承被占用的锁
+- 工作进程不导入机器人脚本：spawn 子进程默认按父进程 __main__ 的路径重新执行主模块
+  （横幅、日志文件、飞书 SDK 等模块级初始化），这里启动进程时把 __main__ 换成空模块，
+  子进程只加载本模块与图表库
+
+工作进程中调用 chart_generator.chart_generator 的同名方法，参数与返回值须可序列化（pickle）；
+render_* 方法返回内存中的 PNG（ChartImage），图片字节经进程间管道直接传回，不经过磁盘。
+"""
+
+from __future__ import annotations
+import asyncio
+import importlib.util
+import logging
+import contextlib
+import os
+import sys
+import threading
+import time
+import types
+from multiprocessing import context as mp_context
+from typing import Any, Callable, Dict, Iterator, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 2
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_MEMORY_LIMIT_MB = 2048
+DEFAULT_TASKS_PER_WORKER = 50
+CHART_DEPENDENCIES = ("matplotlib", "seaborn", "numpy")
+
+
+def chart_dependencies_available() -> bool:
+    """图表依赖是否已安装（只查找模块，不导入）"""
+    return all(importlib.util.find_spec(name) is not None for name in CHART_DEPENDENCIES)
+
+
+def _init_worker(memory_limit_mb: int) -> None:
+    """工作进程初始化：限制内存，预先加载图表库与字体配置"""
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    # 单线程 BLAS：避免每个线程预留的缓冲区占满地址空间上限
+    os.environ.setdefault("OPENBLAS_NUM_THREADS", "1")
+    if memory_limit_mb > 0:
+        try:
+            import resource
+            limit = memory_limit_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError) as e:
+            logger.warning("无法设置渲染进程内存上限: %s", e)
+    try:
+        import chart_generator  # noqa: F401
+    except Exception as e:
+        logger.error("渲染进程加载图表库失败: %s", e)
+
+
+def render_chart(method: str, args: Tuple[Any, ...]) -> Any:
+    """在工作进程中执行 chart_generator.<method>(*args)"""
+    from chart_generator import chart_generator
+    return getattr(chart_generator, method)(*args)
+
+
+def _warm_up() -> int:
+    return os.getpid()
+
+
+# 启动工作进程期间替代 __main__ 的空模块（没有 __file__/__spec__，子进程不会重新导入主模块）
+_WORKER_MAIN = types.ModuleType("__main__")
+_main_swap_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _without_main_module() -> Iterator[None]:
+    """进程启动参数（spawn.get_preparation_data）按 sys.modules["__main__"] 生成，期间临时换成空模块"""
+    with _main_swap_lock:
+        main_module = sys.modules["__main__"]
+        sys.modules["__main__"] = _WORKER_MAIN
+        try:
+            yield
+        finally:
+            sys.modules["__main__"] = main_module
+
+
+class _WorkerProcess(mp_context.SpawnProcess):
+    """渲染工作进程：启动时不把父进程的主模块带入子进程
+
+    进程池按任务数替换工作进程时在其内部线程中启动新进程，同样经过这里。
+    """
+
+    @staticmethod
+    def _Popen(process_obj: Any) -> Any:
+        with _without_main_module():
+            return mp_context.SpawnProcess._Popen(process_obj)
+
+
+class _WorkerContext(mp_context.SpawnContext):
+    Process = _WorkerProcess
+
+
+class ChartRenderService:
+    """进程池渲染服务（在事件循环中使用）"""
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, timeout: float = DEFAULT_TIMEOUT,
+                 memory_limit_mb: int = DEFAULT_MEMORY_LIMIT_MB,
+                 tasks_per_worker: int = DEFAULT_TASKS_PER_WORKER,
+                 renderer: Callable[[str, Tuple[Any, ...]], Any] = render_chart):
+        """
+        Args:
+            workers: 工作进程数，同时也是并发渲染上限
+            timeout: 单次渲染超时（秒），不含排队等待并发名额与启动进程的时间
+            memory_limit_mb: 每个工作进程的地址空间上限（MB），0 表示不限制
+            tasks_per_worker: 工作进程处理该数量的任务后替换
+            renderer: 工作进程中执行的函数（须为可导入模块中的模块级函数，不能定义在 __main__ 中）
+        """
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.tasks_per_worker = tasks_per_worker
+        self.renderer = renderer
+        self.stats = {"rendered": 0, "failed": 0, "timeouts": 0, "restarts": 0}
+        self._pool: Any = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._pending: Set["asyncio.Future[Any]"] = set()
+
+    def _ensure_pool(self) -> Any:
+        if self._pool is None:
+            self._pool = _WorkerContext().Pool(
+                self.workers, initializer=_init_worker, initargs=(self.memory_limit_mb,),
+                maxtasksperchild=self.tasks_per_worker,
+            )
+            logger.info("图表渲染进程池已启动: %d 个进程", self.workers)
+        return self._pool
+
+    def _terminate_pool(self) -> None:
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+            self.stats["restarts"] += 1
+        # 被终止的进程不会再回调：同批其他渲染立即失败，不必各自等到超时
+        for future in list(self._pending):
+            if not future.done():
+                future.set_exception(RuntimeError("渲染进程池已重启"))
+
+    async def _submit(self, func: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future: "asyncio.Future[Any]" = loop.create_future()
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+
+        def _resolve(setter: Callable[[Any], None], value: Any) -> None:
+            if not future.done():
+                setter(value)
+
+        self._ensure_pool().apply_async(
+            func, args,
+            callback=lambda result: loop.call_soon_threadsafe(_resolve, future.set_result, result),
+            error_callback=lambda exc: loop.call_soon_threadsafe(_resolve, future.set_exception, exc),
+        )
+        return await future
+
+    async def start(self) -> None:
+        """预热：启动全部工作进程并加载图表库（不阻塞事件循环）"""
+        started = time.perf_counter()
+        await asyncio.gather(*(self._submit(_warm_up) for _ in range(self.workers)))
+        logger.info("图表渲染进程预热完成，耗时 %.2f 秒", time.perf_counter() - started)
+
+    async def render(self, method: str, *args: Any) -> Any:
+        """在进程池中渲染；失败或超时返回 None"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.workers)
+        async with self._semaphore:
+            if self._pool is None:
+                # 首次使用或超时重启后先启动进程并加载图表库，启动耗时不计入渲染超时
+                try:
+                    await self.start()
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    logger.error("图表渲染进程启动失败: %s", e)
+                    return None
+            started = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(self._submit(self.renderer, method, args), self.timeout)
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                # 进程池中的任务无法单独取消：终止全部工作进程，下次渲染时重建
+                self._terminate_pool()
+                logger.error("图表渲染超时（%.0f 秒），已重启渲染进程池: %s", self.timeout, method)
+                return None
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error("图表渲染失败: %s %s", method, e)
+                return None
+            self.stats["rendered"] += 1
+            logger.info("图表渲染完成: %s，耗时 %.2f 秒", method, time.perf_counter() - started)
+            return result
+
+    def close(self) -> None:
+        """关闭进程池（退出时调用，不等待进行中的渲染）"""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+
+    def metrics(self) -> Dict[str, Any]:
+        return dict(self.stats)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+飞书 REST 调用的共享 HTTP 客户端（连接池）
+
+直接调用 open.feishu.cn 的代码路径（GitHub Actions、HTTP 回调、app/main_ws、租户令牌）共用：
+- 同步 httpx.Client（线程安全）与异步 httpx.AsyncClient，keep-alive 复用 TCP+TLS 连接
+- 每个请求可单独指定超时，缺省连接 5 秒、整体 30 秒
+- FEISHU_HTTP2=true 且安装了 h2 时启用 HTTP/2，否则使用 HTTP/1.1
+- async 代码使用 apost()，不再在事件循环中调用阻塞的 requests.post
+
+响应对象与 requests 用法一致：status_code / json() / text / raise_for_status()。
+"""
+
+from __future__ import annotations
+import asyncio
+import atexit
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+POOL_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0)
+
+# 供调用方捕获的异常类型（避免调用方直接依赖 httpx）
+HTTPError = httpx.HTTPError
+HTTPStatusError = httpx.HTTPStatusError
+TimeoutException = httpx.TimeoutException
+
+_client: Optional[httpx.Client] = None
+_async_client: Optional[httpx.AsyncClient] = None
+_async_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock = threading.Lock()
+
+
+def http2_enabled() -> bool:
+    """FEISHU_HTTP2=true 且 h2 可用时启用 HTTP/2（可选依赖）"""
+    if os.environ.get("FEISHU_HTTP2", "false").lower() != "true":
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("FEISHU_HTTP2 已开启但未安装 h2（pip install httpx[http2]），使用 HTTP/1.1")
+        return False
+    return True
+
+
+def _timeout(timeout: Optional[float]) -> httpx.Timeout:
+    return DEFAULT_TIMEOUT if timeout is None else httpx.Timeout(timeout, connect=min(timeout, 5.0))
+
+
+def get_client() -> httpx.Client:
+    """进程内共享的同步客户端"""
+    global _client
+    with _lock:
+        if _client is None or _client.is_closed:
+            _client = httpx.Client(http2=http2_enabled(), limits=POOL_LIMITS, timeout=DEFAULT_TIMEOUT)
+        return _client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """当前事件循环共享的异步客户端（事件循环更换时重建，连接不能跨循环复用）"""
+    global _async_client, _async_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client.is_closed or _async_loop is not loop:
+        _async_client = httpx.AsyncClient(http2=http2_enabled(), limits=POOL_LIMITS, timeout=DEFAULT_TIMEOUT)
+        _async_loop = loop
+    return _async_client
+
+
+def post(url: str, json: Any = None, headers: Optional[Dict[str, str]] = None,
+         params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> httpx.Response:
+    """同步 POST（复用连接）"""
+    return get_client().post(url, json=json, headers=headers, params=params, timeout=_timeout(timeout))
+
+
+def get(url: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None) -> httpx.Response:
+    """同步 GET（复用连接）"""
+    return get_client().get(url, params=params, headers=headers, timeout=_timeout(timeout))
+
+
+async def apost(url: str, json: Any = None, headers: Optional[Dict[str, str]] = None,
+                params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> httpx.Response:
+    """异步 POST（复用连接，不阻塞事件循环）"""
+    return await get_async_client().post(url, json=json, headers=headers, params=params,
+                                         timeout=_timeout(timeout))
+
+
+async def aclose() -> None:
+    """关闭异步客户端（程序退出前调用）"""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+def close() -> None:
+    global _client
+    with _lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+atexit.register(close)
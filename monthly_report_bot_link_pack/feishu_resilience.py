@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+飞书调用容错：重试、抖动退避与熔断
+
+- RetryPolicy：指数退避 + 全抖动（full jitter），避免故障恢复时所有请求同时重试
+- 幂等判断：读取与 PATCH 可安全重试；创建/回复消息仅在带 uuid / client_token 时重试，
+  否则超时后重发可能造成重复消息或重复任务
+- CircuitBreaker：每个接口族一个熔断器，连续失败达到阈值后在冷却期内直接失败，
+  冷却后放行一个探测请求（半开），成功即恢复
+- 只有网络异常与 5xx 计为接口故障；业务错误码（参数错误、无权限等）不触发重试与熔断
+"""
+
+from __future__ import annotations
+import logging
+import random
+import time
+import uuid
+from typing import Any, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+_IDEMPOTENT_METHODS = {"aget", "alist", "atasks", "apatch"}
+_IDEMPOTENCY_FIELDS = ("uuid", "client_token")
+
+
+class CircuitOpenError(Exception):
+    """熔断期间拒绝调用"""
+
+    def __init__(self, family: str, retry_in: float):
+        super().__init__(f"飞书接口熔断中: {family}，{retry_in:.0f} 秒后重试")
+        self.family = family
+        self.retry_in = retry_in
+
+
+def backoff_delay(attempt: int, base: float, cap: float, rand: Callable[[], float] = random.random) -> float:
+    """第 attempt 次重试（从 1 开始）的等待秒数：[0, min(cap, base * 2^(attempt-1))) 内均匀随机"""
+    return rand() * min(cap, base * (2 ** max(attempt - 1, 0)))
+
+
+def requeue_delay(attempts: int, base: float, cap: float, rand: Callable[[], float] = random.random) -> float:
+    """持久化重试队列的推迟秒数：指数增长、半抖动（至少等待一半，避免重试过密）"""
+    delay = min(cap, base * (2 ** max(attempts, 0)))
+    return delay / 2 + rand() * delay / 2
+
+
+class RetryPolicy:
+    """重试次数与退避参数"""
+
+    def __init__(self, retries: int = 3, base: float = 0.5, cap: float = 8.0):
+        self.retries = retries
+        self.base = base
+        self.cap = cap
+
+    def delay(self, attempt: int) -> float:
+        return backoff_delay(attempt, self.base, self.cap)
+
+
+class CircuitBreaker:
+    """连续失败熔断器（closed -> open -> half_open -> closed）"""
+
+    def __init__(self, family: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.family = family
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._probing = False
+
+    def check(self) -> None:
+        """调用前检查；熔断中抛出 CircuitOpenError，半开时只放行一个探测请求"""
+        if self.state == BREAKER_OPEN:
+            remaining = self.opened_at + self.reset_timeout - self.clock()
+            if remaining > 0:
+                raise CircuitOpenError(self.family, remaining)
+            self.state = BREAKER_HALF_OPEN
+            self._probing = False
+            logger.info("飞书接口熔断冷却结束，放行探测请求: %s", self.family)
+        if self.state == BREAKER_HALF_OPEN:
+            if self._probing:
+                raise CircuitOpenError(self.family, self.reset_timeout)
+            self._probing = True
+
+    def is_open(self) -> bool:
+        """此刻调用是否会被拒绝（只读，不改变状态）：冷却期内，或半开且探测请求进行中
+
+        状态只在 check() 中从 open 转为 half_open；不经 check() 的调用方（如持久化重试队列）
+        用本方法按时间判断，冷却期过后即可再次调用。
+        """
+        if self.state == BREAKER_OPEN:
+            return self.clock() < self.opened_at + self.reset_timeout
+        return self.state == BREAKER_HALF_OPEN and self._probing
+
+    def release_probe(self) -> None:
+        """探测请求未得到结果（如被取消）：既不算成功也不算失败，放行下一个探测请求"""
+        if self.state == BREAKER_HALF_OPEN:
+            self._probing = False
+
+    def record_success(self) -> None:
+        if self.state != BREAKER_CLOSED:
+            logger.info("飞书接口恢复，熔断关闭: %s", self.family)
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == BREAKER_HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != BREAKER_OPEN:
+                self.trips += 1
+                logger.warning("飞书接口连续失败 %d 次，熔断 %.0f 秒: %s",
+                               self.failures, self.reset_timeout, self.family)
+            self.state = BREAKER_OPEN
+            self.opened_at = self.clock()
+            self._probing = False
+
+    def snapshot(self) -> dict:
+        return {"state": self.state, "failures": self.failures, "trips": self.trips}
+
+
+def is_server_error(response: Any) -> bool:
+    """5xx 响应视为接口故障（可重试、计入熔断）"""
+    status = getattr(getattr(response, "raw", None), "status_code", None)
+    return isinstance(status, int) and status >= 500
+
+
+def is_idempotent_call(path: Tuple[str, ...], args: Tuple[Any, ...]) -> bool:
+    """SDK 调用是否可安全重发：读取/PATCH，或请求体带有 uuid / client_token"""
+    if path and path[-1] in _IDEMPOTENT_METHODS:
+        return True
+    for request in args:
+        body = getattr(request, "request_body", None)
+        if any(getattr(body, field, None) for field in _IDEMPOTENCY_FIELDS):
+            return True
+    return False
+
+
+def new_message_uuid() -> str:
+    """消息去重键：飞书对同一 uuid 的发送/回复在 1 小时内只投递一次"""
+    return uuid.uuid4().hex
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+飞书 API 请求调度器（统一限流）
+
+所有经 lark_client 的调用通过同一个调度器排队：
+- 按接口族（im.message / im.image / task.read / task.write / default）各一个令牌桶
+- 优先级通道：交互回复 > 定时播报 > 后台同步与批量创建，同一接口族内高优先级先取令牌
+- 遇到限流响应（HTTP 429 或错误码 99991400）暂停该接口族并按 x-ogw-ratelimit-reset 重试
+- 网络异常与 5xx 按 RetryPolicy 抖动退避重试（仅幂等调用），并计入该接口族的熔断器
+- metrics() 提供各接口族的队列深度、等待时间、限流次数与熔断状态
+
+用法：
+    api = ScheduledClient(lark_client, scheduler, PRIORITY_INTERACTIVE)
+    response = await api.im.v1.message.areply(request)
+"""
+
+from __future__ import annotations
+import asyncio
+import heapq
+import inspect
+import itertools
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from feishu_resilience import CircuitBreaker, RetryPolicy, is_idempotent_call, is_server_error
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0   # 用户消息的回复
+PRIORITY_BROADCAST = 1     # 定时提醒、统计播报
+PRIORITY_BACKGROUND = 2    # 状态同步、批量创建任务
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BROADCAST: "broadcast",
+                  PRIORITY_BACKGROUND: "background"}
+
+FAMILY_DEFAULT = "default"
+# 接口族 -> (每秒令牌数, 桶容量)；低于飞书应用级频控，留出余量给其他进程
+DEFAULT_RATE_LIMITS: Dict[str, Tuple[float, float]] = {
+    "im.message": (10.0, 20.0),
+    "im.image": (5.0, 5.0),
+    "task.read": (10.0, 20.0),
+    "task.write": (10.0, 20.0),
+    FAMILY_DEFAULT: (5.0, 10.0),
+}
+
+RATE_LIMIT_CODES = {99991400}
+RATE_LIMIT_BACKOFF = 1.0
+RATE_LIMIT_MAX_BACKOFF = 60.0
+RATE_LIMIT_RETRIES = 2
+
+_READ_METHODS = {"aget", "alist", "atasks"}
+
+
+def parse_rate_limits(spec: str) -> Dict[str, Tuple[float, float]]:
+    """解析 "im.message=10:20,task.write=5" 形式的限流配置（容量缺省等于速率）"""
+    limits: Dict[str, Tuple[float, float]] = {}
+    for item in (spec or "").split(","):
+        if "=" not in item:
+            continue
+        family, value = item.split("=", 1)
+        try:
+            rate_text, _, capacity_text = value.partition(":")
+            rate = float(rate_text)
+            capacity = float(capacity_text) if capacity_text else rate
+        except ValueError:
+            logger.warning("忽略无效的限流配置: %s", item)
+            continue
+        if rate > 0 and capacity >= 1:
+            limits[family.strip()] = (rate, capacity)
+    return limits
+
+
+def endpoint_family(path: Tuple[str, ...]) -> str:
+    """SDK 调用路径（如 ("im", "v1", "message", "areply")）-> 接口族"""
+    if len(path) < 2:
+        return FAMILY_DEFAULT
+    if path[0] == "im":
+        return "im.image" if path[-2] == "image" else "im.message"
+    if path[0] == "task":
+        return "task.read" if path[-1] in _READ_METHODS else "task.write"
+    return FAMILY_DEFAULT
+
+
+def is_rate_limited(response: Any) -> bool:
+    if getattr(response, "code", None) in RATE_LIMIT_CODES:
+        return True
+    return getattr(getattr(response, "raw", None), "status_code", None) == 429
+
+
+def retry_after(response: Any, default: float = RATE_LIMIT_BACKOFF) -> float:
+    """限流响应建议的等待秒数（x-ogw-ratelimit-reset 头），缺省为 default"""
+    headers = getattr(getattr(response, "raw", None), "headers", None) or {}
+    try:
+        value = float(headers.get("x-ogw-ratelimit-reset") or headers.get("Retry-After") or default)
+    except (TypeError, ValueError, AttributeError):
+        value = default
+    return min(max(value, 0.0), RATE_LIMIT_MAX_BACKOFF)
+
+
+class TokenBucket:
+    """令牌桶：按 rate 匀速补充，最多积累 capacity 个"""
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def try_take(self) -> float:
+        """取一个令牌；成功返回 0，否则返回需等待的秒数"""
+        now = self.clock()
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def pause(self, seconds: float) -> None:
+        """收到限流响应：清空令牌并暂停发放"""
+        now = self.clock()
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.tokens = 0.0
+        self.updated = max(self.updated, self.paused_until)
+
+
+class _Lane:
+    """单个接口族的令牌桶、等待队列与统计"""
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self.waiters: List[Tuple[int, int]] = []
+        self.cond = asyncio.Condition()
+        self.calls = 0
+        self.rate_limited = 0
+        self.max_depth = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_by_priority: Dict[int, List[float]] = {}  # priority -> [次数, 总等待]
+        self.retries = 0
+        self.breaker: Optional[CircuitBreaker] = None
+
+
+class FeishuRequestScheduler:
+    """飞书请求调度器：令牌桶限流 + 优先级排队 + 限流响应退避 + 故障重试与熔断"""
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                 retries: int = RATE_LIMIT_RETRIES,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 breaker_factory: Optional[Callable[[str], CircuitBreaker]] = None):
+        self.limits = dict(DEFAULT_RATE_LIMITS)
+        self.limits.update(limits or {})
+        self.retries = retries
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.breaker_factory = breaker_factory or CircuitBreaker
+        self._lanes: Dict[str, _Lane] = {}
+        self._seq = itertools.count()
+
+    def _lane(self, family: str) -> _Lane:
+        lane = self._lanes.get(family)
+        if lane is None:
+            rate, capacity = self.limits.get(family, self.limits[FAMILY_DEFAULT])
+            lane = self._lanes[family] = _Lane(TokenBucket(rate, capacity))
+            lane.breaker = self.breaker_factory(family)
+        return lane
+
+    def breaker(self, family: str) -> CircuitBreaker:
+        return self._lane(family).breaker
+
+    async def acquire(self, family: str, priority: int = PRIORITY_BACKGROUND) -> float:
+        """排队取得一个令牌，返回等待秒数；同一接口族内按 (优先级, 到达顺序) 放行"""
+        lane = self._lane(family)
+        entry = (priority, next(self._seq))
+        started = time.monotonic()
+        async with lane.cond:
+            heapq.heappush(lane.waiters, entry)
+            lane.max_depth = max(lane.max_depth, len(lane.waiters))
+            try:
+                while True:
+                    delay: Optional[float] = None
+                    if lane.waiters[0] == entry:
+                        delay = lane.bucket.try_take()
+                        if delay <= 0:
+                            heapq.heappop(lane.waiters)
+                            break
+                    try:
+                        await asyncio.wait_for(lane.cond.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                # 取消等待：移出队列，唤醒后继者
+                if entry in lane.waiters:
+                    lane.waiters.remove(entry)
+                    heapq.heapify(lane.waiters)
+                raise
+            finally:
+                lane.cond.notify_all()
+
+        waited = time.monotonic() - started
+        lane.calls += 1
+        lane.wait_total += waited
+        lane.wait_max = max(lane.wait_max, waited)
+        stat = lane.wait_by_priority.setdefault(priority, [0, 0.0])
+        stat[0] += 1
+        stat[1] += waited
+        return waited
+
+    async def call(self, family: str, func: Callable[..., Awaitable[Any]], *args: Any,
+                   priority: int = PRIORITY_BACKGROUND, idempotent: bool = False, **kwargs: Any) -> Any:
+        """限流执行一次 SDK 调用
+
+        - 限流响应：暂停该接口族并重试（请求未被处理，总是可以重发），用尽后返回最后一次响应
+        - 网络异常 / 5xx：计入熔断器；idempotent 为 True 时按退避策略重试，用尽后抛出异常或返回响应
+        - 熔断中：直接抛出 CircuitOpenError，不占用令牌
+        """
+        lane = self._lane(family)
+        attempt = 0
+        failures = 0
+        while True:
+            lane.breaker.check()
+            try:
+                await self.acquire(family, priority)
+                response = await func(*args, **kwargs)
+            except BaseException as e:
+                if not isinstance(e, Exception):
+                    # 被取消：探测请求没有结果，释放探测名额，否则熔断器会一直停在半开
+                    lane.breaker.release_probe()
+                    raise
+                lane.breaker.record_failure()
+                if not idempotent or failures >= self.retry_policy.retries:
+                    raise
+                failures += 1
+                await self._retry_pause(lane, family, failures, e)
+                continue
+
+            if is_server_error(response):
+                lane.breaker.record_failure()
+                if not idempotent or failures >= self.retry_policy.retries:
+                    return response
+                failures += 1
+                await self._retry_pause(lane, family, failures, f"HTTP {response.raw.status_code}")
+                continue
+
+            # 接口已正常应答（含限流与业务错误码），熔断器视为成功
+            lane.breaker.record_success()
+            if not is_rate_limited(response):
+                return response
+            lane.rate_limited += 1
+            backoff = retry_after(response, RATE_LIMIT_BACKOFF * (2 ** attempt))
+            lane.bucket.pause(backoff)
+            if attempt >= self.retries:
+                logger.warning("飞书接口限流，重试已用尽: family=%s", family)
+                return response
+            attempt += 1
+            logger.warning("飞书接口限流，%.1f 秒后重试（%d/%d）: family=%s",
+                           backoff, attempt, self.retries, family)
+
+    async def _retry_pause(self, lane: _Lane, family: str, attempt: int, reason: Any) -> None:
+        lane.retries += 1
+        delay = self.retry_policy.delay(attempt)
+        logger.warning("飞书接口调用失败，%.2f 秒后重试（%d/%d）: family=%s, %s",
+                       delay, attempt, self.retry_policy.retries, family, reason)
+        await asyncio.sleep(delay)
+
+    def queue_depth(self, family: Optional[str] = None) -> int:
+        if family is not None:
+            lane = self._lanes.get(family)
+            return len(lane.waiters) if lane else 0
+        return sum(len(lane.waiters) for lane in self._lanes.values())
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """各接口族的调用数、队列深度、平均/最大等待（毫秒）与限流次数"""
+        result: Dict[str, Dict[str, Any]] = {}
+        for family, lane in sorted(self._lanes.items()):
+            result[family] = {
+                "calls": lane.calls,
+                "depth": len(lane.waiters),
+                "max_depth": lane.max_depth,
+                "wait_avg_ms": round(lane.wait_total / lane.calls * 1000, 1) if lane.calls else 0.0,
+                "wait_max_ms": round(lane.wait_max * 1000, 1),
+                "rate_limited": lane.rate_limited,
+                "retries": lane.retries,
+                "breaker": lane.breaker.snapshot(),
+                "wait_avg_ms_by_priority": {
+                    PRIORITY_NAMES.get(priority, str(priority)): round(total / count * 1000, 1)
+                    for priority, (count, total) in sorted(lane.wait_by_priority.items())
+                },
+            }
+        return result
+
+
+class ScheduledClient:
+    """lark_client 代理：异步 SDK 方法（a 开头）经调度器限流与容错，其余属性原样透传"""
+
+    def __init__(self, client: Any, scheduler: FeishuRequestScheduler,
+                 priority: int = PRIORITY_BACKGROUND, _path: Tuple[str, ...] = ()):
+        self._client = client
+        self._scheduler = scheduler
+        self._priority = priority
+        self._path = _path
+
+    def __getattr__(self, name: str) -> Any:
+        target = getattr(self._client, name)
+        path = self._path + (name,)
+        if inspect.iscoroutinefunction(target):
+            family = endpoint_family(path)
+
+            async def scheduled(*args: Any, **kwargs: Any) -> Any:
+                return await self._scheduler.call(family, target, *args, priority=self._priority,
+                                                  idempotent=is_idempotent_call(path, args), **kwargs)
+            return scheduled
+        if callable(target) or not hasattr(target, "__dict__"):
+            return target
+        return ScheduledClient(target, self._scheduler, self._priority, path)
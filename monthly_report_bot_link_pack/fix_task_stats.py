@@ -1,13 +1,18 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-修复 task_stats.json - 使用真实的任务完成数据
+修复任务统计 - 使用真实的任务完成数据（写入与机器人共用的 SQLite 存储）
 """
 
-import json
 import os
 from datetime import datetime
 
+from task_stats_store import TaskStatsStore
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TASK_STATS_FILE = os.path.join(BASE_DIR, "task_stats.json")
+TASK_STATS_DB = os.path.join(BASE_DIR, "task_stats.db")
+
 # 真实的任务完成数据（基于之前的 task_stats.json）
 REAL_TASK_STATS = {
     "current_month": "2025-10",
@@ -109,34 +114,31 @@ REAL_TASK_STATS = {
     "last_update": datetime.now().isoformat()
 }
 
-def backup_current_file():
-    """备份当前的 task_stats.json"""
-    if os.path.exists("task_stats.json"):
+def backup_current_file(store: TaskStatsStore):
+    """备份当前的任务统计（导出为 JSON）"""
+    if store.current_month() is not None:
         backup_name = f"task_stats.json.backup.{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        os.rename("task_stats.json", backup_name)
-        print(f"✅ 已备份旧文件: {backup_name}")
+        store.export_json(backup_name)
+        print(f"✅ 已备份旧数据: {backup_name}")
         return True
     else:
-        print("⚠️  task_stats.json 文件不存在，将创建新文件")
+        print("⚠️  任务统计为空，将写入新数据")
         return False
 
-def write_real_stats():
+def write_real_stats(store: TaskStatsStore):
     """写入真实的任务统计数据"""
     try:
-        with open("task_stats.json", "w", encoding="utf-8") as f:
-            json.dump(REAL_TASK_STATS, f, ensure_ascii=False, indent=2)
+        store.save(REAL_TASK_STATS)
         print("✅ 已写入真实的任务统计数据")
         return True
     except Exception as e:
         print(f"❌ 写入失败: {e}")
         return False
 
-def verify_stats():
+def verify_stats(store: TaskStatsStore):
     """验证写入的数据"""
     try:
-        with open("task_stats.json", "r", encoding="utf-8") as f:
-            stats = json.load(f)
-
+        stats = store.load()
         print("\n" + "="*60)
         print("📊 任务统计验证")
         print("="*60)
@@ -179,13 +181,16 @@ def main():
     print("="*60)
     print()
 
-    # 备份当前文件
-    backup_current_file()
+    # 与机器人共用同一个存储（首次打开会迁移旧版 task_stats.json，以便备份）
+    store = TaskStatsStore(TASK_STATS_DB, json_path=TASK_STATS_FILE)
+
+    # 备份当前数据
+    backup_current_file(store)
 
     # 写入真实数据
-    if write_real_stats():
+    if write_real_stats(store):
         # 验证数据
-        verify_stats()
+        verify_stats(store)
         print()
         print("="*60)
         print("✅ 修复完成！")
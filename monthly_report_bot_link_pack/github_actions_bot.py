@@ -7,12 +7,14 @@ GitHub Actions版本的月报机器人
 import os
 import json
 import logging
-import requests
+import feishu_http
 import yaml
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import sys
 
+from tenant_token import get_tenant_token_provider, token_rejected
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -33,37 +35,25 @@ class FeishuBot:
         self.welcome_card_id = config.get('WELCOME_CARD_ID', 'AAqInYqWzIiu6')
         self.timezone = config.get('TIMEZONE', 'America/Argentina/Buenos_Aires')
         
-        # 获取访问令牌
-        self.access_token = self._get_access_token()
+        # 获取访问令牌（共享缓存，同一进程内多个实例/多次调用只请求一次）
+        self._token_provider = get_tenant_token_provider(self.app_id, self.app_secret)
+        self._get_access_token()
         
-    def _get_access_token(self) -> str:
-        """获取飞书访问令牌"""
-        url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
-        payload = {
-            "app_id": self.app_id,
-            "app_secret": self.app_secret
-        }
+    @property
+    def access_token(self) -> str:
+        return self._get_access_token()
         
-        response = requests.post(url, json=payload)
-        if response.status_code == 200:
-            data = response.json()
-            if data.get('code') == 0:
-                return data['tenant_access_token']
-            else:
-                logger.error(f"获取访问令牌失败: {data}")
-                raise Exception(f"获取访问令牌失败: {data}")
-        else:
-            logger.error(f"请求失败: {response.status_code}")
-            raise Exception(f"请求失败: {response.status_code}")
+    def _get_access_token(self) -> str:
+        """获取飞书访问令牌（缓存至临近过期，设置 FEISHU_TOKEN_CACHE 时跨进程复用）"""
+        token = self._token_provider.get_token()
+        if not token:
+            logger.error("获取访问令牌失败")
+            raise Exception("获取访问令牌失败")
+        return token
     
     def send_message(self, message_type: str, content: Dict) -> bool:
         """发送消息到群聊"""
         url = f"https://open.feishu.cn/open-apis/im/v1/messages?receive_id_type=chat_id"
-        headers = {
-            "Authorization": f"Bearer {self.access_token}",
-            "Content-Type": "application/json"
-        }
-        
         payload = {
             "receive_id": self.chat_id,
             "msg_type": message_type,
@@ -71,10 +61,20 @@ class FeishuBot:
         }
         
         try:
-            response = requests.post(url, json=payload, headers=headers)
-            logger.info(f"API请求详情: URL={url}, Status={response.status_code}")
-            logger.info(f"请求载荷: {payload}")
-            logger.info(f"响应内容: {response.text}")
+            for attempt in range(2):
+                headers = {
+                    "Authorization": f"Bearer {self.access_token}",
+                    "Content-Type": "application/json"
+                }
+                response = feishu_http.post(url, json=payload, headers=headers)
+                logger.info(f"API请求详情: URL={url}, Status={response.status_code}")
+                logger.info(f"请求载荷: {payload}")
+                logger.info(f"响应内容: {response.text}")
+                # 令牌被吊销/失效：作废缓存（含 FEISHU_TOKEN_CACHE 文件）后用新令牌重试一次
+                if attempt == 0 and token_rejected(response):
+                    self._token_provider.invalidate()
+                    continue
+                break
             
             if response.status_code == 200:
                 data = response.json()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片 image_key 缓存（按图片内容哈希）
+
+同一张图表（字节完全相同）只上传一次：
+- 键为 "图片类型:内容 SHA-256"，值为飞书返回的 image_key
+- TTL 过期后重新上传；超过容量时按最近最少使用（LRU）淘汰
+- 持久化到本地 JSON 文件（原子替换），重启后仍可命中
+
+用法：
+    cache = ImageKeyCache(path)
+    digest = cache.file_digest(image_path)   # 文件未改动时只需一次 stat
+    digest = content_hash(image_bytes)       # 或直接对字节求哈希
+    image_key = cache.get(digest) or upload(...)
+    cache.put(digest, image_key)
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 30 * 86400
+DEFAULT_MAX_ENTRIES = 256
+
+
+def content_hash(data: bytes, image_type: str = "message") -> str:
+    """图片缓存键：图片类型 + 内容 SHA-256（不同用途上传的 image_key 不混用）"""
+    return f"{image_type}:{hashlib.sha256(data).hexdigest()}"
+
+
+class ImageKeyCache:
+    """内容哈希 -> image_key 的持久化缓存（TTL + LRU，线程安全）"""
+
+    def __init__(self, path: Optional[str], ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            path: 持久化文件路径，None 表示仅在内存中缓存
+            ttl: 条目有效期（秒），自上传时起算
+            max_entries: 最大条目数，超出时淘汰最近最少使用的条目
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # 按最近使用先后排列，末尾为最近使用
+        self._entries: "OrderedDict[str, Dict[str, float]]" = OrderedDict()
+        # 文件路径 -> ((mtime_ns, size), 内容哈希)：同一文件重复上传时不必重新读取与哈希
+        self._file_digests: Dict[str, Tuple[Tuple[int, int], str]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f) or {}
+            now = self.clock()
+            for digest, entry in sorted(entries.items(), key=lambda kv: kv[1].get("last_used", 0)):
+                if entry.get("image_key") and now - float(entry.get("uploaded_at", 0)) < self.ttl:
+                    self._entries[digest] = entry
+        except Exception as e:
+            logger.warning("读取图片缓存失败: %s", e)
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".image_keys_", suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning("写入图片缓存失败: %s", e)
+
+    def file_digest(self, path: str, image_type: str = "message") -> str:
+        """文件内容哈希；文件的 (mtime, 大小) 未变化时直接复用上次结果"""
+        st = os.stat(path)
+        version = (st.st_mtime_ns, st.st_size)
+        memo = self._file_digests.get(path)
+        if memo is not None and memo[0] == version and memo[1].startswith(f"{image_type}:"):
+            return memo[1]
+        with open(path, "rb") as f:
+            digest = content_hash(f.read(), image_type)
+        if len(self._file_digests) >= self.max_entries:
+            self._file_digests.clear()
+        self._file_digests[path] = (version, digest)
+        return digest
+
+    def get(self, digest: str) -> Optional[str]:
+        """命中且未过期时返回 image_key，并记为最近使用"""
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None or self.clock() - entry["uploaded_at"] >= self.ttl:
+                if entry is not None:
+                    del self._entries[digest]
+                    self._save()
+                self.misses += 1
+                return None
+            entry["last_used"] = self.clock()
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            # 仅调整使用顺序时不立即落盘，下次写入时一并保存
+            return entry["image_key"]
+
+    def put(self, digest: str, image_key: str) -> None:
+        with self._lock:
+            now = self.clock()
+            self._entries[digest] = {"image_key": image_key, "uploaded_at": now, "last_used": now}
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                logger.debug("图片缓存淘汰: %s", evicted)
+            self._save()
+
+    def invalidate(self, digest: str) -> None:
+        """image_key 被飞书判定无效时调用"""
+        with self._lock:
+            if self._entries.pop(digest, None) is not None:
+                self._save()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+出站消息队列（持久化 + 发送协程池）
+
+群卡片、文本、图片与回帖不再在产生它们的代码路径中同步等待发送：
+1. 生产者 enqueue() 写入 SQLite 后立即返回，主循环的分钟节拍不再被慢发送拖住
+2. 优先级：交互回复（PRIORITY_INTERACTIVE）先于定时播报（PRIORITY_BROADCAST）出队
+3. 同一排序键（群 chat_id / 被回复的 message_id）内严格按入队顺序发送，
+   不同排序键之间并行，定时播报不会阻塞交互回复
+4. 至少一次投递：发送中的消息在进程重启后重新发送；每条消息入队时生成固定 uuid，
+   重发时沿用，飞书按 uuid 去重（1 小时内），不会重复出现在群里
+5. 去重键（dedup_key）：同一键只入队一次，如 "daily_reminder:2025-06-18"，
+   避免同一分钟内重启或重复触发导致的重复播报
+6. 发送失败按指数退避重试，超过次数上限标记为 failed 并记入日志
+
+独立数据库文件（不放在任务统计库中），消息入队不会使统计缓存失效。
+"""
+
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Set
+
+from feishu_resilience import new_message_uuid, requeue_delay
+from feishu_scheduler import PRIORITY_BROADCAST
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = "pending"
+STATUS_INFLIGHT = "inflight"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbound_messages (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    dedup_key    TEXT UNIQUE,
+    order_key    TEXT NOT NULL,
+    priority     INTEGER NOT NULL,
+    kind         TEXT NOT NULL,
+    payload      TEXT NOT NULL,
+    uuid         TEXT NOT NULL,
+    status       TEXT NOT NULL DEFAULT 'pending',
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    last_error   TEXT NOT NULL DEFAULT '',
+    created_at   REAL NOT NULL,
+    updated_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_outbound_status ON outbound_messages(status, id);
+"""
+
+# 发送函数：deliver(kind, payload, uuid) -> 是否成功
+Deliver = Callable[[str, Dict[str, Any], str], Awaitable[bool]]
+
+
+class OutboxStore:
+    """出站消息的 SQLite 持久化（WAL，线程安全）"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def add(self, kind: str, payload: Dict[str, Any], order_key: str, priority: int,
+            dedup_key: Optional[str] = None, now: Optional[float] = None) -> Optional[int]:
+        """入队；dedup_key 已存在时不重复入队，返回 None"""
+        now = time.time() if now is None else now
+        with self._transaction():
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO outbound_messages "
+                "(dedup_key, order_key, priority, kind, payload, uuid, next_attempt, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (dedup_key, order_key, priority, kind, json.dumps(payload, ensure_ascii=False),
+                 new_message_uuid(), now, now, now),
+            )
+            return cursor.lastrowid if cursor.rowcount else None
+
+    def unsent(self) -> List[Dict[str, Any]]:
+        """待发送与发送中的消息（按入队顺序）"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, order_key, priority, status, next_attempt FROM outbound_messages "
+                "WHERE status IN (?, ?) ORDER BY id",
+                (STATUS_PENDING, STATUS_INFLIGHT),
+            ).fetchall()
+            return [dict(row) for row in rows]
+
+    def get(self, message_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM outbound_messages WHERE id = ?", (message_id,)).fetchone()
+        if row is None:
+            return None
+        message = dict(row)
+        message["payload"] = json.loads(message["payload"])
+        return message
+
+    def set_status(self, message_id: int, status: str, next_attempt: Optional[float] = None,
+                   error: Optional[str] = None, attempted: bool = False) -> int:
+        """更新状态，返回累计发送次数"""
+        now = time.time()
+        with self._transaction():
+            self._conn.execute(
+                "UPDATE outbound_messages SET status = ?, next_attempt = COALESCE(?, next_attempt), "
+                "last_error = COALESCE(?, last_error), attempts = attempts + ?, updated_at = ? WHERE id = ?",
+                (status, next_attempt, error[:500] if error is not None else None, int(attempted), now, message_id),
+            )
+            row = self._conn.execute("SELECT attempts FROM outbound_messages WHERE id = ?", (message_id,)).fetchone()
+        return int(row["attempts"]) if row else 0
+
+    def reset_inflight(self) -> int:
+        """进程重启后，上次发送中的消息重新排队（沿用原 uuid，飞书端去重）"""
+        with self._transaction():
+            cursor = self._conn.execute(
+                "UPDATE outbound_messages SET status = ? WHERE status = ?", (STATUS_PENDING, STATUS_INFLIGHT)
+            )
+            return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) AS n FROM outbound_messages GROUP BY status"
+            ).fetchall()
+            return {row["status"]: int(row["n"]) for row in rows}
+
+    def purge(self, older_than: float) -> int:
+        """清理早于指定时间的已发送/已放弃消息（去重键随之失效）"""
+        with self._transaction():
+            cursor = self._conn.execute(
+                "DELETE FROM outbound_messages WHERE status IN (?, ?) AND updated_at < ?",
+                (STATUS_SENT, STATUS_FAILED, older_than),
+            )
+            return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class MessageOutbox:
+    """出站消息队列：持久化入队 + 异步发送协程池
+
+    未启动（start() 之前）时 enqueue() 仍可调用，消息在启动后发送。
+    """
+
+    def __init__(self, store: OutboxStore, deliver: Deliver, workers: int = 4,
+                 max_attempts: int = 8, retry_base: float = 5.0, retry_cap: float = 300.0,
+                 keep_seconds: float = 7 * 86400):
+        self.store = store
+        self.deliver = deliver
+        self.workers = max(1, workers)
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_cap = retry_cap
+        self.keep_seconds = keep_seconds
+        self.stats = {"enqueued": 0, "deduplicated": 0, "sent": 0, "retried": 0, "failed": 0}
+        self._busy_keys: Set[str] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List["asyncio.Task"] = []
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks) and not self._stopping
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], order_key: str,
+                priority: int = PRIORITY_BROADCAST, dedup_key: Optional[str] = None) -> bool:
+        """入队后立即返回；去重键重复时返回 False"""
+        message_id = self.store.add(kind, payload, order_key, priority, dedup_key=dedup_key)
+        if message_id is None:
+            self.stats["deduplicated"] += 1
+            logger.info("出站消息已入队过，跳过: %s", dedup_key)
+            return False
+        self.stats["enqueued"] += 1
+        self._wake()
+        return True
+
+    def _wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    # ---------------------- 出队 ----------------------
+
+    def _claim(self, now: float) -> Optional[Dict[str, Any]]:
+        """取下一条可发送的消息：每个排序键只看最早一条（保证键内顺序），
+        排序键空闲且已到期的候选中按 (优先级, 入队顺序) 选取"""
+        heads: Dict[str, Dict[str, Any]] = {}
+        for row in self.store.unsent():
+            heads.setdefault(row["order_key"], row)
+        candidates = [
+            row for key, row in heads.items()
+            if key not in self._busy_keys and row["status"] == STATUS_PENDING and row["next_attempt"] <= now
+        ]
+        if not candidates:
+            return None
+        row = min(candidates, key=lambda r: (r["priority"], r["id"]))
+        self._busy_keys.add(row["order_key"])
+        self.store.set_status(row["id"], STATUS_INFLIGHT)
+        return row
+
+    def _next_wait(self, now: float, idle: float = 30.0) -> float:
+        due = [row["next_attempt"] for row in self.store.unsent() if row["status"] == STATUS_PENDING]
+        return max(0.05, min([idle] + [t - now for t in due]))
+
+    async def _send(self, message_id: int) -> None:
+        message = self.store.get(message_id)
+        if message is None:
+            return
+        try:
+            ok = await self.deliver(message["kind"], message["payload"], message["uuid"])
+            error = "" if ok else "deliver returned False"
+        except Exception as e:
+            ok, error = False, str(e)
+        if ok:
+            self.store.set_status(message_id, STATUS_SENT, attempted=True, error="")
+            self.stats["sent"] += 1
+            return
+        attempts = message["attempts"] + 1
+        if attempts >= self.max_attempts:
+            self.store.set_status(message_id, STATUS_FAILED, attempted=True, error=error)
+            self.stats["failed"] += 1
+            logger.error("出站消息发送 %d 次仍失败，放弃: #%s %s (%s)", attempts, message_id, message["kind"], error)
+            return
+        delay = requeue_delay(attempts, self.retry_base, self.retry_cap)
+        self.store.set_status(message_id, STATUS_PENDING, next_attempt=time.time() + delay,
+                              attempted=True, error=error)
+        self.stats["retried"] += 1
+        logger.warning("出站消息发送失败，%.0f 秒后重试: #%s %s (%s)", delay, message_id, message["kind"], error)
+
+    async def _worker(self) -> None:
+        assert self._wakeup is not None
+        while not self._stopping:
+            now = time.time()
+            claimed = self._claim(now)
+            if claimed is None:
+                # 取不到消息与清除唤醒标记之间没有 await，不会丢失唤醒
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self._next_wait(now))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._send(claimed["id"])
+            except Exception as e:
+                logger.error("出站消息处理异常: #%s %s", claimed["id"], e)
+            finally:
+                self._busy_keys.discard(claimed["order_key"])
+                self._wake()  # 该排序键的下一条可以发送了
+
+    # ---------------------- 生命周期 ----------------------
+
+    def start(self) -> None:
+        """启动发送协程池（须在事件循环中调用）"""
+        if self._tasks:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        recovered = self.store.reset_inflight()
+        if recovered:
+            logger.info("恢复 %d 条上次未确认的出站消息（沿用原 uuid 重发）", recovered)
+        self.store.purge(time.time() - self.keep_seconds)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def join(self, timeout: Optional[float] = None) -> bool:
+        """等待当前已到期的消息发送完毕，返回是否已清空"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            now = time.time()
+            if not any(row["status"] == STATUS_INFLIGHT or row["next_attempt"] <= now
+                       for row in self.store.unsent()):
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.02)
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """尽量发完已到期的消息后停止；剩余消息保留在库中，下次启动继续发送"""
+        if not self._tasks:
+            return
+        await self.join(timeout)
+        self._stopping = True
+        self._wake()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._busy_keys.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, "queue": self.store.counts()}
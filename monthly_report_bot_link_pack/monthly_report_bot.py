@@ -7,7 +7,7 @@
 - 18–22 日：统计进度，群里发布进度卡片，并私聊未完成责任人
 - 23 日：不导出 PDF，直接在群里推送 **文件链接 + 最终提醒**
 
-依赖： pip install requests pyyaml pytz
+依赖： pip install httpx pyyaml pytz
 
 必填环境变量：
   APP_ID, APP_SECRET   —— 应用凭证
@@ -23,7 +23,9 @@
 from __future__ import annotations
 import os, time, json, math, datetime, logging, sys
 from typing import Dict, List, Tuple
-import requests, yaml, pytz
+import yaml, pytz
+
+import feishu_http
 
 # 打印调试信息
 print("="*50)
@@ -70,7 +72,7 @@ def tenant_token() -> str:
     logging.info("请求租户令牌: URL=%s, app_id=%s", url, APP_ID)
 
     try:
-        r = requests.post(url, json=payload, timeout=REQUEST_TIMEOUT)
+        r = feishu_http.post(url, json=payload, timeout=REQUEST_TIMEOUT)
         r.raise_for_status()
         data = r.json()
         logging.info("获取租户令牌响应 code=%s", data.get("code"))
@@ -79,7 +81,7 @@ def tenant_token() -> str:
 
         # 兼容两种返回结构
         return data.get("tenant_access_token") or data.get("data", {}).get("tenant_access_token", "")
-    except requests.exceptions.RequestException as e:
+    except feishu_http.HTTPError as e:
         raise RuntimeError(f"网络请求失败: {str(e)}")
     except Exception as e:
         raise RuntimeError(f"处理响应失败: {str(e)}")
@@ -117,7 +119,7 @@ def send_group_text(token: str, text: str):
     params = {"receive_id_type": "chat_id"}
     content = json.dumps({"text": text}, ensure_ascii=False)
     payload = {"receive_id": CHAT_ID, "msg_type": "text", "content": content}
-    r = requests.post(url, params=params, headers=api_headers(token), json=payload, timeout=REQUEST_TIMEOUT)
+    r = feishu_http.post(url, params=params, headers=api_headers(token), json=payload, timeout=REQUEST_TIMEOUT)
     r.raise_for_status()
 
 
@@ -128,7 +130,7 @@ def send_group_card(token: str, card: Dict):
     # 飞书卡片发送以 content=卡片JSON字符串 为标准做法
     content = json.dumps(card, ensure_ascii=False)
     payload = {"receive_id": CHAT_ID, "msg_type": "interactive", "content": content}
-    r = requests.post(url, params=params, headers=api_headers(token), json=payload, timeout=REQUEST_TIMEOUT)
+    r = feishu_http.post(url, params=params, headers=api_headers(token), json=payload, timeout=REQUEST_TIMEOUT)
     r.raise_for_status()
 
 
@@ -138,7 +140,7 @@ def dm_text_by_open_id(token: str, open_id: str, text: str):
     params = {"receive_id_type": "open_id"}
     content = json.dumps({"text": text}, ensure_ascii=False)
     payload = {"receive_id": open_id, "msg_type": "text", "content": content}
-    r = requests.post(url, params=params, headers=api_headers(token), json=payload, timeout=REQUEST_TIMEOUT)
+    r = feishu_http.post(url, params=params, headers=api_headers(token), json=payload, timeout=REQUEST_TIMEOUT)
     r.raise_for_status()
 
 
@@ -173,7 +175,7 @@ def create_task(token: str, summary: str, assignee_open_id: str, due_ts: int, de
         body["collaborator_ids"] = [assignee_open_id]
 
     logging.info("创建任务请求体(v1): %s", json.dumps(body, indent=2, ensure_ascii=False))
-    r = requests.post(url, params=params, headers=api_headers(token), json=body, timeout=REQUEST_TIMEOUT)
+    r = feishu_http.post(url, params=params, headers=api_headers(token), json=body, timeout=REQUEST_TIMEOUT)
     logging.info("响应状态码: %s", r.status_code)
     logging.info("响应内容: %s", r.text)
     r.raise_for_status()
@@ -192,7 +194,7 @@ def create_task(token: str, summary: str, assignee_open_id: str, due_ts: int, de
 def get_task(token: str, task_id: str) -> Dict:
     url = f"{FEISHU}/task/v1/tasks/{task_id}"
     params = {"user_id_type": "open_id"}
-    r = requests.get(url, params=params, headers=api_headers(token), timeout=REQUEST_TIMEOUT)
+    r = feishu_http.get(url, params=params, headers=api_headers(token), timeout=REQUEST_TIMEOUT)
     r.raise_for_status()
     return r.json().get("data", {})  # { "task": {...} }
 
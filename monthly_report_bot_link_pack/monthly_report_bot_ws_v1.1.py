@@ -11,8 +11,9 @@
 
 from __future__ import annotations
 import os, sys, time, json, math, datetime, logging, re
+import hashlib
 import tempfile
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Dict, List, Tuple, Optional, Any, Awaitable, Callable, Set, Union
 import re as _re_cached  # 局部预编译正则所用
 import argparse
 import yaml, pytz
@@ -36,11 +37,28 @@ except ModuleNotFoundError:
     sys.path.insert(0, str(pathlib.Path(__file__).parent / "app"))
     from ws_wrapper import create_ws_handler
 
-# 引入图表生成器
-try:
-    from chart_generator import chart_generator
-except ImportError:
-    chart_generator = None
+# 任务统计存储（SQLite）与进程内缓存
+from task_stats_store import TaskStatsStore, EVENT_SYNC
+from stats_cache import VersionedCache, file_version
+from stats_archive import StatsArchive
+from stats_writer import DebouncedStatsWriter
+from task_update_events import TaskUpdateHandler
+from message_outbox import MessageOutbox, OutboxStore
+from image_key_cache import ImageKeyCache, content_hash
+from render_cache import RenderCache, stats_fingerprint
+from feishu_scheduler import (
+    FeishuRequestScheduler, PRIORITY_BACKGROUND, PRIORITY_BROADCAST, PRIORITY_INTERACTIVE, ScheduledClient,
+    parse_rate_limits,
+)
+from feishu_resilience import CircuitBreaker, RetryPolicy, new_message_uuid, requeue_delay
+from task_listing import (
+    diff_completions, ensure_tasklist, is_task_completed, list_tasklist_tasks_paginated,
+    list_tasks_paginated, task_client_token, tasklist_client_token,
+)
+
+# 图表在独立进程池中渲染（matplotlib/seaborn/numpy 只在渲染进程中导入），见 get_chart_render_service()
+from chart_image import DEFAULT_PROFILE, KIND_CHART, ChartImage, save_chart_image
+from chart_render_service import ChartRenderService, chart_dependencies_available
 
 try:
     from ai_intent import classify_intent, intent_to_command
@@ -52,19 +70,6 @@ VERSION = "1.3.1-interactive"
 
 # ---------------------- 基础配置 ----------------------
 
-# 强制设置标准输出编码为 UTF-8
-if sys.stdout.encoding != 'utf-8':
-    try:
-        sys.stdout = open(sys.stdout.fileno(), mode='w', encoding='utf-8', buffering=1)
-    except Exception:
-        pass
-
-print("="*60)
-print("月报机器人 v1.3 交互增强版 - 核心功能 + Echo")
-print("Python 版本:", sys.version)
-print("当前工作目录:", os.getcwd())
-print("="*60)
-
 # 环境变量（与 monthly_report_bot_final 保持一致）
 APP_ID     = os.environ.get("APP_ID", "").strip()
 APP_SECRET = os.environ.get("APP_SECRET", "").strip()
@@ -81,21 +86,112 @@ WELCOME_CARD_ID = os.environ.get("WELCOME_CARD_ID", "AAqInYqWzIiu6")
 # 日志与监控
 LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
 
+# 任务事件日志：快照之后累计多少条事件时压缩一次
+STATS_COMPACT_EVENTS = int(os.environ.get("STATS_COMPACT_EVENTS", "200"))
+# 完成状态同步：未完成任务的查询间隔（秒），按距23日截止的天数递减
+TASK_POLL_SCHEDULE = ((0, 0), (1, 3600), (3, 3 * 3600))  # (距截止天数上限, 间隔)
+TASK_POLL_EARLY = 6 * 3600
+TASK_POLL_AFTER_DEADLINE = 12 * 3600
+TASK_POLL_SLACK = 120
+# 完成状态同步方式：
+#   auto = 本月有任务清单时分页列出清单，否则逐个 GetTaskRequest
+#   list = 有清单用清单，否则 ListTaskRequest 分页列出已完成任务
+#   get  = 始终逐个 GetTaskRequest
+TASK_SYNC_MODE = os.environ.get("TASK_SYNC_MODE", "auto").strip().lower()
+# 每月每群一个飞书任务清单，创建的任务挂入清单，便于分页同步与恢复
+TASKLIST_ENABLED = os.environ.get("TASKLIST_ENABLED", "true").lower() == "true"
+TASKLIST_GROUP = os.environ.get("TASKLIST_GROUP", "").strip() or CHAT_ID
+TASKLIST_NAME_TEMPLATE = os.environ.get("TASKLIST_NAME_TEMPLATE", "{month} 月报任务 ({group})")
+# 分页拉取水位线回退量（毫秒），容忍远端 updated_at 与本地时钟偏差
+TASK_LIST_WATERMARK_SKEW_MS = 5 * 60 * 1000
+# 完成状态同步的最大并发查询数
+SYNC_CONCURRENCY = max(1, int(os.environ.get("SYNC_CONCURRENCY", "8")))
+# 播报前同步：上次查询超过该秒数的任务强制刷新
+TASK_POLL_MAX_AGE_BEFORE_BROADCAST = int(os.environ.get("TASK_POLL_MAX_AGE_BEFORE_BROADCAST", "1800"))
+# 任务变更事件（官方WS订阅 task.task.updated_v1）：事件连接后轮询退化为低频对账
+TASK_EVENTS_ENABLED = os.environ.get("TASK_EVENTS_ENABLED", "true").lower() == "true"
+TASK_RECONCILE_INTERVAL = int(os.environ.get("TASK_RECONCILE_INTERVAL", str(6 * 3600)))
+# 只有收到过任务变更事件才降为对账；超过该秒数没有收到事件视为连接/订阅失效，恢复按截止日程轮询
+TASK_EVENTS_STALE_AFTER = int(os.environ.get("TASK_EVENTS_STALE_AFTER", str(3 * 3600)))
+# 飞书请求限流：接口族=每秒令牌数[:桶容量]，逗号分隔，覆盖默认值（如 "im.message=10:20,task.write=5"）
+FEISHU_RATE_LIMITS = parse_rate_limits(os.environ.get("FEISHU_RATE_LIMITS", ""))
+# 飞书调用容错：幂等调用的重试次数；连续失败多少次熔断、熔断冷却秒数
+FEISHU_RETRIES = int(os.environ.get("FEISHU_RETRIES", "3"))
+FEISHU_BREAKER_THRESHOLD = int(os.environ.get("FEISHU_BREAKER_THRESHOLD", "5"))
+FEISHU_BREAKER_RESET = float(os.environ.get("FEISHU_BREAKER_RESET", "30"))
+# 远端完成失败的持久化重试：首次间隔、最大间隔（秒）与最多重试次数
+REMOTE_RETRY_BASE = 60
+REMOTE_RETRY_MAX_DELAY = 3600
+REMOTE_RETRY_MAX_ATTEMPTS = int(os.environ.get("REMOTE_RETRY_MAX_ATTEMPTS", "24"))
+REMOTE_ACTION_COMPLETE = "complete"
+# "已完成"回复后的飞书同步结果通知：failures = 仅失败时追加回复，always = 总是回复，never = 只记日志
+REMOTE_CONFIRM_REPLY = os.environ.get("REMOTE_CONFIRM_REPLY", "failures").strip().lower()
+
+# 月初批量创建任务的最大并发数
+TASK_CREATE_CONCURRENCY = max(1, int(os.environ.get("TASK_CREATE_CONCURRENCY", "8")))
+# 单个任务的创建尝试上限（含整点补建）；达到上限后不再补建，避免配置错误（如无效的负责人）导致无限重试
+TASK_CREATE_MAX_ATTEMPTS = max(1, int(os.environ.get("TASK_CREATE_MAX_ATTEMPTS", "5")))
+
+# 出站消息发送协程数（定时播报与交互回复经持久化队列异步发送）
+OUTBOX_WORKERS = max(1, int(os.environ.get("OUTBOX_WORKERS", "4")))
+
+# 图片 image_key 缓存（按图片内容哈希，相同图表不重复上传）
+IMAGE_KEY_CACHE_TTL = float(os.environ.get("IMAGE_KEY_CACHE_TTL", str(30 * 86400)))
+IMAGE_KEY_CACHE_SIZE = int(os.environ.get("IMAGE_KEY_CACHE_SIZE", "256"))
+# 图表渲染缓存条目数（统计未变化时复用已生成的图表文件）
+RENDER_CACHE_SIZE = int(os.environ.get("RENDER_CACHE_SIZE", "32"))
+
+# 图表依赖预热：启动后延迟若干秒启动渲染进程并加载图表库，首个图表请求无需等待导入
+CHART_PREWARM = os.environ.get("CHART_PREWARM", "true").lower() == "true"
+CHART_PREWARM_DELAY = float(os.environ.get("CHART_PREWARM_DELAY", "5"))
+# 图表渲染进程池：进程数（即并发渲染上限）、单次渲染超时（秒）、每个进程的内存上限（MB，0 为不限制）
+CHART_RENDER_WORKERS = max(1, int(os.environ.get("CHART_RENDER_WORKERS", "2")))
+CHART_RENDER_TIMEOUT = float(os.environ.get("CHART_RENDER_TIMEOUT", "120"))
+CHART_RENDER_MEMORY_MB = int(os.environ.get("CHART_RENDER_MEMORY_MB", "2048"))
+# 图表渲染配置（card 卡片预览 / full 全尺寸 / print 打印），决定 DPI、像素宽度与图片字节预算；未知配置按 card 渲染
+CHART_PROFILE = os.environ.get("CHART_PROFILE", DEFAULT_PROFILE).strip().lower()
+# 图表在内存中生成并直接上传；开启后另在后台把每张新图表写入 charts/ 目录备查
+CHART_PERSIST = os.environ.get("CHART_PERSIST", "false").lower() == "true"
+
+# 任务统计写入合并窗口（秒）：窗口内的多次状态变化合并为一次落盘
+STATS_WRITE_WINDOW = float(os.environ.get("STATS_WRITE_WINDOW", "1.0"))
+
 # 文件路径
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 TASKS_FILE = os.path.join(BASE_DIR, "tasks.yaml")
 CREATED_TASKS_FILE = os.path.join(BASE_DIR, "created_tasks.json")
 TASK_STATS_FILE = os.path.join(BASE_DIR, "task_stats.json")
+TASK_STATS_DB = os.path.join(BASE_DIR, "task_stats.db")
+ARCHIVE_DIR = os.path.join(BASE_DIR, "archives")
+OUTBOX_DB = os.path.join(BASE_DIR, "message_outbox.db")
+IMAGE_KEY_CACHE_FILE = os.path.join(BASE_DIR, "image_key_cache.json")
+CHART_DIR = os.path.join(BASE_DIR, "charts")
+
+def setup_process_output() -> None:
+    """进程级初始化（标准输出编码、启动横幅、日志文件），只在作为主程序运行时执行；
+    被测试或其他进程导入时不产生这些副作用"""
+    # 强制设置标准输出编码为 UTF-8
+    if sys.stdout.encoding != 'utf-8':
+        try:
+            sys.stdout = open(sys.stdout.fileno(), mode='w', encoding='utf-8', buffering=1)
+        except Exception:
+            pass
 
-# 日志配置
-logging.basicConfig(
-    level=getattr(logging, LOG_LEVEL),
-    format="%(asctime)s %(levelname)s %(message)s",
-    handlers=[
-        logging.FileHandler("monthly_report_bot_final.log", encoding="utf-8"),
-        logging.StreamHandler()
-    ]
-)
+    print("="*60)
+    print("月报机器人 v1.3 交互增强版 - 核心功能 + Echo")
+    print("Python 版本:", sys.version)
+    print("当前工作目录:", os.getcwd())
+    print("="*60)
+
+    # 日志配置
+    logging.basicConfig(
+        level=getattr(logging, LOG_LEVEL),
+        format="%(asctime)s %(levelname)s %(message)s",
+        handlers=[
+            logging.FileHandler("monthly_report_bot_final.log", encoding="utf-8"),
+            logging.StreamHandler()
+        ]
+    )
 
 # 过滤飞书SDK推送但未注册处理器的 application.* 事件噪声（降级并丢弃原错误）
 class _LarkProcessorNotFoundFilter(logging.Filter):
@@ -117,6 +213,19 @@ logger = logging.getLogger(__name__)
 
 # 全局变量
 lark_client = None
+_feishu_scheduler: Optional[FeishuRequestScheduler] = None
+_stats_store: Optional[TaskStatsStore] = None
+_stats_archive: Optional[StatsArchive] = None
+_stats_writer: Optional[DebouncedStatsWriter] = None
+_task_update_handler: Optional[TaskUpdateHandler] = None
+_message_outbox: Optional[MessageOutbox] = None
+_image_key_cache: Optional[ImageKeyCache] = None
+_chart_render_service: Optional[ChartRenderService] = None
+_chart_rendering_available: Optional[bool] = None
+_task_events_registered = False
+_task_event_last_at = 0.0  # 最近一次收到任务变更事件的 time.monotonic()，0 表示尚未收到
+_task_events_was_active = False
+_background_tasks: Set["asyncio.Task"] = set()
 
 # ---------------------- 环境变量验证 ----------------------
 
@@ -154,67 +263,164 @@ def init_lark_client() -> bool:
         logger.error("飞书SDK客户端初始化失败: %s", e)
         return False
 
+def get_feishu_scheduler() -> FeishuRequestScheduler:
+    """全局飞书请求调度器（按接口族令牌桶限流，交互回复优先）"""
+    global _feishu_scheduler
+    if _feishu_scheduler is None:
+        _feishu_scheduler = FeishuRequestScheduler(
+            FEISHU_RATE_LIMITS,
+            retry_policy=RetryPolicy(retries=FEISHU_RETRIES),
+            breaker_factory=lambda family: CircuitBreaker(
+                family, failure_threshold=FEISHU_BREAKER_THRESHOLD, reset_timeout=FEISHU_BREAKER_RESET,
+            ),
+        )
+    return _feishu_scheduler
+
+def feishu_api(priority: int = PRIORITY_BACKGROUND) -> ScheduledClient:
+    """经调度器限流的 lark_client（调用方式与 lark_client 相同）"""
+    return ScheduledClient(lark_client, get_feishu_scheduler(), priority)
+
 # ---------------------- 任务统计管理 ----------------------
 
+def get_stats_store() -> TaskStatsStore:
+    """获取任务统计存储（首次调用时打开数据库，并从旧版 task_stats.json 迁移）"""
+    global _stats_store
+    if _stats_store is None:
+        _stats_store = TaskStatsStore(TASK_STATS_DB, json_path=TASK_STATS_FILE, tz=TZ)
+        # 启动自检：数据库损坏或与事件日志不一致时由快照 + 事件重放恢复
+        _stats_store.check_and_recover()
+    return _stats_store
+
+def get_stats_writer() -> DebouncedStatsWriter:
+    """获取防抖统计写入器（main() 中启动后台任务；未启动时直接同步写入）"""
+    global _stats_writer
+    if _stats_writer is None:
+        _stats_writer = DebouncedStatsWriter(get_stats_store(), window=STATS_WRITE_WINDOW)
+    return _stats_writer
+
+def get_task_update_handler() -> TaskUpdateHandler:
+    """获取任务变更事件处理器（完成/取消完成直接写入统计，其他变更按单个任务确认）"""
+    global _task_update_handler
+    if _task_update_handler is None:
+        _task_update_handler = TaskUpdateHandler(
+            get_stats_store(), get_stats_writer(), verify=fetch_task_status_from_feishu,
+        )
+    return _task_update_handler
+
+def get_message_outbox() -> MessageOutbox:
+    """获取出站消息队列（main() 中启动发送协程池；未启动时各发送函数直接发送）"""
+    global _message_outbox
+    if _message_outbox is None:
+        _message_outbox = MessageOutbox(OutboxStore(OUTBOX_DB), deliver_outbound, workers=OUTBOX_WORKERS)
+    return _message_outbox
+
+def get_image_key_cache() -> ImageKeyCache:
+    """获取图片 image_key 缓存（内容哈希 -> image_key，持久化到本地文件）"""
+    global _image_key_cache
+    if _image_key_cache is None:
+        _image_key_cache = ImageKeyCache(IMAGE_KEY_CACHE_FILE, ttl=IMAGE_KEY_CACHE_TTL,
+                                         max_entries=IMAGE_KEY_CACHE_SIZE)
+    return _image_key_cache
+
+def chart_rendering_available() -> bool:
+    """图表依赖是否已安装（只检查一次，不在机器人进程中导入图表库）"""
+    global _chart_rendering_available
+    if _chart_rendering_available is None:
+        _chart_rendering_available = chart_dependencies_available()
+        if not _chart_rendering_available:
+            logger.warning("图表依赖不可用，图表功能关闭")
+    return _chart_rendering_available
+
+def get_chart_render_service() -> ChartRenderService:
+    """获取图表渲染进程池（渲染在子进程中进行，不阻塞事件循环）"""
+    global _chart_render_service
+    if _chart_render_service is None:
+        _chart_render_service = ChartRenderService(
+            workers=CHART_RENDER_WORKERS, timeout=CHART_RENDER_TIMEOUT, memory_limit_mb=CHART_RENDER_MEMORY_MB,
+        )
+    return _chart_render_service
+
+async def prewarm_chart_renderer(delay: float = CHART_PREWARM_DELAY) -> None:
+    """启动完成后预先启动渲染进程并加载图表库"""
+    await asyncio.sleep(delay)
+    if chart_rendering_available():
+        try:
+            await get_chart_render_service().start()
+        except Exception as e:
+            logger.warning("图表渲染进程预热失败: %s", e)
+
+def get_stats_archive() -> StatsArchive:
+    """获取多月份统计归档"""
+    global _stats_archive
+    if _stats_archive is None:
+        _stats_archive = StatsArchive(ARCHIVE_DIR)
+    return _stats_archive
+
+def maybe_compact_task_stats() -> None:
+    """事件日志累积到阈值时生成快照并压缩（同时原子导出 task_stats.json）"""
+    try:
+        store = get_stats_store()
+        if store.events_since_snapshot() >= STATS_COMPACT_EVENTS:
+            store.compact()
+    except Exception as e:
+        logger.error("压缩任务事件日志失败: %s", e)
+
+def _empty_task_stats(current_month: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "current_month": current_month or datetime.now(TZ).strftime("%Y-%m"),
+        "tasks": {},
+        "total_tasks": 0,
+        "completed_tasks": 0,
+        "completion_rate": 0.0,
+        "last_update": datetime.now(TZ).isoformat()
+    }
+
 def load_task_stats() -> Dict[str, Any]:
     """加载任务统计信息"""
     try:
-        if os.path.exists(TASK_STATS_FILE):
-            with open(TASK_STATS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {
-            "current_month": datetime.now(TZ).strftime("%Y-%m"),
-            "tasks": {},
-            "total_tasks": 0,
-            "completed_tasks": 0,
-            "completion_rate": 0.0,
-            "last_update": datetime.now(TZ).isoformat()
-        }
+        return get_stats_store().load()
     except Exception as e:
         logger.error("加载任务统计失败: %s", e)
-        return {
-            "current_month": datetime.now(TZ).strftime("%Y-%m"),
-            "tasks": {},
-            "total_tasks": 0,
-            "completed_tasks": 0,
-            "completion_rate": 0.0,
-            "last_update": datetime.now(TZ).isoformat()
-        }
+        return _empty_task_stats()
 
 def save_task_stats(stats: Dict[str, Any]) -> None:
-    """保存任务统计信息"""
+    """保存任务统计信息（整体替换，单任务更新请使用存储的行级接口）"""
     try:
-        stats["last_update"] = datetime.now(TZ).isoformat()
-        with open(TASK_STATS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(stats, f, ensure_ascii=False, indent=2)
+        # 先写入排队中的变更，保证整体替换在其之后生效
+        get_stats_writer().flush_sync()
+        get_stats_store().save(stats)
     except Exception as e:
         logger.error("保存任务统计失败: %s", e)
 
 async def check_task_status_from_feishu(task_id: str) -> bool:
-    """从飞书API检查任务实际完成状态"""
+    """从飞书API检查任务实际完成状态（查询失败按未完成处理）"""
+    return bool(await fetch_task_status_from_feishu(task_id))
+
+async def fetch_task_status_from_feishu(task_id: str) -> Optional[bool]:
+    """从飞书API查询任务完成状态，查询失败返回 None（区别于“进行中”）"""
     try:
         if not lark_client:
             logger.warning("飞书客户端未初始化，无法检查任务状态")
-            return False
+            return None
         
         request = GetTaskRequest.builder() \
             .task_guid(task_id) \
             .build()
         
-        response = await lark_client.task.v2.task.aget(request)
+        response = await feishu_api(PRIORITY_BACKGROUND).task.v2.task.aget(request)
         
         if response.success():
             task = response.data.task
-            is_completed = task.complete == 2
+            is_completed = is_task_completed(task)
             logger.info("任务状态检查: %s -> %s", task_id, "已完成" if is_completed else "进行中")
             return is_completed
         else:
             logger.warning("查询任务状态失败: %s, code: %s", task_id, response.code)
-            return False
+            return None
             
     except Exception as e:
         logger.error("检查任务状态异常: %s, task_id: %s", e, task_id)
-        return False
+        return None
 
 async def complete_task_on_feishu(task_id: str) -> bool:
     """调用飞书API将任务标记为完成（设置completed_at时间戳）"""
@@ -234,7 +440,7 @@ async def complete_task_on_feishu(task_id: str) -> bool:
                         .build()) \
             .build()
 
-        response = await lark_client.task.v2.task.apatch(request)
+        response = await feishu_api(PRIORITY_INTERACTIVE).task.v2.task.apatch(request)
 
         if response.success():
             logger.info("✅ 飞书任务已标记完成: %s", task_id)
@@ -247,100 +453,293 @@ async def complete_task_on_feishu(task_id: str) -> bool:
         logger.error("飞书任务完成异常: %s, task_id: %s", e, task_id)
         return False
 
+def ensure_stats_month(current_month: str) -> None:
+    """月份切换：上月数据（含排队中的变更）先写入归档，再重置"""
+    store = get_stats_store()
+    if store.current_month() != current_month:
+        get_stats_writer().flush_sync()
+        get_stats_archive().archive_and_reset(store, current_month)
+
 def update_task_completion(task_id: str, task_title: str, assignees: List[str], completed: bool = True, task_type: str = "月报") -> None:
     """更新任务完成状态"""
     try:
-        stats = load_task_stats()
-        current_month = datetime.now(TZ).strftime("%Y-%m")
+        writer = get_stats_writer()
+        ensure_stats_month(datetime.now(TZ).strftime("%Y-%m"))
 
-        if stats["current_month"] != current_month:
-            stats = {
-                "current_month": current_month,
-                "tasks": {},
-                "total_tasks": 0,
-                "completed_tasks": 0,
-                "completion_rate": 0.0,
-                "last_update": datetime.now(TZ).isoformat()
-            }
+        writer.upsert_task(task_id, task_title, assignees, task_type=task_type)
+        if completed:
+            writer.set_completed(task_id, True)
 
-        if task_id not in stats["tasks"]:
-            stats["tasks"][task_id] = {
-                "title": task_title,
-                "assignees": assignees,
-                "task_type": task_type,
-                "created_at": datetime.now(TZ).isoformat(),
-                "completed": False,
-                "completed_at": None
-            }
-            stats["total_tasks"] += 1
-        
-        if completed and not stats["tasks"][task_id]["completed"]:
-            stats["tasks"][task_id]["completed"] = True
-            stats["tasks"][task_id]["completed_at"] = datetime.now(TZ).isoformat()
-            stats["completed_tasks"] += 1
-        
-        if stats["total_tasks"] > 0:
-            stats["completion_rate"] = round(stats["completed_tasks"] / stats["total_tasks"] * 100, 2)
-        
-        save_task_stats(stats)
         logger.info("任务完成状态更新: %s -> %s", task_title, "已完成" if completed else "未完成")
         
     except Exception as e:
         logger.error("更新任务完成状态失败: %s", e)
 
-async def sync_task_completion_status() -> None:
-    """同步所有任务的完成状态（从飞书API获取真实状态）"""
-    try:
-        stats = load_task_stats()
-        if not stats["tasks"]:
-            logger.info("没有任务需要同步状态")
-            return
-        
-        logger.info("开始同步任务完成状态...")
-        updated_count = 0
-        
-        for task_id, task_info in stats["tasks"].items():
-            try:
-                is_completed = await check_task_status_from_feishu(task_id)
-                if is_completed != task_info["completed"]:
-                    if is_completed:
-                        stats["tasks"][task_id]["completed"] = True
-                        stats["tasks"][task_id]["completed_at"] = datetime.now(TZ).isoformat()
-                        logger.info("任务标记为已完成: %s", task_info["title"])
-                    else:
-                        if task_info["completed"]:
-                            logger.info("保留本地已完成状态，不因远端未完成/查询失败而降级: %s", task_info["title"])
-                            continue
-                        stats["tasks"][task_id]["completed"] = False
-                        stats["tasks"][task_id]["completed_at"] = None
-                        logger.info("任务保持未完成: %s", task_info["title"])
-                    updated_count += 1
-            except Exception as e:
-                logger.error("同步任务状态失败: %s, task_id: %s", e, task_id)
-        
-        stats["total_tasks"] = len(stats["tasks"])
-        stats["completed_tasks"] = sum(1 for task in stats["tasks"].values() if task.get("completed", False))
-        if stats["total_tasks"] > 0:
-            stats["completion_rate"] = round(stats["completed_tasks"] / stats["total_tasks"] * 100, 2)
+def record_task_event_received(now: Optional[float] = None) -> None:
+    """收到任务变更事件（WS线程调用）：证明长连接与事件订阅都在工作"""
+    global _task_event_last_at
+    _task_event_last_at = time.monotonic() if now is None else now
+
+def task_events_active(now: Optional[float] = None) -> bool:
+    """任务变更事件是否在实时更新完成状态
+
+    注册处理器时长连接可能尚未建立、卡在重连，或应用没有订阅 task.task.updated_v1，
+    因此只有收到过事件、且最近 TASK_EVENTS_STALE_AFTER 秒内仍有事件时才算生效。
+    """
+    global _task_events_was_active
+    now = time.monotonic() if now is None else now
+    active = _task_events_registered and _task_event_last_at > 0 and \
+        now - _task_event_last_at < TASK_EVENTS_STALE_AFTER
+    if active != _task_events_was_active:
+        _task_events_was_active = active
+        if active:
+            logger.info("已收到任务变更事件，完成状态轮询降为每 %d 秒对账", TASK_RECONCILE_INTERVAL)
+        elif _task_events_registered:
+            logger.warning("超过 %d 秒未收到任务变更事件（长连接或事件订阅可能失效），恢复按截止日程轮询",
+                           TASK_EVENTS_STALE_AFTER)
         else:
-            stats["completion_rate"] = 0.0
+            logger.warning("任务变更事件长连接已断开，恢复按截止日程轮询")
+    return active
+
+def task_poll_interval(now: Optional[datetime] = None) -> float:
+    """未完成任务的飞书查询间隔（秒）：月初稀疏，越接近23日截止越频繁
+
+    任务变更事件已连接时，完成状态由事件实时写入，轮询只做低频对账。
+    """
+    if now is None:
+        now = datetime.now(TZ)
+    if now.day > 23:
+        # 截止后仍跟进补交，但无需频繁查询
+        interval = TASK_POLL_AFTER_DEADLINE
+    else:
+        days_left = 23 - now.day
+        interval = next(
+            (value for max_days_left, value in TASK_POLL_SCHEDULE if days_left <= max_days_left),
+            TASK_POLL_EARLY,
+        )
+    if task_events_active():
+        return max(interval, TASK_RECONCILE_INTERVAL)
+    return interval
+
+def tasklist_name(month: str) -> str:
+    return TASKLIST_NAME_TEMPLATE.format(month=month, group=TASKLIST_GROUP[-8:] or "default")
+
+async def ensure_month_tasklist(month: str) -> Optional[str]:
+    """获取（或创建/复用）某月本群的任务清单 guid，结果记入统计存储"""
+    if not TASKLIST_ENABLED or not lark_client:
+        return None
+    store = get_stats_store()
+    guid = store.tasklist_guid(month, TASKLIST_GROUP)
+    if guid:
+        return guid
+    guid = await ensure_tasklist(feishu_api(PRIORITY_BACKGROUND), tasklist_name(month),
+                                 client_token=tasklist_client_token(month, TASKLIST_GROUP))
+    if guid:
+        store.set_tasklist_guid(month, TASKLIST_GROUP, guid)
+    return guid
+
+async def _sync_completions_via_listing(store: TaskStatsStore, writer: DebouncedStatsWriter,
+                                        now: datetime, summary: Dict[str, Any],
+                                        tasklist_guid: Optional[str] = None) -> bool:
+    """分页列出已完成任务，与本地未完成任务一次比对（ceil(N/100) 次请求），失败返回 False
+
+    有本月任务清单时只翻页该清单；否则用 ListTaskRequest 并按 updated_at 水位线增量拉取。
+    """
+    if not lark_client:
+        return False
+    cursor = None
+    listing_started_ms = int(now.timestamp() * 1000)
+    if tasklist_guid:
+        remote = await list_tasklist_tasks_paginated(feishu_api(PRIORITY_BACKGROUND), tasklist_guid, completed=True)
+    else:
+        cursor = store.sync_cursor("task_list")
+        remote = await list_tasks_paginated(
+            feishu_api(PRIORITY_BACKGROUND),
+            completed=True,
+            updated_after_ms=int(cursor) if cursor else None,
+        )
+    if remote is None:
+        return False
+
+    local_pending = store.pending_tasks()
+    changes = diff_completions(local_pending, remote, tz=TZ)
+    for task_id, completed_at in changes.items():
+        writer.set_completed(task_id, True, completed_at=completed_at, source="sync")
+        logger.info("任务标记为已完成: %s", local_pending[task_id]["title"])
+
+    # 列表覆盖全部任务：所有本地未完成任务本轮都视为已查询
+    store.mark_checked(list(local_pending), now.timestamp(), task_poll_interval(now))
+    if not tasklist_guid:
+        store.set_sync_cursor("task_list", str(listing_started_ms - TASK_LIST_WATERMARK_SKEW_MS))
+    summary.update({
+        "mode": "tasklist" if tasklist_guid else "list",
+        "listed": len(remote),
+        "checked": len(local_pending),
+        "updated": len(changes),
+    })
+    return True
+
+async def sync_task_completion_status(max_age: Optional[float] = None) -> Dict[str, Any]:
+    """同步未完成任务的完成状态（从飞书API获取真实状态）
+
+    已完成的任务不会再变回未完成，直接跳过；未完成任务按 task_poll_interval
+    记录的下次查询时间轮询。max_age 用于播报前限制数据陈旧度。
+    查询以 SYNC_CONCURRENCY 为上限并发执行，结果汇总后一次性写入。
+
+    Returns:
+        本轮汇总 {"due", "checked", "updated", "failed", "duration_ms"}
+    """
+    started = time.monotonic()
+    summary: Dict[str, Any] = {"due": 0, "checked": 0, "updated": 0, "failed": 0, "duration_ms": 0}
+    try:
+        store = get_stats_store()
+        writer = get_stats_writer()
+        now = datetime.now(TZ)
+        checked_at = now.timestamp()
+        if max_age is not None and task_events_active():
+            # 事件已实时更新完成状态，播报前无需强制刷新
+            max_age = max(max_age, TASK_RECONCILE_INTERVAL)
+        # 留出少量余量，避免整点调度的微小抖动让任务被推迟一整轮
+        due = store.due_for_check(checked_at + TASK_POLL_SLACK, max_age=max_age)
+        # 用户刚标记完成、尚未落盘的任务无需再查
+        due = {task_id: info for task_id, info in due.items() if writer.queued_completion(task_id) is not True}
+        summary["due"] = len(due)
+        if not due:
+            logger.info("没有到期需要同步状态的任务")
+            return summary
         
-        if updated_count > 0:
-            save_task_stats(stats)
-            logger.info("任务状态同步完成，更新了 %d 个任务", updated_count)
-        else:
-            logger.info("任务状态同步完成，无需更新")
+        tasklist_guid = None
+        if TASK_SYNC_MODE != "get" and store.current_month():
+            tasklist_guid = store.tasklist_guid(store.current_month(), TASKLIST_GROUP)
+        if tasklist_guid or TASK_SYNC_MODE == "list":
+            listed = await _sync_completions_via_listing(store, writer, now, summary, tasklist_guid)
+            if listed:
+                summary["duration_ms"] = int((time.monotonic() - started) * 1000)
+                writer.record_event(EVENT_SYNC, dict(summary))
+                logger.info(
+                    "任务状态同步完成（分页）: 到期 %d, 列出 %d, 更新 %d, 耗时 %dms",
+                    summary["due"], summary["listed"], summary["updated"], summary["duration_ms"],
+                )
+                return summary
+            logger.warning("分页同步失败，回退为逐个查询")
+
+        logger.info("开始同步任务完成状态（到期 %d 个，并发 %d）...", len(due), SYNC_CONCURRENCY)
+        semaphore = asyncio.Semaphore(SYNC_CONCURRENCY)
+
+        async def _fetch(task_id: str) -> Optional[bool]:
+            async with semaphore:
+                try:
+                    return await fetch_task_status_from_feishu(task_id)
+                except Exception as e:
+                    logger.error("同步任务状态失败: %s, task_id: %s", e, task_id)
+                    return None
+
+        results = await asyncio.gather(*(_fetch(task_id) for task_id in due))
+
+        # 汇总合并：完成状态交给写入器一次提交；查询失败的任务不记录查询时间，下轮重试
+        checked_ids = []
+        for (task_id, task_info), is_completed in zip(due.items(), results):
+            if is_completed is None:
+                summary["failed"] += 1
+                continue
+            checked_ids.append(task_id)
+            if is_completed:
+                writer.set_completed(task_id, True, source="sync")
+                logger.info("任务标记为已完成: %s", task_info["title"])
+                summary["updated"] += 1
+        summary["checked"] = len(checked_ids)
+        summary["duration_ms"] = int((time.monotonic() - started) * 1000)
+
+        store.mark_checked(checked_ids, checked_at, task_poll_interval(now))
+        writer.record_event(EVENT_SYNC, dict(summary))
+
+        logger.info(
+            "任务状态同步完成: 到期 %d, 查询成功 %d, 更新 %d, 失败 %d, 耗时 %dms",
+            summary["due"], summary["checked"], summary["updated"], summary["failed"], summary["duration_ms"],
+        )
+        return summary
             
     except Exception as e:
         logger.error("同步任务完成状态失败: %s", e)
+        return summary
+    finally:
+        # 本轮同步的全部变更（及排队中的用户变更）合并为一次事务写入；
+        # 定时播报前都会先同步，因此播报读取到的是已落盘的数据
+        try:
+            await get_stats_writer().flush()
+        except Exception as e:
+            logger.error("写入任务统计失败: %s", e)
+
+# ---------------------- 只读统计（进程内缓存） ----------------------
+
+def _load_stats_for_cache() -> Dict[str, Any]:
+    return get_stats_store().load()
+
+def _stats_version() -> Any:
+    return get_stats_store().version()
+
+# 解析后的统计与派生聚合结果；本进程写入或外部脚本提交后自动失效
+_stats_cache = VersionedCache(_load_stats_for_cache, _stats_version, name="task_stats")
+# 已渲染图表；键中的统计指纹随 _stats_cache 版本重新计算
+_render_cache = RenderCache(max_entries=RENDER_CACHE_SIZE)
+
+def _compute_type_stats(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """按任务类型分组统计：读取存储维护的计数器与索引，不遍历全部任务"""
+    store = get_stats_store()
+    type_stats: Dict[str, Any] = {}
+    for ttype, counts in store.type_counts().items():
+        ts = {"total": counts["total"], "completed": counts["completed"]}
+        ts["pending"] = ts["total"] - ts["completed"]
+        ts["completion_rate"] = round(ts["completed"] / ts["total"] * 100, 2) if ts["total"] > 0 else 0.0
+        ts["pending_assignees"] = store.pending_assignees(ttype) if ts["pending"] > 0 else []
+        type_stats[ttype] = ts
+    return type_stats
+
+def _compute_completion_stats(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """由完整统计数据计算完成情况汇总（结果随缓存版本复用）"""
+    pending_tasks = stats["total_tasks"] - stats["completed_tasks"]
+    pending_assignees = get_stats_store().pending_assignees() if pending_tasks > 0 else []
+
+    return {
+        "current_month": stats["current_month"],
+        "total_tasks": stats["total_tasks"],
+        "completed_tasks": stats["completed_tasks"],
+        "completion_rate": stats["completion_rate"],
+        "pending_tasks": pending_tasks,
+        "pending_assignees": pending_assignees,
+        "type_stats": _stats_cache.derive("type_stats", _compute_type_stats),
+        "tasks": stats.get("tasks", {})
+    }
+
+def _pending_task_entry(task_id: str, task_info: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "task_id": task_id,
+        "title": task_info["title"],
+        "assignees": task_info["assignees"],
+        "task_type": task_info.get("task_type", "月报")
+    }
+
+def _compute_pending_tasks(stats: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        _pending_task_entry(task_id, task_info)
+        for task_id, task_info in stats["tasks"].items()
+        if not task_info["completed"]
+    ]
+
+def _compute_completed_assignees(stats: Dict[str, Any]) -> Dict[str, int]:
+    return {
+        assignee: counts["completed"]
+        for assignee, counts in get_stats_store().assignee_counts().items()
+        if counts["completed"] > 0
+    }
 
 def get_task_completion_stats() -> Dict[str, Any]:
-    """获取任务完成统计"""
+    """获取任务完成统计（结果只读，数据未变化时不访问磁盘）"""
     try:
-        stats = load_task_stats()
         current_month = datetime.now(TZ).strftime("%Y-%m")
-        
-        if stats["current_month"] != current_month:
+        completion_stats = _stats_cache.derive("completion_stats", _compute_completion_stats)
+
+        if completion_stats["current_month"] != current_month:
             return {
                 "current_month": current_month,
                 "total_tasks": 0,
@@ -350,41 +749,8 @@ def get_task_completion_stats() -> Dict[str, Any]:
                 "pending_assignees": [],
                 "tasks": {}
             }
-        
-        pending_tasks = stats["total_tasks"] - stats["completed_tasks"]
-        
-        pending_assignees = []
-        for task_id, task_info in stats["tasks"].items():
-            if not task_info["completed"]:
-                pending_assignees.extend(task_info["assignees"])
-        pending_assignees = list(set(pending_assignees))
-        
-        # 按任务类型分组统计
-        type_stats: Dict[str, Any] = {}
-        for task_info in stats["tasks"].values():
-            ttype = task_info.get("task_type", "月报")
-            if ttype not in type_stats:
-                type_stats[ttype] = {"total": 0, "completed": 0, "pending_assignees": []}
-            type_stats[ttype]["total"] += 1
-            if task_info["completed"]:
-                type_stats[ttype]["completed"] += 1
-            else:
-                type_stats[ttype]["pending_assignees"].extend(task_info["assignees"])
-        for ttype, ts in type_stats.items():
-            ts["pending"] = ts["total"] - ts["completed"]
-            ts["completion_rate"] = round(ts["completed"] / ts["total"] * 100, 2) if ts["total"] > 0 else 0.0
-            ts["pending_assignees"] = list(set(ts["pending_assignees"]))
 
-        return {
-            "current_month": stats["current_month"],
-            "total_tasks": stats["total_tasks"],
-            "completed_tasks": stats["completed_tasks"],
-            "completion_rate": stats["completion_rate"],
-            "pending_tasks": pending_tasks,
-            "pending_assignees": pending_assignees,
-            "type_stats": type_stats,
-            "tasks": stats.get("tasks", {})
-        }
+        return completion_stats
 
     except Exception as e:
         logger.error("获取任务完成统计失败: %s", e)
@@ -400,39 +766,38 @@ def get_task_completion_stats() -> Dict[str, Any]:
         }
 
 def get_pending_tasks_detail(task_type: Optional[str] = None) -> List[Dict[str, Any]]:
-    """获取未完成任务的详细信息，可按任务类型过滤"""
+    """获取未完成任务的详细信息，可按任务类型过滤（按类型时走类型索引）"""
     try:
-        stats = load_task_stats()
-        pending_tasks = []
+        if task_type is None:
+            return list(_stats_cache.derive("pending_tasks", _compute_pending_tasks))
 
-        for task_id, task_info in stats["tasks"].items():
-            if not task_info["completed"]:
-                if task_type is None or task_info.get("task_type", "月报") == task_type:
-                    pending_tasks.append({
-                        "task_id": task_id,
-                        "title": task_info["title"],
-                        "assignees": task_info["assignees"],
-                        "task_type": task_info.get("task_type", "月报")
-                    })
+        def _by_type(_stats: Dict[str, Any]) -> List[Dict[str, Any]]:
+            tasks = get_stats_store().tasks_by_type(task_type, pending_only=True)
+            return [_pending_task_entry(task_id, task_info) for task_id, task_info in tasks.items()]
 
-        return pending_tasks
+        return list(_stats_cache.derive(f"pending_tasks:type:{task_type}", _by_type))
 
     except Exception as e:
         logger.error("获取未完成任务详情失败: %s", e)
         return []
 
-def get_completed_assignees_summary() -> Dict[str, int]:
-    """获取已完成任务的人员统计（每个人完成了多少个任务）"""
+def get_user_pending_tasks(user_id: str) -> List[Dict[str, Any]]:
+    """获取某负责人的未完成任务（走负责人索引，代价与其任务数成正比）"""
     try:
-        stats = load_task_stats()
-        completed_counts = {}
+        def _by_assignee(_stats: Dict[str, Any]) -> List[Dict[str, Any]]:
+            tasks = get_stats_store().tasks_for_assignee(user_id, pending_only=True)
+            return [_pending_task_entry(task_id, task_info) for task_id, task_info in tasks.items()]
 
-        for task_id, task_info in stats["tasks"].items():
-            if task_info["completed"]:
-                for assignee in task_info["assignees"]:
-                    completed_counts[assignee] = completed_counts.get(assignee, 0) + 1
+        return list(_stats_cache.derive(f"pending_tasks:assignee:{user_id}", _by_assignee))
+
+    except Exception as e:
+        logger.error("获取用户未完成任务失败: %s", e)
+        return []
 
-        return completed_counts
+def get_completed_assignees_summary() -> Dict[str, int]:
+    """获取已完成任务的人员统计（每个人完成了多少个任务）"""
+    try:
+        return dict(_stats_cache.derive("completed_assignees", _compute_completed_assignees))
 
     except Exception as e:
         logger.error("获取已完成人员统计失败: %s", e)
@@ -737,8 +1102,8 @@ def build_daily_stats_card(stats: Dict) -> Dict:
         ]
     }
 
-def build_final_stats_card() -> Dict:
-    """构建最终统计卡片"""
+def build_final_stats_card(chart: Optional[ChartImage] = None) -> Dict:
+    """构建最终统计卡片（chart 为已生成的仪表板图表）"""
     stats = get_task_completion_stats()
     
     progress_width = min(int(stats['completion_rate'] / 10), 10)
@@ -753,15 +1118,9 @@ def build_final_stats_card() -> Dict:
     else:
         summary = "❌ **任务完成情况较差，需要改进！**"
     
-    # 尝试生成图表
     chart_info = ""
-    if chart_generator and stats.get('total_tasks', 0) > 0:
-        try:
-            chart_path = chart_generator.generate_comprehensive_dashboard(stats)
-            if chart_path and os.path.exists(chart_path):
-                chart_info = f"\n\n📊 **可视化统计**: 已生成综合仪表板图表"
-        except Exception as e:
-            logger.error(f"生成统计卡片图表失败: {e}")
+    if chart and stats.get('total_tasks', 0) > 0:
+        chart_info = f"\n\n📊 **可视化统计**: 已生成综合仪表板图表"
     
     return {
         "config": {
@@ -810,7 +1169,53 @@ def build_final_stats_card() -> Dict:
 
 # ---------------------- 消息发送函数 ----------------------
 
-async def send_card_to_chat(card: Dict) -> bool:
+async def _send_via_outbox(kind: str, payload: Dict[str, Any], order_key: str, priority: int,
+                           dedup_key: Optional[str] = None) -> bool:
+    """发送协程池运行中时入队后立即返回（去重键重复返回 False）；未启动时直接发送"""
+    if _message_outbox is not None and _message_outbox.running:
+        return _message_outbox.enqueue(kind, payload, order_key, priority=priority, dedup_key=dedup_key)
+    return await deliver_outbound(kind, payload, new_message_uuid())
+
+async def deliver_outbound(kind: str, payload: Dict[str, Any], uuid: str) -> bool:
+    """出站队列的实际发送：uuid 在入队时生成，重发沿用以便飞书去重"""
+    if kind == "card":
+        return await _post_card_to_chat(payload["card"], uuid)
+    if kind == "text":
+        return await _post_text_to_chat(payload["text"], uuid)
+    if kind == "image":
+        image = payload.get("image_key") or payload["image_path"]
+        return await _post_image_to_chat(image, payload.get("title", "图片"), uuid,
+                                         uploaded="image_key" in payload)
+    if kind == "reply":
+        return await _post_reply(payload["message_id"], payload["content"], payload.get("msg_type", "text"), uuid)
+    logger.error("未知的出站消息类型: %s", kind)
+    return False
+
+async def send_card_to_chat(card: Dict, dedup_key: Optional[str] = None) -> bool:
+    """发送卡片到群聊（经出站队列，与其他群消息保持顺序）"""
+    return await _send_via_outbox("card", {"card": card}, CHAT_ID, PRIORITY_BROADCAST, dedup_key)
+
+async def send_text_to_chat(text: str, dedup_key: Optional[str] = None) -> bool:
+    """发送文本消息到群聊（经出站队列）"""
+    return await _send_via_outbox("text", {"text": text}, CHAT_ID, PRIORITY_BROADCAST, dedup_key)
+
+async def send_image_to_chat(image: Union[str, ChartImage], title: str = "图片",
+                             dedup_key: Optional[str] = None) -> bool:
+    """发送图片到群聊（经出站队列）
+
+    图片文件在发送时再上传；内存中的图片先上传，队列中只保存 image_key（重启后仍可发送）。
+    """
+    if isinstance(image, str):
+        payload = {"image_path": image, "title": title}
+    else:
+        image_key = await upload_image(image, priority=PRIORITY_BROADCAST)
+        if not image_key:
+            logger.error("图片上传失败，无法发送")
+            return False
+        payload = {"image_key": image_key, "title": title}
+    return await _send_via_outbox("image", payload, CHAT_ID, PRIORITY_BROADCAST, dedup_key)
+
+async def _post_card_to_chat(card: Dict, uuid: Optional[str] = None) -> bool:
     """发送卡片到群聊"""
     try:
         request = CreateMessageRequest.builder() \
@@ -819,10 +1224,11 @@ async def send_card_to_chat(card: Dict) -> bool:
                         .receive_id(CHAT_ID)
                         .msg_type("interactive")
                         .content(json.dumps(card, ensure_ascii=False))
+                        .uuid(uuid or new_message_uuid())
                         .build()) \
             .build()
         
-        response = await lark_client.im.v1.message.acreate(request)
+        response = await feishu_api(PRIORITY_BROADCAST).im.v1.message.acreate(request)
         
         if response.success():
             logger.info("卡片发送成功")
@@ -835,7 +1241,7 @@ async def send_card_to_chat(card: Dict) -> bool:
         logger.error("发送卡片异常: %s", e)
         return False
 
-async def send_text_to_chat(text: str) -> bool:
+async def _post_text_to_chat(text: str, uuid: Optional[str] = None) -> bool:
     """发送文本消息到群聊"""
     try:
         request = CreateMessageRequest.builder() \
@@ -844,10 +1250,11 @@ async def send_text_to_chat(text: str) -> bool:
                         .receive_id(CHAT_ID)
                         .msg_type("text")
                         .content(json.dumps({"text": text}, ensure_ascii=False))
+                        .uuid(uuid or new_message_uuid())
                         .build()) \
             .build()
 
-        response = await lark_client.im.v1.message.acreate(request)
+        response = await feishu_api(PRIORITY_BROADCAST).im.v1.message.acreate(request)
 
         if response.success():
             logger.info("文本消息发送成功: %s", text)
@@ -860,11 +1267,12 @@ async def send_text_to_chat(text: str) -> bool:
         logger.error("发送文本消息异常: %s", e)
         return False
 
-async def send_image_to_chat(image_path: str, title: str = "图片") -> bool:
-    """发送图片到群聊（作为卡片形式）"""
+async def _post_image_to_chat(image: str, title: str = "图片", uuid: Optional[str] = None,
+                              uploaded: bool = False) -> bool:
+    """发送图片到群聊（作为卡片形式）；uploaded 为真时 image 已是 image_key"""
     try:
         # 上传图片获取 image_key
-        image_key = await upload_image(image_path)
+        image_key = image if uploaded else await upload_image(image, priority=PRIORITY_BROADCAST)
 
         if not image_key:
             logger.error("图片上传失败，无法发送")
@@ -895,7 +1303,7 @@ async def send_image_to_chat(image_path: str, title: str = "图片") -> bool:
         }
 
         # 发送卡片
-        return await send_card_to_chat(card)
+        return await _post_card_to_chat(card, uuid)
 
     except Exception as e:
         logger.error("发送图片异常: %s", e)
@@ -903,7 +1311,20 @@ async def send_image_to_chat(image_path: str, title: str = "图片") -> bool:
 
 # ---------------------- 交互增强：回帖与Echo ----------------------
 
-async def reply_to_message(message_id: str, content: str, msg_type: str = "text") -> bool:
+async def reply_to_message(message_id: str, content: Any, msg_type: str = "text") -> bool:
+    """回复指定消息（经出站队列，交互优先；同一消息的多条回复按顺序发送）
+
+    去重键由消息 ID 与回复内容生成，飞书重复推送同一事件时不会重复回复。
+    """
+    digest = hashlib.sha1(
+        json.dumps([msg_type, content], ensure_ascii=False, sort_keys=True).encode("utf-8")
+    ).hexdigest()[:16]
+    return await _send_via_outbox(
+        "reply", {"message_id": message_id, "content": content, "msg_type": msg_type},
+        message_id, PRIORITY_INTERACTIVE, dedup_key=f"reply:{message_id}:{digest}",
+    )
+
+async def _post_reply(message_id: str, content: Any, msg_type: str = "text", uuid: Optional[str] = None) -> bool:
     """回复指定消息（官方SDK areply），默认文本回帖，按需支持卡片"""
     try:
         if not lark_client:
@@ -914,11 +1335,13 @@ async def reply_to_message(message_id: str, content: str, msg_type: str = "text"
             body = ReplyMessageRequestBody.builder() \
                 .msg_type("text") \
                 .content(json.dumps({"text": content}, ensure_ascii=False)) \
+                .uuid(uuid or new_message_uuid()) \
                 .build()
         else:
             body = ReplyMessageRequestBody.builder() \
                 .msg_type("interactive") \
                 .content(json.dumps(content, ensure_ascii=False)) \
+                .uuid(uuid or new_message_uuid()) \
                 .build()
 
         request = ReplyMessageRequest.builder() \
@@ -926,7 +1349,7 @@ async def reply_to_message(message_id: str, content: str, msg_type: str = "text"
             .request_body(body) \
             .build()
 
-        response = await lark_client.im.v1.message.areply(request)
+        response = await feishu_api(PRIORITY_INTERACTIVE).im.v1.message.areply(request)
         if response.code == 0 or getattr(response, "success", lambda: False)():
             logger.info("消息回复成功: %s", str(content)[:50])
             return True
@@ -936,36 +1359,56 @@ async def reply_to_message(message_id: str, content: str, msg_type: str = "text"
         logger.error("回复消息异常: %s", e)
         return False
 
-async def upload_image(image_path: str) -> Optional[str]:
-    """上传图片到飞书，返回image_key"""
+async def upload_image(image: Union[str, ChartImage], priority: int = PRIORITY_INTERACTIVE) -> Optional[str]:
+    """上传图片到飞书，返回image_key（image 为图片文件路径或内存中的图表）"""
     import io
     try:
-        if not os.path.exists(image_path):
-            logger.error("图片文件不存在: %s", image_path)
-            return None
-
-        # 读取图片文件为字节数据
-        with open(image_path, 'rb') as f:
-            image_bytes = f.read()
-
-        # 使用 BytesIO 包装字节数据，模拟文件对象
-        image_file = io.BytesIO(image_bytes)
-        image_file.name = os.path.basename(image_path)
-
-        # 构建请求
-        request = CreateImageRequest.builder() \
-            .request_body(CreateImageRequestBody.builder()
-                        .image_type("message")
-                        .image(image_file)
-                        .build()) \
-            .build()
+        cache = get_image_key_cache()
+        if isinstance(image, str):
+            if not os.path.exists(image):
+                logger.error("图片文件不存在: %s", image)
+                return None
+            digest = cache.file_digest(image)
+            image_bytes = None
+            filename = os.path.basename(image)
+        else:
+            # 内存中的图表：直接使用渲染得到的字节，不经过磁盘
+            digest = content_hash(image.data)
+            image_bytes = image.data
+            filename = image.filename
+
+        # 相同内容的图片已上传过：直接复用 image_key，不再上传
+        cached_key = cache.get(digest)
+        if cached_key:
+            logger.info("图片内容未变化，复用 image_key: %s", cached_key)
+            return cached_key
+
+        if image_bytes is None:
+            # 读取图片文件为字节数据
+            with open(image, 'rb') as f:
+                image_bytes = f.read()
+
+        async def _upload():
+            # 使用 BytesIO 包装字节数据，模拟文件对象（限流重试时重新构建，避免读到已消费的流）
+            image_file = io.BytesIO(image_bytes)
+            image_file.name = filename
+
+            # 构建请求
+            request = CreateImageRequest.builder() \
+                .request_body(CreateImageRequestBody.builder()
+                            .image_type("message")
+                            .image(image_file)
+                            .build()) \
+                .build()
+            return await lark_client.im.v1.image.acreate(request)
 
         # 上传图片
-        response = await lark_client.im.v1.image.acreate(request)
+        response = await get_feishu_scheduler().call("im.image", _upload, priority=priority, idempotent=True)
 
         if response.success():
             image_key = response.data.image_key
             logger.info("图片上传成功, image_key: %s", image_key)
+            cache.put(digest, image_key)
             return image_key
         else:
             logger.error("图片上传失败, code: %s, msg: %s", response.code, response.msg)
@@ -1009,6 +1452,7 @@ _DIRECT_COMMAND_TEXTS = {
     "file", "link",
     "截止", "截止时间", "时间", "时间安排", "提醒", "什么时候", "deadline", "schedule", "plan", "计划",
     "图表", "可视化", "饼图", "统计图", "图表统计", "chart", "visualization", "pie", "dashboard",
+    "趋势", "历史", "趋势图", "历史趋势", "历史统计", "trend", "history",
     "已完成", "完成了", "完成", "我完成", "done", "我完成了", "标记完成", "提交了", "完成啦",
 }
 
@@ -1048,7 +1492,8 @@ def generate_echo_reply(text: str) -> str:
             "• 月报进度 - 查看月报主线（23条）完成情况\n"
             "• 公司重大项目进度 - 查看公司重大项目月报主线（37条）完成情况\n"
             "• 未完成/任务列表 - 查看待完成任务详情\n"
-            "• 图表/可视化 - 生成美观的统计图表\n\n"
+            "• 图表/可视化 - 生成美观的统计图表\n"
+            "• 趋势/历史 - 查看近几个月完成率趋势与排行\n\n"
             "📎 **其他功能：**\n"
             "• 文件/链接 - 获取月报文件地址\n"
             "• 截止/时间 - 查看时间安排\n"
@@ -1176,8 +1621,8 @@ def generate_echo_reply(text: str) -> str:
 
     return friendly_responses[response_index]
 
-def generate_chart_response() -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
-    """生成图表响应，返回 (chart_path, stats) 元组"""
+async def generate_chart_response() -> Tuple[Optional[ChartImage], Optional[Dict[str, Any]]]:
+    """生成图表响应，返回 (图表, stats) 元组"""
     try:
         # 检查是否有任务数据
         created = load_created_tasks()
@@ -1189,15 +1634,15 @@ def generate_chart_response() -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
         if stats.get('total_tasks', 0) == 0:
             return None, None
 
-        # 检查图表生成器是否可用
-        if chart_generator is None:
+        # 检查图表依赖是否可用
+        if not chart_rendering_available():
             return None, None
 
-        # 生成图表
-        chart_path = chart_generator.generate_comprehensive_dashboard(stats)
+        # 生成图表（统计未变化时复用）
+        chart = await render_dashboard_chart()
 
-        if chart_path and os.path.exists(chart_path):
-            return chart_path, stats
+        if chart:
+            return chart, stats
         else:
             return None, None
 
@@ -1205,74 +1650,249 @@ def generate_chart_response() -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
         logger.error(f"生成图表响应失败: {e}")
         return None, None
 
-async def mark_user_tasks_completed(user_id: str) -> Tuple[int, List[str]]:
+def _is_rendered_chart(image: Optional[ChartImage]) -> bool:
+    """生成失败或无数据时返回的占位图不进入渲染缓存"""
+    return image is not None and image.kind == KIND_CHART
+
+async def _render_chart(method: str, *args: Any) -> Optional[ChartImage]:
+    """在渲染进程池中生成图表（内存中的 PNG）；开启 CHART_PERSIST 时在后台落盘"""
+    image = await get_chart_render_service().render(method, *args)
+    if CHART_PERSIST and _is_rendered_chart(image):
+        _spawn_background(asyncio.to_thread(save_chart_image, image, CHART_DIR))
+    return image
+
+def _dashboard_render_inputs(_: Any) -> Tuple[Dict[str, Any], str]:
+    stats = get_task_completion_stats()
+    return stats, stats_fingerprint(stats)
+
+async def render_dashboard_chart() -> Optional[ChartImage]:
+    """生成综合仪表板；统计未变化时直接返回上次生成的图片（不调用 matplotlib）"""
+    if not chart_rendering_available():
+        return None
+    # 输入与指纹同一版本内只计算一次，统计写入后重新计算
+    stats, fingerprint = _stats_cache.derive("dashboard_render_inputs", _dashboard_render_inputs)
+    chart = await _render_cache.arender(
+        "dashboard", fingerprint, lambda: _render_chart("render_comprehensive_dashboard", stats, CHART_PROFILE),
+        profile=CHART_PROFILE, cacheable=_is_rendered_chart,
+    )
+    return chart or None
+
+HISTORY_MONTHS = 6
+
+def _shift_month(month: str, delta: int) -> str:
+    year, mon = map(int, month.split("-"))
+    index = year * 12 + (mon - 1) + delta
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+TREND_COMPARE_MONTHS = 3
+
+async def render_progress_trend_chart() -> Optional[ChartImage]:
+    """生成当月逐日进度趋势，叠加最近几个归档月份的逐日进度作为对比曲线"""
+    if not chart_rendering_available():
+        return None
+    try:
+        stats = get_task_completion_stats()
+        if stats.get("total_tasks", 0) == 0:
+            return None
+        current_month = stats.get("current_month") or datetime.now(TZ).strftime("%Y-%m")
+        archive = get_stats_archive()
+        history = {}
+        for delta in range(1, TREND_COMPARE_MONTHS + 1):
+            month = _shift_month(current_month, -delta)
+            points = archive.daily_progress(month)
+            if points:
+                history[month] = points
+        chart = await _render_cache.arender(
+            "progress_trend", stats_fingerprint(stats, history),
+            lambda: _render_chart("render_progress_trend_chart", stats, history, CHART_PROFILE),
+            profile=CHART_PROFILE, cacheable=_is_rendered_chart,
+        )
+        return chart or None
+    except Exception as e:
+        logger.error("生成进度趋势图失败: %s", e)
+        return None
+
+async def generate_history_response() -> Tuple[Optional[ChartImage], str]:
+    """生成多月历史趋势（归档月份 + 当月），返回 (图表, 文本摘要)"""
+    try:
+        current = get_task_completion_stats()
+        current_month = current.get("current_month") or datetime.now(TZ).strftime("%Y-%m")
+        start = _shift_month(current_month, -(HISTORY_MONTHS - 1))
+
+        archive = get_stats_archive()
+        monthly = [row for row in archive.completion_by_month(start, current_month) if row["month"] != current_month]
+        if current.get("total_tasks", 0) > 0:
+            monthly.append({
+                "month": current_month,
+                "total": current["total_tasks"],
+                "completed": current["completed_tasks"],
+                "completion_rate": current["completion_rate"],
+            })
+        if not monthly:
+            return None, "📭 暂无历史统计数据"
+
+        # 负责人排行：归档区间 + 当月计数器
+        ranking_counts = {
+            assignee: dict(counts)
+            for assignee, counts in archive.completion_by_assignee(start, _shift_month(current_month, -1)).items()
+        }
+        for assignee, counts in get_stats_store().assignee_counts().items():
+            agg = ranking_counts.setdefault(assignee, {"total": 0, "completed": 0})
+            agg["total"] += counts["total"]
+            agg["completed"] += counts["completed"]
+        ranking = sorted(
+            (
+                (get_user_display_name(assignee), c["completed"],
+                 round(c["completed"] / c["total"] * 100, 2) if c["total"] else 0.0)
+                for assignee, c in ranking_counts.items() if c["completed"] > 0
+            ),
+            key=lambda item: (-item[1], -item[2]),
+        )
+
+        lines = [f"📈 近{len(monthly)}个月完成率："]
+        for row in monthly:
+            lines.append(f"• {row['month']}: {row['completed']}/{row['total']} ({row['completion_rate']}%)")
+
+        chart = None
+        if chart_rendering_available():
+            chart = await _render_cache.arender(
+                "history", stats_fingerprint(monthly, ranking),
+                lambda: _render_chart("render_monthly_history_chart", monthly, ranking, CHART_PROFILE),
+                profile=CHART_PROFILE, cacheable=_is_rendered_chart,
+            ) or None
+        return chart, "\n".join(lines)
+
+    except Exception as e:
+        logger.error(f"生成历史趋势失败: {e}")
+        return None, "历史趋势生成失败，请稍后重试"
+
+async def mark_user_tasks_completed(
+    user_id: str,
+    on_remote_done: Optional[Callable[[List[str], List[str]], Awaitable[None]]] = None,
+) -> Tuple[int, List[str]]:
     """
     标记某个用户的所有未完成任务为已完成（本地+飞书API）
 
+    本地状态一次性写入并落盘后立即返回；飞书端的完成操作先登记到远端重试队列，
+    再在后台经共享限流器并发执行，成功的出队，失败的留在队列中由主循环退避重试；
+    全部处理完后回调 on_remote_done(成功标题, 失败标题)。
+
     Args:
         user_id: 用户的 open_id
+        on_remote_done: 飞书端全部处理完后的回调（可选）
 
     Returns:
         (完成任务数, 任务标题列表)
     """
     try:
         logger.info("[DEBUG] mark_user_tasks_completed called for user_id=%s", user_id)
-        stats = load_task_stats()
-        if not stats or "tasks" not in stats:
-            logger.info("[DEBUG] No stats or tasks found, returning 0")
+        store = get_stats_store()
+        writer = get_stats_writer()
+
+        # 第一步：通过负责人索引找出该用户所有未完成的任务
+        # 已在写入队列中标记完成、尚未落盘的任务不再重复处理
+        tasks_to_complete = [
+            (task_id, task_info)
+            for task_id, task_info in store.tasks_for_assignee(user_id, pending_only=True).items()
+            if writer.queued_completion(task_id) is not True
+        ]
+        logger.info("[DEBUG] Found %d pending tasks for user_id=%s", len(tasks_to_complete), user_id)
+        if not tasks_to_complete:
             return 0, []
 
-        current_month = datetime.now(TZ).strftime("%Y-%m")
-        completed_count = 0
-        completed_titles = []
-        tasks_to_complete = []  # 收集需要完成的任务
-
-        logger.info("[DEBUG] Processing %d tasks for user_id=%s", len(stats.get("tasks", {})), user_id)
-
-        # 第一步：找出该用户所有未完成的任务
-        for task_id, task_info in stats["tasks"].items():
-            assignees = task_info.get("assignees", [])
-            if user_id in assignees and not task_info.get("completed", False):
-                tasks_to_complete.append((task_id, task_info))
-
-        # 第二步：逐个完成任务（本地+飞书API）
-        for task_id, task_info in tasks_to_complete:
-            # 调用飞书API将任务标记为完成
-            feishu_success = await complete_task_on_feishu(task_id)
-
-            if feishu_success:
-                # 飞书API成功后，更新本地状态
-                task_info["completed"] = True
-                task_info["completed_at"] = datetime.now(TZ).isoformat()
-                completed_count += 1
-                completed_titles.append(task_info.get("title", task_id))
-                logger.info(f"✅ 任务已完成（本地+飞书）: {task_info.get('title')} (user: {user_id})")
-            else:
-                # 飞书API失败，仍然更新本地状态（保证用户体验）
-                task_info["completed"] = True
-                task_info["completed_at"] = datetime.now(TZ).isoformat()
-                completed_count += 1
-                completed_titles.append(task_info.get("title", task_id))
-                logger.warning(f"⚠️ 任务本地已完成，但飞书API失败: {task_info.get('title')} (user: {user_id})")
-
-        if completed_count > 0:
-            # 更新统计数据
-            total_completed = sum(1 for t in stats["tasks"].values() if t.get("completed", False))
-            total_tasks = len(stats["tasks"])
-            stats["completed_tasks"] = total_completed
-            stats["completion_rate"] = round((total_completed / total_tasks) * 100, 2) if total_tasks > 0 else 0
-            stats["last_update"] = datetime.now(TZ).isoformat()
-
-            # 保存更新后的数据
-            save_task_stats(stats)
-            logger.info(f"已为用户 {user_id} 标记 {completed_count} 个任务为完成")
-
-        return completed_count, completed_titles
+        # 第二步：本地状态一次写入（同一事务落盘），保证回复中的统计已包含本次完成
+        for task_id, _ in tasks_to_complete:
+            writer.set_completed(task_id, True, source="user")
+        await writer.flush()
+        # 先登记远端重试（进程在飞书调用途中退出也不会丢失），成功后出队
+        retry_at = time.time() + REMOTE_RETRY_BASE
+        with store.batch():
+            for task_id, _ in tasks_to_complete:
+                store.enqueue_remote_retry(task_id, REMOTE_ACTION_COMPLETE, retry_at, "pending")
+        completed_titles = [task_info.get("title", task_id) for task_id, task_info in tasks_to_complete]
+        logger.info(f"已为用户 {user_id} 标记 {len(completed_titles)} 个任务为完成")
+
+        # 第三步：飞书端并发完成，不阻塞回复
+        _spawn_background(_complete_tasks_on_feishu(user_id, tasks_to_complete, on_remote_done))
+        return len(completed_titles), completed_titles
 
     except Exception as e:
         logger.error(f"标记用户任务完成失败: {e}", exc_info=True)
         return 0, []
 
+def _spawn_background(coro: Awaitable[Any]) -> "asyncio.Task":
+    """启动后台任务并持有引用直到结束（避免被垃圾回收），异常记入日志"""
+    task = asyncio.ensure_future(coro)
+    _background_tasks.add(task)
+
+    def _done(t: "asyncio.Task") -> None:
+        _background_tasks.discard(t)
+        if not t.cancelled() and t.exception() is not None:
+            logger.error("后台任务异常: %s", t.exception())
+    task.add_done_callback(_done)
+    return task
+
+async def _complete_tasks_on_feishu(
+    user_id: str,
+    tasks: List[Tuple[str, Dict[str, Any]]],
+    on_remote_done: Optional[Callable[[List[str], List[str]], Awaitable[None]]] = None,
+) -> Tuple[List[str], List[str]]:
+    """并发调用飞书完成任务（并发度与速率由请求调度器控制），成功的移出远端重试队列"""
+    store = get_stats_store()
+    results = await asyncio.gather(*(complete_task_on_feishu(task_id) for task_id, _ in tasks))
+    succeeded: List[str] = []
+    failed: List[str] = []
+    for (task_id, task_info), feishu_success in zip(tasks, results):
+        title = task_info.get("title", task_id)
+        if feishu_success:
+            store.remove_remote_retry(task_id, REMOTE_ACTION_COMPLETE)
+            succeeded.append(title)
+            logger.info(f"✅ 任务已完成（本地+飞书）: {title} (user: {user_id})")
+        else:
+            # 远端失败：保留在持久化重试队列，由主循环退避重试直到本地与飞书一致
+            store.enqueue_remote_retry(task_id, REMOTE_ACTION_COMPLETE, time.time() + REMOTE_RETRY_BASE,
+                                       "complete_task_on_feishu failed")
+            failed.append(title)
+            logger.warning(f"⚠️ 任务本地已完成，飞书API失败，已加入重试队列: {title} (user: {user_id})")
+    if on_remote_done is not None:
+        await on_remote_done(succeeded, failed)
+    return succeeded, failed
+
+async def process_remote_retries(now: Optional[float] = None) -> Dict[str, int]:
+    """重试到期的远端完成操作：成功出队，失败按指数退避推迟，超过次数上限放弃"""
+    summary = {"due": 0, "succeeded": 0, "failed": 0, "dropped": 0}
+    store = get_stats_store()
+    if get_feishu_scheduler().breaker("task.write").is_open():
+        return summary  # 熔断冷却期内不重试，也不消耗重试次数（冷却结束后由本队列发起探测）
+    now = time.time() if now is None else now
+    for item in store.due_remote_retries(now):
+        summary["due"] += 1
+        task_id, action = item["task_id"], item["action"]
+        task = store.get_task(task_id)
+        if action != REMOTE_ACTION_COMPLETE or (task is not None and not task["completed"]
+                                                and get_stats_writer().queued_completion(task_id) is not True):
+            # 本地已取消完成（或未知操作）：无需再同步到飞书
+            store.remove_remote_retry(task_id, action)
+            summary["dropped"] += 1
+            continue
+        if await complete_task_on_feishu(task_id):
+            store.remove_remote_retry(task_id, action)
+            summary["succeeded"] += 1
+            continue
+        summary["failed"] += 1
+        attempts = store.reschedule_remote_retry(
+            task_id, action,
+            now + requeue_delay(item["attempts"] + 1, REMOTE_RETRY_BASE, REMOTE_RETRY_MAX_DELAY),
+            "complete_task_on_feishu failed",
+        )
+        if attempts >= REMOTE_RETRY_MAX_ATTEMPTS:
+            store.remove_remote_retry(task_id, action)
+            summary["dropped"] += 1
+            logger.error("远端完成重试 %d 次仍失败，放弃: %s", attempts, task_id)
+    if summary["due"]:
+        logger.info("远端重试队列: %s", summary)
+    return summary
+
 async def handle_message_event(event: Dict[str, Any]) -> bool:
     """处理消息事件（im.message.receive_v1）：支持"状态/未完成/谁没交"等意图与无任务判断"""
     try:
@@ -1306,11 +1926,7 @@ async def handle_message_event(event: Dict[str, Any]) -> bool:
                 await reply_to_message(message_id, "无法识别您的飞书用户身份，请联系管理员检查事件配置。")
                 return True
 
-            tasks = [
-                task
-                for task in get_pending_tasks_detail()
-                if user_open_id in (task.get("assignees") or [])
-            ]
+            tasks = get_user_pending_tasks(user_open_id)
             if not tasks:
                 await reply_to_message(message_id, "您当前没有未完成任务。")
                 return True
@@ -1392,11 +2008,11 @@ async def handle_message_event(event: Dict[str, Any]) -> bool:
             except Exception:
                 pass
 
-            chart_path, stats = generate_chart_response()
+            chart, stats = await generate_chart_response()
 
-            if chart_path and stats:
-                # 上传图表
-                image_key = await upload_image(chart_path)
+            if chart and stats:
+                # 上传图表（内存中的 PNG 直接上传）
+                image_key = await upload_image(chart)
 
                 if image_key:
                     # 构建包含图片的卡片消息
@@ -1457,18 +2073,58 @@ async def handle_message_event(event: Dict[str, Any]) -> bool:
                     )
             else:
                 # 图表生成失败
-                error_msg = "图表功能暂不可用，请检查依赖库安装" if chart_generator is None else "图表生成失败，请稍后重试"
+                error_msg = "图表功能暂不可用，请检查依赖库安装" if not chart_rendering_available() else "图表生成失败，请稍后重试"
                 await reply_to_message(message_id, error_msg)
 
             return True
 
+        # 趋势/历史 - 多月份完成率（读取归档）
+        if normalized in {"趋势", "历史", "趋势图", "历史趋势", "历史统计", "trend", "history"}:
+            chart, summary = await generate_history_response()
+            image_key = await upload_image(chart) if chart else None
+            trend_chart = await render_progress_trend_chart()
+            trend_key = await upload_image(trend_chart) if trend_chart else None
+            if image_key:
+                card_content = {
+                    "config": {"wide_screen_mode": True},
+                    "header": {
+                        "title": {"tag": "plain_text", "content": "📈 历史完成趋势"},
+                        "template": "blue"
+                    },
+                    "elements": [
+                        {"tag": "div", "text": {"tag": "lark_md", "content": summary}},
+                        {"tag": "img", "img_key": image_key, "alt": {"tag": "plain_text", "content": "历史完成趋势"}}
+                    ]
+                }
+                if trend_key:
+                    # 当月逐日进度，与最近几个归档月份同期对比
+                    card_content["elements"].append(
+                        {"tag": "img", "img_key": trend_key, "alt": {"tag": "plain_text", "content": "本月进度趋势"}}
+                    )
+                await reply_to_message(message_id, card_content, msg_type="interactive")
+            else:
+                await reply_to_message(message_id, summary)
+            return True
+
         # 已完成/完成了 - 自动标记用户的任务为完成
         if normalized in {"已完成", "完成了", "完成", "我完成", "done", "我完成了", "标记完成", "提交了", "完成啦"}:
             logger.info("[DEBUG] '已完成' command matched! user_open_id=%s", user_open_id)
             if user_open_id:
                 # 标记该用户的所有未完成任务为已完成（本地+飞书API）
                 logger.info("[DEBUG] Calling mark_user_tasks_completed for user_open_id=%s", user_open_id)
-                completed_count, completed_titles = await mark_user_tasks_completed(user_open_id)
+                async def _report_remote(succeeded: List[str], failed: List[str]) -> None:
+                    if REMOTE_CONFIRM_REPLY == "never" or (REMOTE_CONFIRM_REPLY != "always" and not failed):
+                        return
+                    if failed:
+                        lines = [f"⚠️ 以下 {len(failed)} 个任务同步到飞书失败，已加入自动重试："]
+                        lines.extend(f"• {title}" for title in failed)
+                    else:
+                        lines = [f"☁️ 飞书任务已同步完成（{len(succeeded)} 个）"]
+                    await reply_to_message(message_id, "\n".join(lines))
+
+                completed_count, completed_titles = await mark_user_tasks_completed(
+                    user_open_id, on_remote_done=_report_remote,
+                )
 
                 if completed_count > 0:
                     # 构建回复消息
@@ -1541,43 +2197,60 @@ def _build_event_from_p2(data: Any) -> Dict[str, Any]:
         return {"message": {"content": "", "message_id": "", "chat_id": ""}}
 
 async def _run_official_ws(loop: asyncio.AbstractEventLoop) -> None:
-    """在后台线程启动官方WS客户端，收到消息事件时转发到当前事件循环"""
+    """在后台线程启动官方WS客户端，收到消息/任务变更事件时转发到当前事件循环"""
     if not (lark and hasattr(lark, "ws")):
         logger.warning("官方WS不可用，跳过WS启动")
         return
     
     def _start_ws():
+        global _task_events_registered
         try:
             # 构建事件分发器
             handler_builder = lark.EventDispatcherHandler.builder("", "")
             
-            def _on_p2_message(data):
+            def _forward(make_coro, what: str):
                 try:
                     # 仅当事件循环仍在运行时才调度协程，避免在关闭后创建未等待的协程
                     if loop.is_closed() or not loop.is_running():
-                        logger.warning("事件循环已关闭/未运行，丢弃P2消息事件")
+                        logger.warning("事件循环已关闭/未运行，丢弃%s", what)
                         return
-                    ev = _build_event_from_p2(data)
-                    coro = handle_message_event(ev)
-                    fut = asyncio.run_coroutine_threadsafe(coro, loop)
+                    fut = asyncio.run_coroutine_threadsafe(make_coro(), loop)
                     # 捕获协程内部异常，避免静默失败
                     def _log_future_result(f):
                         try:
                             _ = f.result()
                         except Exception as ex2:
-                            logger.error("P2消息事件处理异常: %s", ex2)
+                            logger.error("%s处理异常: %s", what, ex2)
                     fut.add_done_callback(_log_future_result)
                 except Exception as ex:
-                    logger.error("转发P2消息事件失败: %s", ex)
+                    logger.error("转发%s失败: %s", what, ex)
+            
+            def _on_p2_message(data):
+                _forward(lambda: handle_message_event(_build_event_from_p2(data)), "P2消息事件")
             
-            handler = handler_builder.register_p2_im_message_receive_v1(_on_p2_message).build()
+            handler_builder = handler_builder.register_p2_im_message_receive_v1(_on_p2_message)
             logger.info("已注册官方WS消息事件处理器")
             
+            if TASK_EVENTS_ENABLED and hasattr(handler_builder, "register_p2_task_task_updated_v1"):
+                task_handler = get_task_update_handler()
+                
+                def _on_p2_task_updated(data):
+                    record_task_event_received()
+                    _forward(lambda: task_handler.handle(data), "任务变更事件")
+                
+                handler_builder = handler_builder.register_p2_task_task_updated_v1(_on_p2_task_updated)
+                _task_events_registered = True
+                logger.info("已注册任务变更事件处理器，收到首个事件前仍按截止日程轮询")
+            
+            handler = handler_builder.build()
             client = lark.ws.Client(APP_ID, APP_SECRET, event_handler=handler, log_level=lark.LogLevel.INFO)
             logger.info("开始建立官方WS长连接...")
             client.start()
         except Exception as e:
             logger.error("官方WS启动失败: %s", e)
+        finally:
+            # 长连接退出后恢复按截止日程轮询
+            _task_events_registered = False
     
     # 在后台线程运行阻塞的 WS 客户端
     await asyncio.to_thread(_start_ws)
@@ -1640,52 +2313,73 @@ async def main_loop():
             now = datetime.now(TZ)
             now_str = now.strftime("%Y-%m-%d %H:%M:%S")
             logger.info("当前时间: %s", now_str)
+            # 定时播报的去重键：同一天同一类播报只入队一次（重启或重复触发不会重复发送）
+            today = now.strftime("%Y-%m-%d")
             
             if should_create_tasks(now):
                 logger.info("执行任务创建...")
                 success = await create_tasks()
+                await get_stats_writer().flush()
                 if success:
                     card = build_task_creation_card()
-                    await send_card_to_chat(card)
+                    await send_card_to_chat(card, dedup_key=f"task_creation:{today}")
                 else:
-                    await send_text_to_chat("❌ 任务创建失败，请检查配置")
+                    await send_text_to_chat("❌ 任务创建失败，请检查配置", dedup_key=f"task_creation_failed:{today}")
             
             elif should_send_daily_reminder(now):
                 logger.info("发送每日提醒（09:30）...")
-                await sync_task_completion_status()
+                await sync_task_completion_status(max_age=TASK_POLL_MAX_AGE_BEFORE_BROADCAST)
                 card = build_daily_reminder_card()
-                await send_card_to_chat(card)
+                await send_card_to_chat(card, dedup_key=f"daily_reminder:{today}")
 
             elif should_send_daily_stats(now):
                 logger.info("发送每日统计（17:00，完成情况+图表）...")
-                await sync_task_completion_status()
+                await sync_task_completion_status(max_age=TASK_POLL_MAX_AGE_BEFORE_BROADCAST)
                 # 发送统计卡片
                 stats = load_task_stats()
                 card = build_daily_stats_card(stats)
-                await send_card_to_chat(card)
-                # 生成并发送图表
+                await send_card_to_chat(card, dedup_key=f"daily_stats:{today}")
+                # 生成并发送图表（与"图表"命令共用渲染缓存，之后的查询直接复用）
                 try:
-                    from chart_generator import chart_generator
-                    chart_path = chart_generator.generate_comprehensive_dashboard(stats)
-                    await send_image_to_chat(chart_path, "📊 今日完成情况统计图表")
+                    chart = await render_dashboard_chart()
+                    if not chart:
+                        raise RuntimeError("图表生成器不可用或生成失败")
+                    await send_image_to_chat(chart, "📊 今日完成情况统计图表", dedup_key=f"daily_chart:{today}")
                 except Exception as e:
                     logger.error(f"生成图表失败: {e}")
 
             elif should_send_final_reminder(now):
                 logger.info("发送最终催办...")
-                await sync_task_completion_status()
+                await sync_task_completion_status(max_age=TASK_POLL_MAX_AGE_BEFORE_BROADCAST)
                 card = build_final_reminder_card()
-                await send_card_to_chat(card)
+                await send_card_to_chat(card, dedup_key=f"final_reminder:{today}")
             
             elif should_send_final_stats(now):
                 logger.info("发送最终统计...")
-                await sync_task_completion_status()
-                card = build_final_stats_card()
-                await send_card_to_chat(card)
+                await sync_task_completion_status(max_age=TASK_POLL_MAX_AGE_BEFORE_BROADCAST)
+                chart = None
+                try:
+                    chart = await render_dashboard_chart()
+                except Exception as e:
+                    logger.error(f"生成统计卡片图表失败: {e}")
+                card = build_final_stats_card(chart)
+                await send_card_to_chat(card, dedup_key=f"final_stats:{today}")
             
             elif now.minute == 0:
+                if get_stats_store().pending_creations(now.strftime("%Y-%m"), max_attempts=TASK_CREATE_MAX_ATTEMPTS):
+                    logger.info("补建上次创建失败的任务...")
+                    await create_tasks()
+                    await get_stats_writer().flush()
                 logger.info("执行定时任务状态同步...")
                 await sync_task_completion_status()
+                logger.info("飞书请求调度统计: %s", get_feishu_scheduler().metrics())
+                logger.info("出站消息队列统计: %s", get_message_outbox().metrics())
+                if _chart_render_service is not None:
+                    logger.info("图表渲染统计: %s", _chart_render_service.metrics())
+                maybe_compact_task_stats()
+            
+            # 远端完成失败的持久化重试（到期才会发起请求）
+            await process_remote_retries()
             
             await asyncio.sleep(60)
             
@@ -1694,12 +2388,18 @@ async def main_loop():
             await asyncio.sleep(60)
 
 async def create_tasks() -> bool:
-    """创建月度报告任务（真实调用飞书API）"""
+    """创建月度报告任务（真实调用飞书API）
+
+    每个任务使用按 (月份, 标题) 生成的固定 client_token，以 TASK_CREATE_CONCURRENCY 为上限并发创建；
+    每个任务的结果写入统计存储的创建进度，重跑时只创建尚未成功的任务。
+    """
     try:
         created_tasks = load_created_tasks()
         current_month = datetime.now(TZ).strftime("%Y-%m")
+        store = get_stats_store()
 
-        if created_tasks.get(current_month, False):
+        if created_tasks.get(current_month, False) and \
+                not store.pending_creations(current_month, max_attempts=TASK_CREATE_MAX_ATTEMPTS):
             logger.info("本月任务已创建，跳过")
             return True
 
@@ -1718,10 +2418,37 @@ async def create_tasks() -> bool:
             logger.error("任务配置文件格式错误: 需为列表或包含 tasks 键的字典")
             return False
 
-        logger.info("开始创建月度报告任务（调用飞书API）...")
-        success_count = 0
-
-        for i, task_config in enumerate(task_list):
+        # 已成功创建的任务（断点续建时跳过）
+        progress = store.creation_progress(current_month)
+        todo, abandoned = [], []
+        for cfg in task_list:
+            record = progress.get(cfg['title']) or {}
+            if record.get('task_guid'):
+                continue
+            if record.get('attempts', 0) >= TASK_CREATE_MAX_ATTEMPTS:
+                abandoned.append(cfg['title'])
+            else:
+                todo.append(cfg)
+        done_before = len(task_list) - len(todo) - len(abandoned)
+        if abandoned:
+            logger.error("以下任务已尝试创建 %d 次仍失败，不再补建（请检查配置后手动处理）: %s",
+                         TASK_CREATE_MAX_ATTEMPTS, abandoned)
+        logger.info("开始创建月度报告任务（调用飞书API）: 待创建 %d 个，已创建 %d 个", len(todo), done_before)
+
+        # 本月任务清单：创建的任务都挂入清单，同步与恢复只需翻页该清单
+        tasklist_guid = await ensure_month_tasklist(current_month) if todo else None
+        tasklists = [TaskInTasklistInfo.builder().tasklist_guid(tasklist_guid).build()] if tasklist_guid else None
+
+        # 计算截止时间（23号 23:59:59）
+        deadline = datetime.now(TZ).replace(day=23, hour=23, minute=59, second=59)
+        # 飞书Task v2 API需要毫秒级时间戳（乘以1000）
+        due_timestamp = int(deadline.timestamp() * 1000)
+
+        semaphore = asyncio.Semaphore(TASK_CREATE_CONCURRENCY)
+
+        async def create_one(task_config: Dict[str, Any]) -> bool:
+            title = task_config.get('title', 'Unknown')
+            client_token = task_client_token(current_month, title)
             try:
                 # 构建任务标题
                 task_title = f"{current_month} {task_config['title']}"
@@ -1737,22 +2464,13 @@ async def create_tasks() -> bool:
                 # 过滤空值
                 assignees = [a for a in assignees if a and a.strip()]
 
-                # 计算截止时间（23号 23:59:59）
-                deadline = datetime.now(TZ).replace(day=23, hour=23, minute=59, second=59)
-                # 飞书Task v2 API需要毫秒级时间戳（乘以1000）
-                due_timestamp = int(deadline.timestamp() * 1000)
-
                 # 准备任务成员（在创建时直接分配）
-                members_list = []
-                if assignees:
-                    for assignee_id in assignees:
-                        member = Member.builder() \
-                            .id(assignee_id) \
-                            .role("assignee") \
-                            .build()
-                        members_list.append(member)
-
-                # 创建任务请求（使用正确的API类名）
+                members_list = [
+                    Member.builder().id(assignee_id).role("assignee").build()
+                    for assignee_id in assignees
+                ]
+
+                # 创建任务请求：client_token 保证重试/重跑不会重复创建
                 request = CreateTaskRequest.builder() \
                     .request_body(InputTask.builder()
                                 .summary(task_title)
@@ -1762,10 +2480,13 @@ async def create_tasks() -> bool:
                                     .is_all_day(False)
                                     .build())
                                 .members(members_list)  # 直接在创建时分配成员
+                                .tasklists(tasklists)
+                                .client_token(client_token)
                                 .build()) \
                     .build()
 
-                response = await lark_client.task.v2.task.acreate(request)
+                async with semaphore:
+                    response = await feishu_api(PRIORITY_BACKGROUND).task.v2.task.acreate(request)
 
                 if response.success():
                     task_guid = response.data.task.guid
@@ -1774,26 +2495,42 @@ async def create_tasks() -> bool:
                     if assignees:
                         logger.info("✅ 任务分配成功: %s -> %s", task_title, assignees)
 
-                    # 更新统计（使用真实的 task_guid）
-                    update_task_completion(task_guid, task_config['title'], assignees, False,
-                                           task_type=task_config.get('task_type', '月报'))
-                    success_count += 1
+                    # 统计（使用真实的 task_guid）与创建进度在同一事务中直接写入存储，不经防抖写入器：
+                    # 否则进程在写入器落盘前退出时，创建记录已标记成功而统计中没有该任务，重跑也不会补上
+                    ensure_stats_month(current_month)
+                    store.record_created_task(current_month, title, client_token, task_guid, assignees,
+                                              task_type=task_config.get('task_type', '月报'))
+                    return True
 
-                else:
-                    logger.error("❌ 任务创建失败: %s, code: %s, msg: %s",
-                               task_title, response.code, response.msg)
+                logger.error("❌ 任务创建失败: %s, code: %s, msg: %s",
+                           task_title, response.code, response.msg)
+                store.record_creation(current_month, title, client_token,
+                                      error=f"code={response.code}, msg={response.msg}")
+                return False
 
             except Exception as e:
-                logger.error("❌ 创建任务异常: %s, 任务: %s", e, task_config.get('title', 'Unknown'))
+                logger.error("❌ 创建任务异常: %s, 任务: %s", e, title)
+                store.record_creation(current_month, title, client_token, error=str(e))
+                return False
 
-        if success_count > 0:
+        results = await asyncio.gather(*(create_one(cfg) for cfg in todo))
+        success_count = sum(1 for ok in results if ok)
+        missing = len(todo) - success_count
+
+        # "本月已有任务"标记：只要有任务创建成功就写入（状态/图表等指令据此判断是否有任务），
+        # 是否还需补建由创建进度（pending_creations）决定
+        if success_count + done_before > 0 and not created_tasks.get(current_month, False):
             created_tasks[current_month] = True
             save_created_tasks(created_tasks)
-            logger.info("✅ 本月任务创建完成，成功创建 %d 个任务", success_count)
+        if missing == 0 and not abandoned:
+            logger.info("✅ 本月任务创建完成，本次创建 %d 个，共 %d 个任务", success_count, len(task_list))
             return True
-        else:
-            logger.error("❌ 没有成功创建任何任务")
-            return False
+        if success_count + done_before > 0:
+            logger.warning("⚠️ 本月任务部分创建失败：本次成功 %d 个，%d 个待补建（整点自动重试），%d 个已放弃",
+                           success_count, missing, len(abandoned))
+            return True
+        logger.error("❌ 没有成功创建任何任务")
+        return False
 
     except Exception as e:
         logger.error("❌ 创建任务异常: %s", e)
@@ -1801,7 +2538,9 @@ async def create_tasks() -> bool:
 
 # ---------------------- 任务记录文件 ----------------------
 
-def load_created_tasks() -> Dict[str, bool]:
+_created_tasks_version = 0
+
+def _read_created_tasks() -> Dict[str, bool]:
     try:
         if os.path.exists(CREATED_TASKS_FILE):
             with open(CREATED_TASKS_FILE, 'r', encoding='utf-8') as f:
@@ -1811,12 +2550,25 @@ def load_created_tasks() -> Dict[str, bool]:
         logger.error("加载任务记录失败: %s", e)
         return {}
 
+# 本进程保存时递增版本号；外部脚本改写文件时由 mtime 感知
+_created_tasks_cache = VersionedCache(
+    _read_created_tasks,
+    lambda: (_created_tasks_version, file_version(CREATED_TASKS_FILE)),
+    name="created_tasks",
+)
+
+def load_created_tasks() -> Dict[str, bool]:
+    return dict(_created_tasks_cache.get())
+
 def save_created_tasks(tasks: Dict[str, bool]) -> None:
+    global _created_tasks_version
     try:
         with open(CREATED_TASKS_FILE, 'w', encoding='utf-8') as f:
             json.dump(tasks, f, ensure_ascii=False, indent=2)
     except Exception as e:
         logger.error("保存任务记录失败: %s", e)
+    finally:
+        _created_tasks_version += 1
 
 # ---------------------- 启动入口 ----------------------
 
@@ -1837,6 +2589,10 @@ async def main():
         logger.error("飞书SDK客户端初始化失败，程序退出")
         return
     
+    # 出站消息队列先启动，后续所有发送入队后立即返回
+    outbox = get_message_outbox()
+    outbox.start()
+
     # 发送启动通知
     await send_text_to_chat("🚀 月报机器人最终版（交互增强）已启动，支持 Echo 回声与定时任务...")
     
@@ -1858,10 +2614,25 @@ async def main():
     
     # 定时循环
     tasks.append(asyncio.create_task(main_loop()))
-    
-    await asyncio.gather(*tasks)
+
+    # 长连接建立后再启动渲染进程、加载图表库
+    if CHART_PREWARM:
+        _spawn_background(prewarm_chart_renderer())
+
+    writer = get_stats_writer()
+    writer.start()
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # 退出前尽量发完已到期的消息（未发完的保留在队列中，下次启动继续发送）
+        await outbox.stop()
+        # 退出前写入排队中的统计变更
+        await writer.stop()
+        if _chart_render_service is not None:
+            _chart_render_service.close()
 
 if __name__ == "__main__":
+    setup_process_output()
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
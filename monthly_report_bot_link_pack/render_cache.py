@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图表渲染缓存（按统计指纹记忆化）
+
+统计数据未变化时重复请求同一张图表，直接返回上次的渲染结果，不再调用 matplotlib：
+- 键为 (图表类型, 渲染配置, 统计指纹)，指纹是图表输入数据规范化 JSON 的 SHA-256
+- 指纹由调用方在统计版本变化时重新计算（见 VersionedCache.derive），统计写入即失效
+- 同一时刻只渲染一次（单飞），并发请求等待首个渲染结果；
+  渲染通过 arender() 异步执行（如进程池），等待期间不阻塞事件循环
+- 渲染结果可以是内存中的图片（ChartImage），也可以是文件路径；
+  文件被清理（cleanup_old_charts）或被同名新图覆盖（文件名精确到秒）后自动重新渲染
+- 条目数超出上限时按 LRU 淘汰
+"""
+
+from __future__ import annotations
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from chart_image import DEFAULT_PROFILE, KIND_CHART, ChartImage
+
+logger = logging.getLogger(__name__)
+
+
+def _file_version(value: Any) -> Optional[int]:
+    """值为文件路径时返回文件的 mtime_ns（命中时校验文件仍是当时那一份）；内存中的图片无需校验"""
+    return os.stat(value).st_mtime_ns if isinstance(value, str) else None
+
+
+def is_cacheable_result(value: Any) -> bool:
+    """默认的可缓存判断：正常图表（非占位图）或仍存在的图片文件"""
+    if isinstance(value, ChartImage):
+        return value.kind == KIND_CHART
+    return isinstance(value, str) and os.path.exists(value)
+
+
+def stats_fingerprint(*inputs: Any) -> str:
+    """图表输入数据的稳定指纹（字典键排序，与插入顺序无关）"""
+    payload = json.dumps(inputs, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+    """(图表类型, 渲染配置, 统计指纹) -> 渲染结果（图片或图片路径）的进程内缓存"""
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # 键 -> (渲染结果, 路径写入时的 mtime_ns；内存中的图片为 None)
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[Any, Optional[int]]]" = OrderedDict()
+        self._render_locks: Dict[Tuple[str, str, str], asyncio.Lock] = {}
+
+    def get(self, chart_type: str, fingerprint: str, profile: str = DEFAULT_PROFILE) -> Any:
+        """命中时返回渲染结果；结果为文件路径时还要求文件仍是当时生成的那一份"""
+        key = (chart_type, profile, fingerprint)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, mtime_ns = entry
+            if mtime_ns is not None:
+                try:
+                    unchanged = os.stat(value).st_mtime_ns == mtime_ns
+                except OSError:
+                    unchanged = False
+                if not unchanged:
+                    del self._entries[key]
+                    return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, chart_type: str, fingerprint: str, value: Any, profile: str = DEFAULT_PROFILE) -> None:
+        with self._lock:
+            self._entries[(chart_type, profile, fingerprint)] = (value, _file_version(value))
+            self._entries.move_to_end((chart_type, profile, fingerprint))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def arender(self, chart_type: str, fingerprint: str, render: Callable[[], Awaitable[Any]],
+                      profile: str = DEFAULT_PROFILE,
+                      cacheable: Callable[[Any], bool] = is_cacheable_result) -> Any:
+        """命中时返回已有结果，否则等待 render() 生成；cacheable(结果) 为假（如错误占位图）时不缓存
+
+        同一键的并发请求共享一次渲染；渲染期间只持有该键的 asyncio.Lock，不阻塞其他键与事件循环
+        """
+        key = (chart_type, profile, fingerprint)
+        lock = self._render_locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                result = self.get(chart_type, fingerprint, profile)
+                if result is not None:
+                    self.hits += 1
+                    logger.info("图表未变化，复用已生成的图片: %s", result)
+                    return result
+                self.misses += 1
+                result = await render()
+                if result and cacheable(result):
+                    self.put(chart_type, fingerprint, result, profile)
+                return result
+        finally:
+            if not lock.locked() and self._render_locks.get(key) is lock:
+                del self._render_locks[key]
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
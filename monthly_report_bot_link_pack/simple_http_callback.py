@@ -8,12 +8,14 @@
 import os
 import json
 import logging
-import requests
+import feishu_http
 from flask import Flask, request, jsonify
 import hmac
 import hashlib
 import time
 
+from tenant_token import get_tenant_token_provider, token_rejected
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -30,26 +32,8 @@ WELCOME_CARD_ID = os.environ.get("WELCOME_CARD_ID", "AAqInYqWzIiu6")
 VERIFICATION_TOKEN = os.environ.get("VERIFICATION_TOKEN", "your_verification_token_here")
 
 def get_tenant_token():
-    """获取tenant_access_token"""
-    url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
-    payload = {
-        "app_id": APP_ID,
-        "app_secret": APP_SECRET
-    }
-    
-    try:
-        response = requests.post(url, json=payload, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-        
-        if data.get("code") == 0:
-            return data.get("tenant_access_token")
-        else:
-            logger.error("获取token失败: %s", data.get("msg"))
-            return None
-    except Exception as e:
-        logger.error("获取token异常: %s", e)
-        return None
+    """获取tenant_access_token（共享缓存，临近过期才刷新）"""
+    return get_tenant_token_provider(APP_ID, APP_SECRET).get_token()
 
 def send_welcome_card_to_user(user_id: str) -> bool:
     """向用户发送欢迎卡片"""
@@ -59,10 +43,6 @@ def send_welcome_card_to_user(user_id: str) -> bool:
     
     try:
         url = "https://open.feishu.cn/open-apis/im/v1/messages"
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json"
-        }
         
         # 使用模板卡片格式（根据您的代码）
         payload = {
@@ -82,13 +62,26 @@ def send_welcome_card_to_user(user_id: str) -> bool:
             }, ensure_ascii=False)
         }
         
-        response = requests.post(
-            url, 
-            json=payload, 
-            headers=headers, 
-            timeout=30,
-            params={"receive_id_type": "user_id"}
-        )
+        for attempt in range(2):
+            headers = {
+                "Authorization": f"Bearer {token}",
+                "Content-Type": "application/json"
+            }
+            response = feishu_http.post(
+                url,
+                json=payload, 
+                headers=headers, 
+                timeout=30,
+                params={"receive_id_type": "user_id"}
+            )
+            # 令牌被吊销/失效：作废缓存后用新令牌重试一次
+            if attempt == 0 and token_rejected(response):
+                get_tenant_token_provider(APP_ID, APP_SECRET).invalidate()
+                token = get_tenant_token()
+                if not token:
+                    return False
+                continue
+            break
         
         if response.status_code == 200:
             data = response.json()
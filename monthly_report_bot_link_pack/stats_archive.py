@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多月份任务统计归档
+
+月份切换时把上月统计写入按月分区的归档文件，不再直接丢弃：
+- 每月一个 task_stats_YYYY-MM.json.gz，列式存储（每个字段一个数组，
+  任务类型与负责人做字典编码），gzip 压缩
+- index.json 保存各月汇总（按类型、按负责人），按月份区间查询只读索引
+- 逐日完成进度由完成日期列计算，供趋势图使用真实数据
+"""
+
+from __future__ import annotations
+import os
+import json
+import gzip
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FORMAT = "task_stats_columnar"
+ARCHIVE_VERSION = 1
+INDEX_FILE = "index.json"
+
+
+def _rate(completed: int, total: int) -> float:
+    return round(completed / total * 100, 2) if total > 0 else 0.0
+
+
+def _completed_day(month: str, completed_at: Optional[str]) -> Optional[int]:
+    """完成时间 -> 相对当月1日的第几天（1 起算，跨月完成的会大于当月天数）"""
+    if not completed_at:
+        return None
+    try:
+        done = datetime.fromisoformat(str(completed_at)).date()
+        start = datetime.strptime(month, "%Y-%m").date()
+        return max(1, (done - start).days + 1)
+    except ValueError:
+        return None
+
+
+def build_columnar(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """旧版统计结构 -> 列式归档结构"""
+    month = stats.get("current_month", "")
+    type_dict: List[str] = []
+    assignee_dict: List[str] = []
+    type_codes: Dict[str, int] = {}
+    assignee_codes: Dict[str, int] = {}
+
+    columns: Dict[str, List[Any]] = {
+        "task_id": [], "title": [], "task_type": [], "assignees": [], "completed": [], "completed_day": [],
+    }
+    by_type: Dict[str, Dict[str, int]] = {}
+    by_assignee: Dict[str, Dict[str, int]] = {}
+
+    for task_id, info in (stats.get("tasks") or {}).items():
+        ttype = info.get("task_type") or "月报"
+        if ttype not in type_codes:
+            type_codes[ttype] = len(type_dict)
+            type_dict.append(ttype)
+        codes = []
+        for assignee in info.get("assignees") or []:
+            if assignee not in assignee_codes:
+                assignee_codes[assignee] = len(assignee_dict)
+                assignee_dict.append(assignee)
+            codes.append(assignee_codes[assignee])
+        completed = 1 if info.get("completed") else 0
+
+        columns["task_id"].append(task_id)
+        columns["title"].append(info.get("title", ""))
+        columns["task_type"].append(type_codes[ttype])
+        columns["assignees"].append(codes)
+        columns["completed"].append(completed)
+        columns["completed_day"].append(_completed_day(month, info.get("completed_at")) if completed else None)
+
+        ts = by_type.setdefault(ttype, {"total": 0, "completed": 0})
+        ts["total"] += 1
+        ts["completed"] += completed
+        for assignee in info.get("assignees") or []:
+            a = by_assignee.setdefault(assignee, {"total": 0, "completed": 0})
+            a["total"] += 1
+            a["completed"] += completed
+
+    total = len(columns["task_id"])
+    done = sum(columns["completed"])
+    return {
+        "format": ARCHIVE_FORMAT,
+        "version": ARCHIVE_VERSION,
+        "month": month,
+        "archived_at": datetime.now().astimezone().isoformat(),
+        "dicts": {"task_type": type_dict, "assignee": assignee_dict},
+        "columns": columns,
+        "summary": {
+            "total": total,
+            "completed": done,
+            "completion_rate": _rate(done, total),
+            "by_type": by_type,
+            "by_assignee": by_assignee,
+        },
+    }
+
+
+class StatsArchive:
+    """按月分区的统计归档（列式 + gzip）"""
+
+    def __init__(self, archive_dir: str):
+        self.archive_dir = archive_dir
+        self._lock = threading.RLock()
+        self._index: Optional[Dict[str, Any]] = None
+        self._index_mtime: Optional[int] = None
+
+    # ---------------------- 文件与索引 ----------------------
+
+    def _month_path(self, month: str) -> str:
+        return os.path.join(self.archive_dir, f"task_stats_{month}.json.gz")
+
+    def _index_path(self) -> str:
+        return os.path.join(self.archive_dir, INDEX_FILE)
+
+    def _atomic_write(self, path: str, data: bytes) -> None:
+        os.makedirs(self.archive_dir, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _load_index(self) -> Dict[str, Any]:
+        """各月汇总索引（文件未变化时直接复用内存副本）"""
+        path = self._index_path()
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return {}
+        if self._index is None or mtime != self._index_mtime:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+                self._index_mtime = mtime
+            except Exception as e:
+                logger.error("读取归档索引失败: %s", e)
+                return {}
+        return self._index or {}
+
+    # ---------------------- 写入 ----------------------
+
+    def write_month(self, stats: Dict[str, Any]) -> Optional[str]:
+        """归档一个月的统计（同月重复归档会覆盖），返回归档文件路径"""
+        month = stats.get("current_month")
+        if not month or not stats.get("tasks"):
+            return None
+        with self._lock:
+            archive = build_columnar(stats)
+            path = self._month_path(month)
+            payload = json.dumps(archive, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            self._atomic_write(path, gzip.compress(payload))
+
+            index = dict(self._load_index())
+            index[month] = archive["summary"]
+            self._atomic_write(
+                self._index_path(),
+                json.dumps(dict(sorted(index.items())), ensure_ascii=False, indent=2).encode("utf-8"),
+            )
+            self._index = None
+            logger.info("已归档 %s 任务统计: %d 个任务 -> %s", month, archive["summary"]["total"], path)
+            return path
+
+    def archive_and_reset(self, store: Any, month: str) -> Optional[str]:
+        """月份切换：先归档 TaskStatsStore 中的当前数据，再重置为新月份"""
+        path = self.write_month(store.load())
+        store.reset_month(month)
+        return path
+
+    # ---------------------- 查询 ----------------------
+
+    def months(self) -> List[str]:
+        """已归档的月份（升序）"""
+        with self._lock:
+            return sorted(self._load_index())
+
+    def _range(self, start: Optional[str], end: Optional[str]) -> List[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            index = self._load_index()
+            return [
+                (month, index[month])
+                for month in sorted(index)
+                if (start is None or month >= start) and (end is None or month <= end)
+            ]
+
+    def load_month(self, month: str) -> Optional[Dict[str, Any]]:
+        """读取某月完整的列式归档"""
+        path = self._month_path(month)
+        if not os.path.exists(path):
+            return None
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error("读取归档失败: %s, %s", path, e)
+            return None
+
+    def completion_by_month(self, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+        """按月完成率 [{"month", "total", "completed", "completion_rate"}]"""
+        return [
+            {
+                "month": month,
+                "total": summary["total"],
+                "completed": summary["completed"],
+                "completion_rate": summary["completion_rate"],
+            }
+            for month, summary in self._range(start, end)
+        ]
+
+    def completion_by_type(self, start: Optional[str] = None,
+                           end: Optional[str] = None) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """按月、按任务类型的完成率 {month: {task_type: {"total", "completed", "completion_rate"}}}"""
+        result: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for month, summary in self._range(start, end):
+            result[month] = {
+                ttype: {**counts, "completion_rate": _rate(counts["completed"], counts["total"])}
+                for ttype, counts in summary.get("by_type", {}).items()
+            }
+        return result
+
+    def completion_by_assignee(self, start: Optional[str] = None,
+                               end: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """区间内按负责人累计的完成率 {assignee: {"total", "completed", "completion_rate", "months"}}"""
+        result: Dict[str, Dict[str, Any]] = {}
+        for _month, summary in self._range(start, end):
+            for assignee, counts in summary.get("by_assignee", {}).items():
+                agg = result.setdefault(assignee, {"total": 0, "completed": 0, "months": 0})
+                agg["total"] += counts["total"]
+                agg["completed"] += counts["completed"]
+                agg["months"] += 1
+        for agg in result.values():
+            agg["completion_rate"] = _rate(agg["completed"], agg["total"])
+        return result
+
+    def daily_progress(self, month: str) -> List[Tuple[int, float]]:
+        """某月逐日累计完成率 [(第几天, 完成率)]"""
+        archive = self.load_month(month)
+        if not archive:
+            return []
+        columns = archive["columns"]
+        return daily_progress_from_days(columns["completed_day"], len(columns["task_id"]))
+
+
+def daily_progress_from_days(completed_days: List[Optional[int]], total: int) -> List[Tuple[int, float]]:
+    """完成日期列 -> 逐日累计完成率"""
+    if total <= 0:
+        return []
+    days = [d for d in completed_days if d]
+    last_day = max(days) if days else 1
+    per_day: Dict[int, int] = {}
+    for d in days:
+        per_day[d] = per_day.get(d, 0) + 1
+    progress = []
+    cumulative = 0
+    for day in range(1, last_day + 1):
+        cumulative += per_day.get(day, 0)
+        progress.append((day, _rate(cumulative, total)))
+    return progress
+
+
+def daily_progress_from_stats(stats: Dict[str, Any]) -> List[Tuple[int, float]]:
+    """当月（未归档）统计的逐日累计完成率，基于各任务真实完成时间"""
+    month = stats.get("current_month", "")
+    tasks = stats.get("tasks") or {}
+    days = [_completed_day(month, info.get("completed_at")) for info in tasks.values() if info.get("completed")]
+    return daily_progress_from_days(days, len(tasks))
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程内统计缓存
+
+只读命令（状态/未完成/我的任务等）反复读取同一份统计数据，
+这里缓存解析后的结构以及由其派生的聚合结果，并按版本号失效：
+- 版本号由调用方提供（如 TaskStatsStore.version() 或文件 mtime）
+- 版本不变时 get()/derive() 不做任何磁盘读取与解析
+- 缓存对象视为只读，调用方如需修改请自行复制
+"""
+
+from __future__ import annotations
+import os
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def file_version(path: str) -> Optional[Tuple[int, int]]:
+    """文件版本号 (mtime_ns, size)，文件不存在返回 None；用于感知外部脚本的改写"""
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+class VersionedCache:
+    """按版本号失效的只读缓存，附带派生聚合结果的记忆化"""
+
+    def __init__(self, loader: Callable[[], Any], version: Callable[[], Hashable], name: str = ""):
+        """
+        Args:
+            loader: 加载完整数据的函数（仅在版本变化时调用）
+            version: 返回当前数据版本号的函数，应当廉价（不读取数据本身）
+            name: 缓存名称，用于日志
+        """
+        self._loader = loader
+        self._version = version
+        self.name = name
+        self._lock = threading.RLock()
+        self._cached_version: Any = None
+        self._data: Any = None
+        self._loaded = False
+        self._derived: Dict[str, Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _refresh(self) -> None:
+        """版本变化（或从未加载）时重新加载，并清空派生结果"""
+        current = self._version()
+        if self._loaded and current == self._cached_version:
+            self.hits += 1
+            return
+        self.misses += 1
+        self._data = self._loader()
+        # 记录加载前的版本号：加载期间若有写入，下次读取会再次刷新
+        self._cached_version = current
+        self._derived = {}
+        self._loaded = True
+        logger.debug("统计缓存刷新: %s version=%s", self.name, current)
+
+    def get(self) -> Any:
+        """返回当前数据（只读）"""
+        with self._lock:
+            self._refresh()
+            return self._data
+
+    def derive(self, key: str, fn: Callable[[Any], Any]) -> Any:
+        """返回由当前数据派生的结果，同一版本内只计算一次"""
+        with self._lock:
+            self._refresh()
+            if key not in self._derived:
+                self._derived[key] = fn(self._data)
+            return self._derived[key]
+
+    def invalidate(self) -> None:
+        """强制下次读取时重新加载"""
+        with self._lock:
+            self._loaded = False
+            self._derived = {}
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+防抖的异步统计写入器
+
+多人几秒内连续回复“已完成”、或整点同步批量更新时，每次状态变化都会在
+事件循环上同步执行一次写事务（含 fsync）。这里把写操作先记入内存：
+- 同一任务在窗口期内的多次变更合并为最终状态
+- 窗口到期后由后台任务在线程池中一次事务写入，不阻塞事件循环
+- flush() 立即落盘，用于关闭前与定时播报前
+- 写入器未启动（脚本、无事件循环）时直接同步写入，行为与原来一致
+"""
+
+from __future__ import annotations
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from task_stats_store import DEFAULT_TASK_TYPE, TaskStatsStore
+
+logger = logging.getLogger(__name__)
+
+
+class DebouncedStatsWriter:
+    """合并窗口期内的统计写入，并在事件循环之外批量提交"""
+
+    def __init__(self, store: TaskStatsStore, window: float = 1.0):
+        """
+        Args:
+            store: 目标统计存储
+            window: 合并窗口（秒），首次变更后最多等待这么久落盘
+        """
+        self.store = store
+        self.window = window
+        self._lock = threading.Lock()
+        # task_id -> {"upsert": kwargs | None, "completed": (bool, completed_at, source) | None}
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._events: List[Tuple[str, Optional[Dict[str, Any]], Optional[str]]] = []
+        self._dirty: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self.flushes = 0
+        self.coalesced = 0
+
+    # ---------------------- 生命周期 ----------------------
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """在当前事件循环中启动后台写入任务"""
+        if self.running:
+            return
+        self._dirty = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+        logger.info("统计写入器已启动（合并窗口 %.1fs）", self.window)
+
+    async def stop(self) -> None:
+        """停止后台任务并写入剩余变更"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.flush_sync()
+        logger.info("统计写入器已停止（共落盘 %d 次，合并 %d 次写入）", self.flushes, self.coalesced)
+
+    async def _run(self) -> None:
+        while True:
+            await self._dirty.wait()
+            await asyncio.sleep(self.window)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("统计写入失败，下个窗口重试: %s", e)
+                self._dirty.set()
+
+    # ---------------------- 写入接口（与 TaskStatsStore 同名） ----------------------
+
+    def _now_iso(self) -> str:
+        # 时间戳按提交时刻（而非落盘时刻）记录，时区与存储一致
+        tz = self.store.tz
+        return (datetime.now(tz) if tz else datetime.now().astimezone()).isoformat()
+
+    def _entry(self, task_id: str) -> Dict[str, Any]:
+        entry = self._pending.get(task_id)
+        if entry is None:
+            entry = self._pending[task_id] = {"upsert": None, "completed": None}
+        else:
+            self.coalesced += 1
+        return entry
+
+    def _submitted(self) -> None:
+        if self.running:
+            self._dirty.set()
+        else:
+            self.flush_sync()
+
+    def upsert_task(self, task_id: str, title: str, assignees: List[str],
+                    task_type: str = DEFAULT_TASK_TYPE, created_at: Optional[str] = None) -> None:
+        with self._lock:
+            entry = self._entry(task_id)
+            # 与 INSERT OR IGNORE 一致：以第一次登记为准
+            if entry["upsert"] is None:
+                entry["upsert"] = {
+                    "title": title,
+                    "assignees": list(assignees or []),
+                    "task_type": task_type,
+                    "created_at": created_at or self._now_iso(),
+                }
+        self._submitted()
+
+    def set_completed(self, task_id: str, completed: bool = True, completed_at: Optional[str] = None,
+                      source: str = "manual") -> None:
+        with self._lock:
+            if completed:
+                completed_at = completed_at or self._now_iso()
+            # 窗口内多次切换只保留最终状态
+            self._entry(task_id)["completed"] = (completed, completed_at, source)
+        self._submitted()
+
+    def record_event(self, event: str, payload: Optional[Dict[str, Any]] = None,
+                     task_id: Optional[str] = None) -> None:
+        with self._lock:
+            self._events.append((event, payload, task_id))
+        self._submitted()
+
+    def queued_completion(self, task_id: str) -> Optional[bool]:
+        """排队中（尚未落盘）的完成状态，没有排队变更时返回 None"""
+        with self._lock:
+            entry = self._pending.get(task_id)
+            return entry["completed"][0] if entry and entry["completed"] else None
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending) + len(self._events)
+
+    # ---------------------- 落盘 ----------------------
+
+    def _drain(self) -> Tuple[Dict[str, Dict[str, Any]], List[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]]:
+        with self._lock:
+            pending, events = self._pending, self._events
+            self._pending, self._events = {}, []
+        if self._dirty is not None:
+            self._dirty.clear()
+        return pending, events
+
+    def _apply(self, pending: Dict[str, Dict[str, Any]],
+               events: List[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]) -> int:
+        """一次事务写入全部变更，返回实际发生变化的完成状态数"""
+        changed = 0
+        with self.store.batch():
+            for task_id, entry in pending.items():
+                if entry["upsert"] is not None:
+                    self.store.upsert_task(task_id, **entry["upsert"])
+                if entry["completed"] is not None:
+                    completed, completed_at, source = entry["completed"]
+                    if self.store.set_completed(task_id, completed, completed_at=completed_at, source=source):
+                        changed += 1
+            for event, payload, task_id in events:
+                self.store.record_event(event, payload, task_id)
+        return changed
+
+    def _write(self, pending, events) -> None:
+        try:
+            changed = self._apply(pending, events)
+        except Exception:
+            # 写入失败时放回队列（已有的新变更优先），等待下次落盘
+            with self._lock:
+                for task_id, entry in pending.items():
+                    current = self._pending.setdefault(task_id, {"upsert": None, "completed": None})
+                    current["upsert"] = current["upsert"] or entry["upsert"]
+                    current["completed"] = current["completed"] or entry["completed"]
+                self._events[:0] = events
+            raise
+        self.flushes += 1
+        logger.debug("统计写入器落盘: %d 个任务, %d 条事件, 状态变化 %d", len(pending), len(events), changed)
+
+    def flush_sync(self) -> None:
+        """在当前线程立即写入（无事件循环的脚本与关闭流程使用）"""
+        pending, events = self._drain()
+        if pending or events:
+            self._write(pending, events)
+
+    async def flush(self) -> None:
+        """立即在线程池中写入全部待写变更（定时播报前、关闭前调用）"""
+        if self._flush_lock is None:
+            self.flush_sync()
+            return
+        async with self._flush_lock:
+            pending, events = self._drain()
+            if pending or events:
+                await asyncio.to_thread(self._write, pending, events)
@@ -4,12 +4,15 @@
 同步已存在的飞书任务
 
 问题：之前使用模拟task_id（task_2025-10_1），与飞书真实任务GUID不匹配
-解决：通过飞书API列出所有任务，根据任务标题匹配，更新task_stats.json
+解决：通过飞书API分页列出所有任务，根据任务标题匹配，更新任务统计存储
+
+用法：
+  python sync_existing_tasks.py                    # 列出全部任务，按标题匹配
+  python sync_existing_tasks.py --tasklist [guid]  # 直接由本月任务清单重建（无需标题匹配）
 """
 
 import os
 import sys
-import json
 import asyncio
 import re
 from datetime import datetime
@@ -30,11 +33,20 @@ except ImportError:
     print("运行: pip install lark-oapi")
     exit(1)
 
+import yaml
+
+from task_listing import (
+    completed_at_iso, is_task_completed, list_tasklist_tasks_paginated, list_tasks_paginated, task_assignees,
+)
+from task_stats_store import TaskStatsStore
+
 # 阿根廷时区
 TZ = pytz.timezone('America/Argentina/Buenos_Aires')
 
 # 配置文件
 TASK_STATS_FILE = os.path.join(os.path.dirname(__file__), "task_stats.json")
+TASK_STATS_DB = os.path.join(os.path.dirname(__file__), "task_stats.db")
+TASKS_FILE = os.path.join(os.path.dirname(__file__), "tasks.yaml")
 ENV_FILE = os.path.join(os.path.dirname(__file__), ".env")
 
 def load_env():
@@ -49,69 +61,19 @@ def load_env():
                     env_vars[key.strip()] = value.strip()
     return env_vars
 
-def load_task_stats() -> Dict[str, Any]:
-    """加载任务统计"""
-    try:
-        if os.path.exists(TASK_STATS_FILE):
-            with open(TASK_STATS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {}
-    except Exception as e:
-        print(f"❌ 加载task_stats.json失败: {e}")
-        return {}
-
-def save_task_stats(stats: Dict[str, Any]) -> None:
-    """保存任务统计"""
-    try:
-        stats["last_update"] = datetime.now(TZ).isoformat()
-        with open(TASK_STATS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(stats, f, ensure_ascii=False, indent=2)
-        print("✅ task_stats.json 已更新")
-    except Exception as e:
-        print(f"❌ 保存task_stats.json失败: {e}")
+def get_store() -> TaskStatsStore:
+    """与机器人共用的任务统计存储"""
+    return TaskStatsStore(TASK_STATS_DB, json_path=TASK_STATS_FILE, tz=TZ)
 
 async def list_all_tasks(client):
-    """列出所有飞书任务"""
-    try:
-        print("\n📋 正在获取飞书任务列表...")
-
-        # 构建请求
-        request = ListTaskRequest.builder() \
-            .page_size(100) \
-            .build()
-
-        response = await client.task.v2.task.alist(request)
-
-        if response.success():
-            tasks = response.data.items or []
-            print(f"✅ 成功获取 {len(tasks)} 个任务")
-            return tasks
-        else:
-            print(f"❌ 获取任务列表失败: code={response.code}, msg={response.msg}")
-            return []
-
-    except Exception as e:
-        print(f"❌ 列出任务异常: {e}")
+    """分页列出所有飞书任务（page_token 游标，每页100条）"""
+    print("\n📋 正在获取飞书任务列表...")
+    tasks = await list_tasks_paginated(client)
+    if tasks is None:
+        print("❌ 获取任务列表失败")
         return []
-
-async def get_task_detail(client, task_guid: str):
-    """获取任务详情（包括完成状态）"""
-    try:
-        request = GetTaskRequest.builder() \
-            .task_guid(task_guid) \
-            .build()
-
-        response = await client.task.v2.task.aget(request)
-
-        if response.success():
-            return response.data.task
-        else:
-            print(f"⚠️ 获取任务详情失败: {task_guid}")
-            return None
-
-    except Exception as e:
-        print(f"❌ 获取任务详情异常: {e}")
-        return None
+    print(f"✅ 成功获取 {len(tasks)} 个任务")
+    return tasks
 
 def normalize_title(title: str) -> str:
     """
@@ -122,6 +84,41 @@ def normalize_title(title: str) -> str:
     title = re.sub(r'^\d{4}-\d{2}\s+', '', title)
     return title.strip()
 
+def load_task_types() -> Dict[str, str]:
+    """tasks.yaml 中 标题 -> 任务类型（仅用于补全类型元数据）"""
+    try:
+        with open(TASKS_FILE, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or []
+        if isinstance(config, dict):
+            config = config.get('tasks', [])
+        return {item['title']: item.get('task_type', '月报') for item in config if item.get('title')}
+    except Exception as e:
+        print(f"⚠️ 读取任务配置失败，任务类型按月报处理: {e}")
+        return {}
+
+async def rebuild_from_tasklist(client, store: TaskStatsStore, month: str, tasklist_guid: str) -> int:
+    """由任务清单直接重建当月统计：GUID、负责人、完成状态均取自清单，无需标题匹配"""
+    remote = await list_tasklist_tasks_paginated(client, tasklist_guid)
+    if remote is None:
+        print("❌ 列出任务清单失败")
+        return 0
+
+    task_types = load_task_types()
+    tasks = {}
+    for task in remote:
+        title = normalize_title(task.summary or "")
+        completed = is_task_completed(task)
+        tasks[task.guid] = {
+            "title": title,
+            "assignees": task_assignees(task),
+            "task_type": task_types.get(title, "月报"),
+            "created_at": None,
+            "completed": completed,
+            "completed_at": completed_at_iso(task, TZ) if completed else None,
+        }
+    store.save({"current_month": month, "tasks": tasks})
+    return len(tasks)
+
 async def main():
     print("=" * 60)
     print("飞书任务同步工具")
@@ -145,13 +142,28 @@ async def main():
         .log_level(lark.LogLevel.ERROR) \
         .build()
 
-    # 加载当前task_stats
-    stats = load_task_stats()
-    if not stats or "tasks" not in stats:
-        print("❌ task_stats.json 为空或格式不正确")
+    current_month = datetime.now(TZ).strftime("%Y-%m")
+    store = get_store()
+
+    # 清单模式：由本月任务清单重建
+    if len(sys.argv) > 1 and sys.argv[1] == "--tasklist":
+        group = env_vars.get('TASKLIST_GROUP') or env_vars.get('CHAT_ID', '')
+        tasklist_guid = sys.argv[2] if len(sys.argv) > 2 else store.tasklist_guid(current_month, group)
+        if not tasklist_guid:
+            print(f"❌ 未找到 {current_month} 的任务清单，请在参数中指定 guid")
+            return
+        count = await rebuild_from_tasklist(client, store, current_month, tasklist_guid)
+        counts = store.counts()
+        store.close()
+        print(f"\n✅ 已由任务清单重建 {count} 个任务: 已完成 {counts['completed_tasks']}，完成率 {counts['completion_rate']}%")
+        return
+
+    # 加载当前任务统计
+    stats = store.load()
+    if not stats["tasks"]:
+        print("❌ 任务统计为空")
         return
 
-    current_month = datetime.now(TZ).strftime("%Y-%m")
     print(f"\n📅 当前月份: {current_month}")
     print(f"📊 本地任务数: {len(stats['tasks'])}")
 
@@ -178,20 +190,18 @@ async def main():
         if not normalized_title.startswith("月报-"):
             continue
 
-        # 获取完成状态
-        task_detail = await get_task_detail(client, task_guid)
-        if task_detail:
-            is_completed = task_detail.complete == 2
-            title_to_guid[normalized_title] = task_guid
-            title_to_status[normalized_title] = is_completed
+        # 列表结果已包含完成状态，无需逐个查询详情
+        is_completed = is_task_completed(task)
+        title_to_guid[normalized_title] = task_guid
+        title_to_status[normalized_title] = is_completed
 
-            status_icon = "✅" if is_completed else "⏳"
-            print(f"  {status_icon} {normalized_title[:50]}...")
+        status_icon = "✅" if is_completed else "⏳"
+        print(f"  {status_icon} {normalized_title[:50]}...")
 
     print(f"\n✅ 找到 {len(title_to_guid)} 个月报任务")
 
-    # 更新task_stats.json
-    print(f"\n🔄 更新 task_stats.json...")
+    # 更新任务统计
+    print(f"\n🔄 更新任务统计...")
     updated_count = 0
     new_tasks = {}
 
@@ -238,8 +248,10 @@ async def main():
     stats["completion_rate"] = completion_rate
     stats["current_month"] = current_month
 
-    # 保存
-    save_task_stats(stats)
+    # 保存（整体替换：任务ID已换为飞书GUID）
+    store.save(stats)
+    store.close()
+    print("✅ 任务统计已更新")
 
     print(f"\n" + "=" * 60)
     print(f"✅ 同步完成！")
@@ -2,16 +2,17 @@
 # -*- coding: utf-8 -*-
 """
 简化版任务同步工具 - 只同步已有任务的完成状态
-不需要列出所有任务，直接使用task_stats.json中的task_id查询状态
+不需要列出所有任务，直接使用任务统计存储中的task_id查询状态
 """
 
 import os
-import json
 import asyncio
 from datetime import datetime
-from typing import Dict, Any
 import pytz
 
+from task_listing import is_task_completed
+from task_stats_store import TaskStatsStore, EVENT_SYNC
+
 try:
     import lark_oapi as lark
     from lark_oapi.api.task.v2 import *
@@ -23,29 +24,9 @@ except ImportError:
 # 阿根廷时区
 TZ = pytz.timezone('America/Argentina/Buenos_Aires')
 
-# 配置文件
+# 配置文件（与机器人共用同一个 SQLite 存储）
 TASK_STATS_FILE = os.path.join(os.path.dirname(__file__), "task_stats.json")
-
-def load_task_stats() -> Dict[str, Any]:
-    """加载任务统计"""
-    try:
-        if os.path.exists(TASK_STATS_FILE):
-            with open(TASK_STATS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {}
-    except Exception as e:
-        print(f"加载task_stats.json失败: {e}")
-        return {}
-
-def save_task_stats(stats: Dict[str, Any]) -> None:
-    """保存任务统计"""
-    try:
-        stats["last_update"] = datetime.now(TZ).isoformat()
-        with open(TASK_STATS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(stats, f, ensure_ascii=False, indent=2)
-        print("✅ task_stats.json 已更新")
-    except Exception as e:
-        print(f"保存task_stats.json失败: {e}")
+TASK_STATS_DB = os.path.join(os.path.dirname(__file__), "task_stats.db")
 
 async def check_task_status(client, task_guid: str) -> int:
     """
@@ -61,7 +42,7 @@ async def check_task_status(client, task_guid: str) -> int:
 
         if response.success():
             task = response.data.task
-            return task.complete  # 2=已完成, 1=进行中
+            return 2 if is_task_completed(task) else 1
         else:
             print(f"  ⚠️ 查询失败: {task_guid[:20]}... (code={response.code})")
             return 0
@@ -94,10 +75,11 @@ async def main():
         .app_secret(APP_SECRET) \
         .build()
 
-    # 加载当前task_stats
-    stats = load_task_stats()
-    if not stats or "tasks" not in stats:
-        print("❌ task_stats.json 为空或格式不正确")
+    # 加载当前任务统计
+    store = TaskStatsStore(TASK_STATS_DB, json_path=TASK_STATS_FILE, tz=TZ)
+    stats = store.load()
+    if not stats["tasks"]:
+        print("❌ 任务统计为空")
         return
 
     current_month = datetime.now(TZ).strftime("%Y-%m")
@@ -123,13 +105,11 @@ async def main():
         new_completed = (complete_status == 2)
 
         if new_completed != old_completed:
-            # 状态变化
-            stats["tasks"][task_guid]["completed"] = new_completed
+            # 状态变化：单行更新，不重写其他任务
+            store.set_completed(task_guid, new_completed, source="sync")
             if new_completed:
-                stats["tasks"][task_guid]["completed_at"] = datetime.now(TZ).isoformat()
                 print(f"  ✅ {title}... (已完成)")
             else:
-                stats["tasks"][task_guid]["completed_at"] = None
                 print(f"  ⏳ {title}... (未完成)")
             updated_count += 1
         else:
@@ -138,19 +118,14 @@ async def main():
             unchanged_count += 1
             # print(f"  {status_icon} {title}... (无变化)")
 
+    store.record_event(EVENT_SYNC, {"checked": len(stats["tasks"]), "updated": updated_count, "tool": "sync_task_status_only"})
+
     # 重新计算统计
-    total_tasks = len(stats["tasks"])
-    completed_tasks = sum(1 for t in stats["tasks"].values() if t.get("completed", False))
-    completion_rate = round((completed_tasks / total_tasks) * 100, 2) if total_tasks > 0 else 0.0
-
-    # 更新stats
-    stats["total_tasks"] = total_tasks
-    stats["completed_tasks"] = completed_tasks
-    stats["completion_rate"] = completion_rate
-    stats["current_month"] = current_month
-
-    # 保存
-    save_task_stats(stats)
+    counts = store.counts()
+    total_tasks = counts["total_tasks"]
+    completed_tasks = counts["completed_tasks"]
+    completion_rate = counts["completion_rate"]
+    store.close()
 
     print(f"\n" + "=" * 60)
     print(f"✅ 同步完成！")
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+飞书任务分页拉取与本地差异比对
+
+按任务逐个 GetTaskRequest 查询时 N 个任务需要 N 次请求；这里改为分页列出：
+- ListTaskRequest 按 page_token 游标翻页（每页最多 100 条），一次同步 ceil(N/100) 次请求
+- 可只拉取已完成任务（completed=True），并按 updated_at 水位线跳过上次同步前已处理的任务
+- 每月每群一个任务清单（tasklist），创建任务时挂入清单，同步与恢复只需翻页该清单
+- diff_completions 一次遍历与本地统计比对，得出需要标记完成的任务
+"""
+
+from __future__ import annotations
+import hashlib
+import logging
+from datetime import datetime, tzinfo
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 100
+MAX_PAGES = 200
+
+
+def _to_int(value: Any) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def is_task_completed(task: Any) -> bool:
+    """任务 v2 的完成判断：status == done 或 completed_at 非 0（兼容旧版 complete == 2）"""
+    if getattr(task, "status", None) == "done":
+        return True
+    if _to_int(getattr(task, "completed_at", None)) > 0:
+        return True
+    return getattr(task, "complete", None) == 2
+
+
+def completed_at_iso(task: Any, tz: Optional[tzinfo] = None) -> Optional[str]:
+    """远端完成时间（毫秒时间戳）-> ISO 字符串，没有完成时间返回 None"""
+    ms = _to_int(getattr(task, "completed_at", None))
+    if ms <= 0:
+        return None
+    return datetime.fromtimestamp(ms / 1000, tz).isoformat()
+
+
+async def _paginate(fetch_page: Callable[[Optional[str]], Awaitable[Any]], what: str,
+                    max_pages: int = MAX_PAGES) -> Optional[List[Any]]:
+    """按 page_token 游标翻页直到 has_more 为 False，任一页失败返回 None"""
+    items: List[Any] = []
+    page_token: Optional[str] = None
+    pages = 0
+    while pages < max_pages:
+        response = await fetch_page(page_token)
+        pages += 1
+        if not response.success():
+            logger.warning("分页列出%s失败: page=%d, code=%s, msg=%s", what, pages, response.code, response.msg)
+            return None
+
+        data = response.data
+        items.extend((data.items if data else None) or [])
+        if not data or not data.has_more or not data.page_token:
+            break
+        page_token = data.page_token
+    else:
+        logger.warning("分页列出%s达到翻页上限 %d，结果可能不完整", what, max_pages)
+
+    logger.info("分页列出%s: %d 页, %d 条", what, pages, len(items))
+    return items
+
+
+async def list_tasks_paginated(
+    client: Any,
+    completed: Optional[bool] = None,
+    updated_after_ms: Optional[int] = None,
+    page_size: int = PAGE_SIZE,
+    max_pages: int = MAX_PAGES,
+) -> Optional[List[Any]]:
+    """按 page_token 游标列出全部任务
+
+    Args:
+        client: lark_oapi 客户端
+        completed: 仅列出已完成（True）/未完成（False）的任务，None 为全部
+        updated_after_ms: 跳过 updated_at 不晚于该毫秒时间戳的任务（增量同步水位线）
+        max_pages: 翻页上限，防止异常游标导致死循环
+
+    Returns:
+        任务列表；任一页请求失败返回 None（调用方可回退到逐个查询）
+    """
+    from lark_oapi.api.task.v2 import ListTaskRequest
+
+    async def fetch_page(page_token: Optional[str]) -> Any:
+        builder = ListTaskRequest.builder().page_size(page_size).user_id_type("open_id")
+        if completed is not None:
+            builder = builder.completed(completed)
+        if page_token:
+            builder = builder.page_token(page_token)
+        return await client.task.v2.task.alist(builder.build())
+
+    items = await _paginate(fetch_page, "任务", max_pages)
+    if items is None or updated_after_ms is None:
+        return items
+    fresh = [task for task in items if _to_int(getattr(task, "updated_at", None)) > updated_after_ms]
+    logger.info("水位线前跳过 %d 个任务", len(items) - len(fresh))
+    return fresh
+
+
+async def list_tasklist_tasks_paginated(
+    client: Any,
+    tasklist_guid: str,
+    completed: Optional[bool] = None,
+    page_size: int = PAGE_SIZE,
+    max_pages: int = MAX_PAGES,
+) -> Optional[List[Any]]:
+    """翻页列出某个任务清单中的任务（TaskSummary：guid/summary/completed_at/members）"""
+    from lark_oapi.api.task.v2 import TasksTasklistRequest
+
+    async def fetch_page(page_token: Optional[str]) -> Any:
+        builder = TasksTasklistRequest.builder() \
+            .tasklist_guid(tasklist_guid) \
+            .page_size(page_size) \
+            .user_id_type("open_id")
+        if completed is not None:
+            builder = builder.completed(completed)
+        if page_token:
+            builder = builder.page_token(page_token)
+        return await client.task.v2.tasklist.atasks(builder.build())
+
+    return await _paginate(fetch_page, "清单任务", max_pages)
+
+
+# ---------------------- 任务清单 ----------------------
+
+def tasklist_client_token(month: str, group: str) -> str:
+    """同一月份、同一群的任务清单使用固定幂等键，重复创建请求只会得到同一个清单"""
+    digest = hashlib.sha1(f"{month}|{group}".encode("utf-8")).hexdigest()[:24]
+    return f"mrb-tasklist-{month}-{digest}"
+
+
+def task_client_token(month: str, title: str) -> str:
+    """同一月份、同一标题的任务使用固定幂等键：重跑创建只会返回已创建的任务，不会重复创建"""
+    digest = hashlib.sha1(f"{month}|{title}".encode("utf-8")).hexdigest()[:24]
+    return f"mrb-task-{month}-{digest}"
+
+
+async def find_tasklist(client: Any, name: str) -> Optional[str]:
+    """按名称查找未归档的任务清单，返回 guid"""
+    from lark_oapi.api.task.v2 import ListTasklistRequest
+
+    async def fetch_page(page_token: Optional[str]) -> Any:
+        builder = ListTasklistRequest.builder().page_size(PAGE_SIZE).user_id_type("open_id")
+        if page_token:
+            builder = builder.page_token(page_token)
+        return await client.task.v2.tasklist.alist(builder.build())
+
+    tasklists = await _paginate(fetch_page, "任务清单")
+    for tasklist in tasklists or []:
+        if getattr(tasklist, "name", None) == name and not _to_int(getattr(tasklist, "archive_msec", None)):
+            return tasklist.guid
+    return None
+
+
+async def ensure_tasklist(client: Any, name: str, client_token: Optional[str] = None) -> Optional[str]:
+    """复用同名任务清单，不存在则创建；失败返回 None（任务仍可不挂清单创建）"""
+    from lark_oapi.api.task.v2 import CreateTasklistRequest, InputTasklist
+
+    try:
+        guid = await find_tasklist(client, name)
+        if guid:
+            logger.info("复用任务清单: %s (%s)", name, guid)
+            return guid
+
+        body = InputTasklist.builder().name(name)
+        if client_token:
+            body = body.client_token(client_token)
+        request = CreateTasklistRequest.builder() \
+            .request_body(body.build()) \
+            .user_id_type("open_id") \
+            .build()
+        response = await client.task.v2.tasklist.acreate(request)
+        if not response.success():
+            logger.error("创建任务清单失败: %s, code=%s, msg=%s", name, response.code, response.msg)
+            return None
+        guid = response.data.tasklist.guid
+        logger.info("已创建任务清单: %s (%s)", name, guid)
+        return guid
+    except Exception as e:
+        logger.error("准备任务清单异常: %s, %s", name, e)
+        return None
+
+
+def task_assignees(task: Any) -> List[str]:
+    """任务成员中的负责人 open_id"""
+    return [
+        member.id for member in (getattr(task, "members", None) or [])
+        if getattr(member, "role", None) == "assignee" and getattr(member, "id", None)
+    ]
+
+
+def diff_completions(local_tasks: Dict[str, Dict[str, Any]], remote_tasks: Iterable[Any],
+                     tz: Optional[tzinfo] = None) -> Dict[str, Optional[str]]:
+    """与本地统计比对：本地未完成、远端已完成的任务 -> 远端完成时间（ISO，可能为 None）
+
+    只做“未完成 -> 已完成”的单向合并，与逐个查询时不降级的规则一致。
+    """
+    changes: Dict[str, Optional[str]] = {}
+    for task in remote_tasks:
+        guid = getattr(task, "guid", None)
+        info = local_tasks.get(guid) if guid else None
+        if info is None or info.get("completed"):
+            continue
+        if is_task_completed(task):
+            changes[guid] = completed_at_iso(task, tz)
+    return changes
@@ -7,11 +7,13 @@
 
 import os
 import sys
-import json
 import yaml
 import pytz
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Optional, Any
+
+from task_stats_store import TaskStatsStore
+from stats_archive import StatsArchive
 
 # 设置环境变量
 os.environ["TZ"] = "America/Argentina/Buenos_Aires"
@@ -21,21 +23,22 @@ TZ = pytz.timezone("America/Argentina/Buenos_Aires")
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 TASKS_FILE = os.path.join(BASE_DIR, "tasks.yaml")
 TASK_STATS_FILE = os.path.join(BASE_DIR, "task_stats.json")
+TASK_STATS_DB = os.path.join(BASE_DIR, "task_stats.db")
+ARCHIVE_DIR = os.path.join(BASE_DIR, "archives")
+
+_store = None
+
+def get_store() -> TaskStatsStore:
+    """获取与机器人共用的任务统计存储"""
+    global _store
+    if _store is None:
+        _store = TaskStatsStore(TASK_STATS_DB, json_path=TASK_STATS_FILE, tz=TZ)
+    return _store
 
 def load_task_stats() -> Dict[str, Any]:
     """加载任务统计信息"""
     try:
-        if os.path.exists(TASK_STATS_FILE):
-            with open(TASK_STATS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {
-            "current_month": datetime.now(TZ).strftime("%Y-%m"),
-            "tasks": {},
-            "total_tasks": 0,
-            "completed_tasks": 0,
-            "completion_rate": 0.0,
-            "last_update": datetime.now(TZ).isoformat()
-        }
+        return get_store().load()
     except Exception as e:
         print(f"加载任务统计失败: {e}")
         return {
@@ -47,16 +50,6 @@ def load_task_stats() -> Dict[str, Any]:
             "last_update": datetime.now(TZ).isoformat()
         }
 
-def save_task_stats(stats: Dict[str, Any]) -> None:
-    """保存任务统计信息"""
-    try:
-        stats["last_update"] = datetime.now(TZ).isoformat()
-        with open(TASK_STATS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(stats, f, ensure_ascii=False, indent=2)
-        print("✅ 统计信息已保存")
-    except Exception as e:
-        print(f"❌ 保存任务统计失败: {e}")
-
 def load_tasks() -> List[Dict[str, Any]]:
     """加载任务配置"""
     try:
@@ -103,39 +96,17 @@ def mark_task_completed(task_id: str) -> None:
     """标记任务为已完成"""
     print(f"🔧 标记任务完成: {task_id}")
     
-    stats = load_task_stats()
+    store = get_store()
     current_month = datetime.now(TZ).strftime("%Y-%m")
     
-    # 如果是新月份，重置统计
-    if stats["current_month"] != current_month:
-        stats = {
-            "current_month": current_month,
-            "tasks": {},
-            "total_tasks": 0,
-            "completed_tasks": 0,
-            "completion_rate": 0.0,
-            "last_update": datetime.now(TZ).isoformat()
-        }
+    # 如果是新月份，归档上月后重置统计
+    if store.current_month() != current_month:
+        StatsArchive(ARCHIVE_DIR).archive_and_reset(store, current_month)
     
     # 更新任务状态
-    if task_id not in stats["tasks"]:
-        stats["tasks"][task_id] = {
-            "created_at": datetime.now(TZ).isoformat(),
-            "completed": False,
-            "completed_at": None
-        }
-        stats["total_tasks"] += 1
+    store.upsert_task(task_id, "", [])
     
-    if not stats["tasks"][task_id]["completed"]:
-        stats["tasks"][task_id]["completed"] = True
-        stats["tasks"][task_id]["completed_at"] = datetime.now(TZ).isoformat()
-        stats["completed_tasks"] += 1
-        
-        # 计算完成率
-        if stats["total_tasks"] > 0:
-            stats["completion_rate"] = round(stats["completed_tasks"] / stats["total_tasks"] * 100, 2)
-        
-        save_task_stats(stats)
+    if store.set_completed(task_id, True):
         print(f"✅ 任务 {task_id} 已标记为完成")
     else:
         print(f"⚠️  任务 {task_id} 已经是完成状态")
@@ -144,18 +115,7 @@ def mark_task_incomplete(task_id: str) -> None:
     """标记任务为未完成"""
     print(f"🔧 标记任务未完成: {task_id}")
     
-    stats = load_task_stats()
-    
-    if task_id in stats["tasks"] and stats["tasks"][task_id]["completed"]:
-        stats["tasks"][task_id]["completed"] = False
-        stats["tasks"][task_id]["completed_at"] = None
-        stats["completed_tasks"] -= 1
-        
-        # 计算完成率
-        if stats["total_tasks"] > 0:
-            stats["completion_rate"] = round(stats["completed_tasks"] / stats["total_tasks"] * 100, 2)
-        
-        save_task_stats(stats)
+    if get_store().set_completed(task_id, False):
         print(f"✅ 任务 {task_id} 已标记为未完成")
     else:
         print(f"⚠️  任务 {task_id} 本来就是未完成状态")
@@ -165,18 +125,48 @@ def reset_monthly_stats() -> None:
     print("🔄 重置月度统计")
     
     current_month = datetime.now(TZ).strftime("%Y-%m")
-    stats = {
-        "current_month": current_month,
-        "tasks": {},
-        "total_tasks": 0,
-        "completed_tasks": 0,
-        "completion_rate": 0.0,
-        "last_update": datetime.now(TZ).isoformat()
-    }
-    
-    save_task_stats(stats)
+    archived = StatsArchive(ARCHIVE_DIR).archive_and_reset(get_store(), current_month)
+    if archived:
+        print(f"📦 重置前数据已归档: {archived}")
     print(f"✅ {current_month} 月度统计已重置")
 
+def show_history(start: Optional[str] = None, end: Optional[str] = None) -> None:
+    """显示历史归档的按月完成率"""
+    archive = StatsArchive(ARCHIVE_DIR)
+    rows = archive.completion_by_month(start, end)
+    if not rows:
+        print("📭 暂无历史归档")
+        return
+    print("📦 历史月度完成率:")
+    for row in rows:
+        print(f"  {row['month']}: {row['completed']}/{row['total']} ({row['completion_rate']}%)")
+        for ttype, counts in archive.completion_by_type(row['month'], row['month']).get(row['month'], {}).items():
+            print(f"      {ttype}: {counts['completed']}/{counts['total']} ({counts['completion_rate']}%)")
+
+def export_stats(path: str) -> None:
+    """导出为 task_stats.json 结构（供仍读取 JSON 的脚本使用）"""
+    try:
+        get_store().export_json(path)
+        print(f"✅ 已导出到 {path}")
+    except Exception as e:
+        print(f"❌ 导出失败: {e}")
+
+def compact_stats() -> None:
+    """生成快照并压缩事件日志"""
+    seq = get_store().compact()
+    print(f"✅ 已生成快照（事件序号 {seq}）")
+
+def show_events(task_id: Optional[str] = None) -> None:
+    """显示当月事件日志（审计）"""
+    store = get_store()
+    for ev in store.events(month=store.current_month(), task_id=task_id):
+        print(f"#{ev['seq']} {ev['ts']} {ev['event']:<8} {ev['task_id'] or '-'} {ev['payload']}")
+
+def import_stats(path: str) -> None:
+    """从 task_stats.json 结构的文件导入（覆盖当前数据）"""
+    count = get_store().migrate_from_json(path)
+    print(f"✅ 已从 {path} 导入 {count} 个任务")
+
 def show_help() -> None:
     """显示帮助信息"""
     print("="*60)
@@ -189,7 +179,12 @@ def show_help() -> None:
     print("  stats                    - 显示统计信息")
     print("  complete <task_id>       - 标记任务为已完成")
     print("  incomplete <task_id>     - 标记任务为未完成")
-    print("  reset                    - 重置月度统计")
+    print("  reset                    - 归档并重置月度统计")
+    print("  export [path]            - 导出为 task_stats.json 格式")
+    print("  import [path]            - 从 task_stats.json 格式导入")
+    print("  compact                  - 生成快照并压缩事件日志")
+    print("  events [task_id]         - 显示当月事件日志")
+    print("  history [start] [end]    - 显示历史月度完成率（YYYY-MM）")
     print("  help                     - 显示此帮助信息")
     print()
     print("示例:")
@@ -222,6 +217,16 @@ def main():
         mark_task_incomplete(task_id)
     elif command == "reset":
         reset_monthly_stats()
+    elif command == "export":
+        export_stats(sys.argv[2] if len(sys.argv) > 2 else TASK_STATS_FILE)
+    elif command == "import":
+        import_stats(sys.argv[2] if len(sys.argv) > 2 else TASK_STATS_FILE)
+    elif command == "compact":
+        compact_stats()
+    elif command == "events":
+        show_events(sys.argv[2] if len(sys.argv) > 2 else None)
+    elif command == "history":
+        show_history(sys.argv[2] if len(sys.argv) > 2 else None, sys.argv[3] if len(sys.argv) > 3 else None)
     elif command == "help":
         show_help()
     else:
@@ -0,0 +1,862 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务统计存储（SQLite）
+
+替代整文件读写的 task_stats.json：
+1. SQLite WAL 模式，读写互不阻塞，机器人与维护脚本可同时访问；
+   读取使用独立连接，不等待本进程中正在提交的写事务
+2. 按任务行级更新，完成一个任务只需一次按主键的 UPDATE
+3. 首次打开时自动从旧版 task_stats.json 迁移数据
+4. load()/save() 保持旧版 JSON 结构，便于存量代码平滑切换
+5. version() 提供变更版本号，供进程内缓存判断数据是否变化
+6. 二级索引：负责人 -> 任务、任务类型 -> 任务，以及按类型/负责人的计数器，
+   随每次写入增量维护，按人/按类型查询只与该人/该类型的任务数相关
+7. 事件日志：创建/完成/同步等事件与状态变更在同一事务中追加写入，
+   定期生成快照并压缩旧事件；数据库损坏时可由快照 + 事件快速重放恢复
+8. 远端重试队列：飞书写操作（如标记任务完成）失败时持久化排队，重启后继续重试
+9. 任务创建进度：按 (月份, 标题) 记录幂等键与创建结果，中断或部分失败后只补建缺失任务
+"""
+
+from __future__ import annotations
+import os
+import json
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime, tzinfo
+from typing import Dict, Iterator, List, Optional, Tuple, Any
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TASK_TYPE = "月报"
+
+# 旧版 JSON 中任务条目的已知字段，其余字段统一存入 extra 列
+_TASK_COLUMNS = ("title", "assignees", "task_type", "created_at", "completed", "completed_at")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id      TEXT PRIMARY KEY,
+    title        TEXT NOT NULL DEFAULT '',
+    assignees    TEXT NOT NULL DEFAULT '[]',
+    task_type    TEXT NOT NULL DEFAULT '月报',
+    created_at   TEXT,
+    completed    INTEGER NOT NULL DEFAULT 0,
+    completed_at TEXT,
+    extra        TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_completed ON tasks(completed);
+CREATE INDEX IF NOT EXISTS idx_tasks_type ON tasks(task_type, completed);
+CREATE TABLE IF NOT EXISTS task_assignees (
+    assignee TEXT NOT NULL,
+    task_id  TEXT NOT NULL,
+    PRIMARY KEY (assignee, task_id)
+);
+CREATE INDEX IF NOT EXISTS idx_task_assignees_task ON task_assignees(task_id);
+CREATE TABLE IF NOT EXISTS type_counters (
+    task_type TEXT PRIMARY KEY,
+    total     INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS assignee_counters (
+    assignee  TEXT PRIMARY KEY,
+    total     INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS task_events (
+    seq     INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts      TEXT NOT NULL,
+    month   TEXT,
+    event   TEXT NOT NULL,
+    task_id TEXT,
+    payload TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS idx_task_events_month ON task_events(month, seq);
+CREATE TABLE IF NOT EXISTS task_polls (
+    task_id      TEXT PRIMARY KEY,
+    last_checked REAL NOT NULL,
+    next_check   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_task_polls_next ON task_polls(next_check);
+CREATE TABLE IF NOT EXISTS remote_retries (
+    task_id      TEXT NOT NULL,
+    action       TEXT NOT NULL,
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    last_error   TEXT NOT NULL DEFAULT '',
+    created_at   TEXT NOT NULL,
+    PRIMARY KEY (task_id, action)
+);
+CREATE INDEX IF NOT EXISTS idx_remote_retries_next ON remote_retries(next_attempt);
+CREATE TABLE IF NOT EXISTS task_creations (
+    month        TEXT NOT NULL,
+    title        TEXT NOT NULL,
+    client_token TEXT NOT NULL,
+    task_guid    TEXT,
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    last_error   TEXT NOT NULL DEFAULT '',
+    updated_at   TEXT NOT NULL,
+    PRIMARY KEY (month, title)
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    seq        INTEGER PRIMARY KEY,
+    month      TEXT,
+    created_at TEXT NOT NULL,
+    data       TEXT NOT NULL
+);
+"""
+
+# 索引结构版本：不一致时启动时全量重建一次
+_INDEX_VERSION = "1"
+
+# 事件类型
+EVENT_CREATE = "create"
+EVENT_COMPLETE = "complete"
+EVENT_REOPEN = "reopen"
+EVENT_RESET = "reset"
+EVENT_REPLACE = "replace"
+EVENT_SYNC = "sync"
+
+
+def apply_event(state: Dict[str, Any], event: str, month: Optional[str], task_id: Optional[str],
+                payload: Dict[str, Any]) -> None:
+    """将单条事件应用到 {"current_month", "tasks"} 结构上（重放用，与写入路径语义一致）"""
+    tasks = state.setdefault("tasks", {})
+    if event == EVENT_RESET:
+        state["current_month"] = payload.get("month") or month
+        tasks.clear()
+    elif event == EVENT_REPLACE:
+        state["current_month"] = payload.get("current_month") or month
+        tasks.clear()
+        tasks.update(json.loads(json.dumps(payload.get("tasks") or {})))
+    elif event == EVENT_CREATE and task_id:
+        if state.get("current_month") is None:
+            state["current_month"] = month
+        tasks.setdefault(task_id, {
+            "title": payload.get("title", ""),
+            "assignees": list(payload.get("assignees") or []),
+            "task_type": payload.get("task_type") or DEFAULT_TASK_TYPE,
+            "created_at": payload.get("created_at"),
+            "completed": False,
+            "completed_at": None,
+        })
+    elif event == EVENT_COMPLETE and task_id in tasks:
+        tasks[task_id]["completed"] = True
+        tasks[task_id]["completed_at"] = payload.get("completed_at")
+    elif event == EVENT_REOPEN and task_id in tasks:
+        tasks[task_id]["completed"] = False
+        tasks[task_id]["completed_at"] = None
+    # EVENT_SYNC 等审计事件不改变状态
+
+
+def _completion_flags(tasks: Dict[str, Any]) -> Dict[str, bool]:
+    return {task_id: bool(info.get("completed")) for task_id, info in tasks.items()}
+
+
+class TaskStatsStore:
+    """基于 SQLite 的任务统计存储"""
+
+    def __init__(self, db_path: str, json_path: Optional[str] = None, tz: Optional[tzinfo] = None):
+        """
+        Args:
+            db_path: SQLite 数据库文件路径
+            json_path: 旧版 task_stats.json 路径，数据库为空时从此文件迁移
+            tz: 生成时间戳所用时区，默认本地时区
+        """
+        self.db_path = db_path
+        self.json_path = json_path
+        self.tz = tz
+        self._lock = threading.RLock()
+        self._local_version = 0
+        self._conn = sqlite3.connect(db_path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # FULL：每次提交都 fsync，事件日志在进程或机器崩溃后仍然完整
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+        # 独立的读连接：WAL 下读取不等待写事务，读请求（事件循环中）也不必等待写连接上
+        # 正在进行的批量提交（fsync）释放 _lock；读连接只看到已提交的数据
+        self._read_lock = threading.Lock()
+        self._read_conn = sqlite3.connect(db_path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._read_conn.row_factory = sqlite3.Row
+        self._read_conn.execute("PRAGMA busy_timeout=5000")
+        if self._get_meta("index_version") != _INDEX_VERSION:
+            with self._transaction():
+                self._rebuild_indexes()
+                self._set_meta("index_version", _INDEX_VERSION)
+
+        if json_path and self._get_meta("current_month") is None:
+            self.migrate_from_json(json_path)
+        elif self._get_meta("current_month") is not None and self._last_seq() == 0 \
+                and self._conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0] == 0:
+            # 早于事件日志的旧库：先生成基线快照，保证之后可以重放
+            self.compact()
+
+    # ---------------------- 基础工具 ----------------------
+
+    def _now(self) -> datetime:
+        return datetime.now(self.tz) if self.tz else datetime.now().astimezone()
+
+    def _now_iso(self) -> str:
+        return self._now().isoformat()
+
+    def _get_meta(self, key: str, conn: Optional[sqlite3.Connection] = None) -> Optional[str]:
+        row = (conn or self._conn).execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self._conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value),
+        )
+
+    def _touch(self) -> None:
+        self._set_meta("last_update", self._now_iso())
+
+    def _append_event(self, event: str, task_id: Optional[str] = None,
+                      payload: Optional[Dict[str, Any]] = None, month: Optional[str] = None) -> None:
+        """追加一条事件（须在写事务内调用，与状态变更一同提交）"""
+        self._conn.execute(
+            "INSERT INTO task_events (ts, month, event, task_id, payload) VALUES (?, ?, ?, ?, ?)",
+            (
+                self._now_iso(),
+                month or self._get_meta("current_month"),
+                event,
+                task_id,
+                json.dumps(payload or {}, ensure_ascii=False),
+            ),
+        )
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """写事务：BEGIN IMMEDIATE 提前拿写锁，避免多进程并发时锁升级失败
+
+        已处于事务中（如 batch() 内）时直接复用外层事务，由外层统一提交。
+        """
+        with self._lock:
+            if self._conn.in_transaction:
+                yield self._conn
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            self._local_version += 1
+
+    @contextmanager
+    def _reading(self) -> Iterator[sqlite3.Connection]:
+        """读连接（与写入的 _lock 互不等待）"""
+        with self._read_lock:
+            yield self._read_conn
+
+    @contextmanager
+    def batch(self) -> Iterator["TaskStatsStore"]:
+        """批量写入：块内的 upsert_task/set_completed/record_event 合并为一次提交（一次 fsync）"""
+        with self._transaction():
+            yield self
+
+    def version(self) -> Tuple[int, int]:
+        """数据版本号：本连接的提交计数 + SQLite data_version（其他进程提交后变化）
+
+        不读取任何数据页，可在每次读请求前廉价调用以判断缓存是否失效。
+        """
+        with self._reading() as conn:
+            row = conn.execute("PRAGMA data_version").fetchone()
+            return self._local_version, int(row[0])
+
+    @staticmethod
+    def _row_to_task(row: sqlite3.Row) -> Dict[str, Any]:
+        """数据库行 -> 旧版 JSON 任务条目"""
+        task: Dict[str, Any] = {}
+        try:
+            task.update(json.loads(row["extra"] or "{}"))
+        except ValueError:
+            pass
+        task.update({
+            "title": row["title"],
+            "assignees": json.loads(row["assignees"] or "[]"),
+            "task_type": row["task_type"],
+            "created_at": row["created_at"],
+            "completed": bool(row["completed"]),
+            "completed_at": row["completed_at"],
+        })
+        return task
+
+    def _insert_task(self, task_id: str, task_info: Dict[str, Any]) -> None:
+        extra = {k: v for k, v in task_info.items() if k not in _TASK_COLUMNS}
+        self._conn.execute(
+            "INSERT INTO tasks (task_id, title, assignees, task_type, created_at, completed, completed_at, extra) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(task_id) DO UPDATE SET title = excluded.title, assignees = excluded.assignees, "
+            "task_type = excluded.task_type, created_at = excluded.created_at, completed = excluded.completed, "
+            "completed_at = excluded.completed_at, extra = excluded.extra",
+            (
+                task_id,
+                task_info.get("title", "") or "",
+                json.dumps(task_info.get("assignees") or [], ensure_ascii=False),
+                task_info.get("task_type", DEFAULT_TASK_TYPE) or DEFAULT_TASK_TYPE,
+                task_info.get("created_at"),
+                1 if task_info.get("completed", False) else 0,
+                task_info.get("completed_at"),
+                json.dumps(extra, ensure_ascii=False),
+            ),
+        )
+
+    def _rebuild_indexes(self) -> None:
+        """由任务表全量重建负责人索引与计数器（批量写入后调用，须在写事务内）"""
+        self._conn.execute("DELETE FROM task_assignees")
+        rows = self._conn.execute("SELECT task_id, assignees FROM tasks").fetchall()
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO task_assignees (assignee, task_id) VALUES (?, ?)",
+            [(assignee, row["task_id"]) for row in rows for assignee in json.loads(row["assignees"] or "[]")],
+        )
+        self._conn.execute("DELETE FROM type_counters")
+        self._conn.execute(
+            "INSERT INTO type_counters (task_type, total, completed) "
+            "SELECT task_type, COUNT(*), SUM(completed) FROM tasks GROUP BY task_type"
+        )
+        self._conn.execute("DELETE FROM assignee_counters")
+        self._conn.execute(
+            "INSERT INTO assignee_counters (assignee, total, completed) "
+            "SELECT a.assignee, COUNT(*), SUM(t.completed) FROM task_assignees a "
+            "JOIN tasks t ON t.task_id = a.task_id GROUP BY a.assignee"
+        )
+
+    def _clear_indexes(self) -> None:
+        for table in ("task_assignees", "type_counters", "assignee_counters", "task_polls"):
+            self._conn.execute(f"DELETE FROM {table}")
+
+    def _index_new_task(self, task_id: str, assignees: List[str], task_type: str) -> None:
+        """新任务（未完成）写入索引与计数器：O(负责人数)"""
+        self._conn.execute(
+            "INSERT INTO type_counters (task_type, total, completed) VALUES (?, 1, 0) "
+            "ON CONFLICT(task_type) DO UPDATE SET total = total + 1",
+            (task_type,),
+        )
+        for assignee in dict.fromkeys(assignees):
+            self._conn.execute(
+                "INSERT OR IGNORE INTO task_assignees (assignee, task_id) VALUES (?, ?)", (assignee, task_id)
+            )
+            self._conn.execute(
+                "INSERT INTO assignee_counters (assignee, total, completed) VALUES (?, 1, 0) "
+                "ON CONFLICT(assignee) DO UPDATE SET total = total + 1",
+                (assignee,),
+            )
+
+    def _index_completion_change(self, task_id: str, delta: int) -> None:
+        """完成状态变化时增量更新计数器（delta 为 +1/-1）"""
+        self._conn.execute(
+            "UPDATE type_counters SET completed = completed + ? "
+            "WHERE task_type = (SELECT task_type FROM tasks WHERE task_id = ?)",
+            (delta, task_id),
+        )
+        self._conn.execute(
+            "UPDATE assignee_counters SET completed = completed + ? "
+            "WHERE assignee IN (SELECT assignee FROM task_assignees WHERE task_id = ?)",
+            (delta, task_id),
+        )
+
+    # ---------------------- 读取 ----------------------
+
+    def current_month(self) -> Optional[str]:
+        """返回存储中记录的统计月份（空库返回 None）"""
+        with self._reading() as conn:
+            return self._get_meta("current_month", conn)
+
+    def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """读取单个任务（按主键）"""
+        with self._reading() as conn:
+            row = conn.execute("SELECT * FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        return self._row_to_task(row) if row else None
+
+    def counts(self) -> Dict[str, Any]:
+        """返回总数、完成数与完成率"""
+        with self._reading() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) AS total, COALESCE(SUM(completed), 0) AS done FROM tasks"
+            ).fetchone()
+        total, done = int(row["total"]), int(row["done"])
+        return {
+            "total_tasks": total,
+            "completed_tasks": done,
+            "completion_rate": round(done / total * 100, 2) if total > 0 else 0.0,
+        }
+
+    def load(self) -> Dict[str, Any]:
+        """以旧版 task_stats.json 的结构返回全部统计数据"""
+        with self._reading() as conn:
+            rows = conn.execute("SELECT * FROM tasks ORDER BY rowid").fetchall()
+            current_month = self._get_meta("current_month", conn) or self._now().strftime("%Y-%m")
+            last_update = self._get_meta("last_update", conn) or self._now_iso()
+        tasks = {row["task_id"]: self._row_to_task(row) for row in rows}
+        total = len(tasks)
+        done = sum(1 for t in tasks.values() if t["completed"])
+        return {
+            "current_month": current_month,
+            "tasks": tasks,
+            "total_tasks": total,
+            "completed_tasks": done,
+            "completion_rate": round(done / total * 100, 2) if total > 0 else 0.0,
+            "last_update": last_update,
+        }
+
+    # ---------------------- 索引查询 ----------------------
+
+    def tasks_for_assignee(self, assignee: str, pending_only: bool = False) -> Dict[str, Dict[str, Any]]:
+        """某负责人的任务（走负责人索引，代价与其任务数成正比）"""
+        sql = ("SELECT t.* FROM task_assignees a JOIN tasks t ON t.task_id = a.task_id "
+               "WHERE a.assignee = ?")
+        if pending_only:
+            sql += " AND t.completed = 0"
+        with self._reading() as conn:
+            rows = conn.execute(sql + " ORDER BY t.rowid", (assignee,)).fetchall()
+        return {row["task_id"]: self._row_to_task(row) for row in rows}
+
+    def pending_tasks(self) -> Dict[str, Dict[str, Any]]:
+        """全部未完成任务（走 completed 索引）"""
+        with self._reading() as conn:
+            rows = conn.execute("SELECT * FROM tasks WHERE completed = 0 ORDER BY rowid").fetchall()
+        return {row["task_id"]: self._row_to_task(row) for row in rows}
+
+    def tasks_by_type(self, task_type: str, pending_only: bool = False) -> Dict[str, Dict[str, Any]]:
+        """某类型的任务（走 (task_type, completed) 索引）"""
+        sql = "SELECT * FROM tasks WHERE task_type = ?"
+        if pending_only:
+            sql += " AND completed = 0"
+        with self._reading() as conn:
+            rows = conn.execute(sql + " ORDER BY rowid", (task_type,)).fetchall()
+        return {row["task_id"]: self._row_to_task(row) for row in rows}
+
+    def type_counts(self) -> Dict[str, Dict[str, int]]:
+        """按任务类型的计数器 {task_type: {"total", "completed"}}"""
+        with self._reading() as conn:
+            rows = conn.execute(
+                "SELECT task_type, total, completed FROM type_counters WHERE total > 0"
+            ).fetchall()
+        return {row["task_type"]: {"total": row["total"], "completed": row["completed"]} for row in rows}
+
+    def assignee_counts(self) -> Dict[str, Dict[str, int]]:
+        """按负责人的计数器 {assignee: {"total", "completed"}}"""
+        with self._reading() as conn:
+            rows = conn.execute(
+                "SELECT assignee, total, completed FROM assignee_counters WHERE total > 0"
+            ).fetchall()
+        return {row["assignee"]: {"total": row["total"], "completed": row["completed"]} for row in rows}
+
+    def pending_assignees(self, task_type: Optional[str] = None) -> List[str]:
+        """有未完成任务的负责人（可按类型过滤）"""
+        sql = ("SELECT DISTINCT a.assignee FROM task_assignees a JOIN tasks t ON t.task_id = a.task_id "
+               "WHERE t.completed = 0")
+        params: Tuple[Any, ...] = ()
+        if task_type is not None:
+            sql += " AND t.task_type = ?"
+            params = (task_type,)
+        with self._reading() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [row["assignee"] for row in rows]
+
+    # ---------------------- 写入 ----------------------
+
+    def save(self, stats: Dict[str, Any]) -> None:
+        """整体替换（兼容旧版整文件写入的调用方，日常更新请使用行级接口）"""
+        with self._transaction():
+            self._conn.execute("DELETE FROM tasks")
+            for task_id, task_info in (stats.get("tasks") or {}).items():
+                self._insert_task(task_id, task_info)
+            self._rebuild_indexes()
+            self._conn.execute("DELETE FROM task_polls WHERE task_id NOT IN (SELECT task_id FROM tasks)")
+            month = stats.get("current_month") or self._now().strftime("%Y-%m")
+            self._set_meta("current_month", month)
+            self._append_event(EVENT_REPLACE, payload={"current_month": month, "tasks": stats.get("tasks") or {}})
+            self._touch()
+
+    def reset_month(self, month: str) -> None:
+        """切换统计月份并清空任务"""
+        with self._transaction():
+            self._conn.execute("DELETE FROM tasks")
+            self._clear_indexes()
+            self._set_meta("current_month", month)
+            self._append_event(EVENT_RESET, payload={"month": month}, month=month)
+            self._touch()
+
+    def upsert_task(
+        self,
+        task_id: str,
+        title: str,
+        assignees: List[str],
+        task_type: str = DEFAULT_TASK_TYPE,
+        created_at: Optional[str] = None,
+    ) -> bool:
+        """登记任务（已存在则不改动），返回是否新插入"""
+        created_at = created_at or self._now_iso()
+        with self._transaction():
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO tasks (task_id, title, assignees, task_type, created_at) VALUES (?, ?, ?, ?, ?)",
+                (
+                    task_id,
+                    title or "",
+                    json.dumps(assignees or [], ensure_ascii=False),
+                    task_type or DEFAULT_TASK_TYPE,
+                    created_at,
+                ),
+            )
+            if self._get_meta("current_month") is None:
+                self._set_meta("current_month", self._now().strftime("%Y-%m"))
+            if cur.rowcount > 0:
+                self._index_new_task(task_id, assignees or [], task_type or DEFAULT_TASK_TYPE)
+                self._append_event(EVENT_CREATE, task_id, {
+                    "title": title or "",
+                    "assignees": assignees or [],
+                    "task_type": task_type or DEFAULT_TASK_TYPE,
+                    "created_at": created_at,
+                })
+            self._touch()
+            return cur.rowcount > 0
+
+    def set_completed(self, task_id: str, completed: bool = True, completed_at: Optional[str] = None,
+                      source: str = "manual") -> bool:
+        """更新单个任务完成状态（一次按主键的 UPDATE + 一条事件），返回状态是否发生变化
+
+        Args:
+            source: 变更来源（user/sync/manual 等），记入事件日志便于审计
+        """
+        with self._transaction():
+            if completed:
+                completed_at = completed_at or self._now_iso()
+                cur = self._conn.execute(
+                    "UPDATE tasks SET completed = 1, completed_at = ? WHERE task_id = ? AND completed = 0",
+                    (completed_at, task_id),
+                )
+            else:
+                cur = self._conn.execute(
+                    "UPDATE tasks SET completed = 0, completed_at = NULL WHERE task_id = ? AND completed = 1",
+                    (task_id,),
+                )
+            if cur.rowcount > 0:
+                self._index_completion_change(task_id, 1 if completed else -1)
+                if completed:
+                    self._append_event(EVENT_COMPLETE, task_id, {"completed_at": completed_at, "source": source})
+                else:
+                    self._append_event(EVENT_REOPEN, task_id, {"source": source})
+                self._touch()
+            return cur.rowcount > 0
+
+    # ---------------------- 同步轮询记录 ----------------------
+
+    def due_for_check(self, now: float, max_age: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """到期需要向飞书查询的未完成任务（从未查询过或 next_check 已到），已完成任务不再查询
+
+        Args:
+            now: 当前时间（Unix 时间戳）
+            max_age: 上次查询距今超过该秒数的也视为到期（播报前限制数据陈旧度）
+        """
+        stale_before = now - max_age if max_age is not None else 0.0
+        with self._reading() as conn:
+            rows = conn.execute(
+                "SELECT t.* FROM tasks t LEFT JOIN task_polls p ON p.task_id = t.task_id "
+                "WHERE t.completed = 0 AND (p.next_check IS NULL OR p.next_check <= ? OR p.last_checked <= ?) "
+                "ORDER BY t.rowid",
+                (now, stale_before),
+            ).fetchall()
+            return {row["task_id"]: self._row_to_task(row) for row in rows}
+
+    def mark_checked(self, task_ids: List[str], checked_at: float, interval: float) -> None:
+        """记录本轮查询时间与下次查询时间（运维状态，不写事件日志）"""
+        if not task_ids:
+            return
+        with self._transaction():
+            self._conn.executemany(
+                "INSERT INTO task_polls (task_id, last_checked, next_check) VALUES (?, ?, ?) "
+                "ON CONFLICT(task_id) DO UPDATE SET last_checked = excluded.last_checked, "
+                "next_check = excluded.next_check",
+                [(task_id, checked_at, checked_at + interval) for task_id in task_ids],
+            )
+
+    def sync_cursor(self, name: str) -> Optional[str]:
+        """增量同步水位线（如分页拉取的 updated_at），未设置返回 None"""
+        with self._reading() as conn:
+            return self._get_meta(f"sync_cursor:{name}", conn)
+
+    def set_sync_cursor(self, name: str, value: str) -> None:
+        with self._transaction():
+            self._set_meta(f"sync_cursor:{name}", value)
+
+    def tasklist_guid(self, month: str, group: str) -> Optional[str]:
+        """某月某群的飞书任务清单 guid"""
+        with self._reading() as conn:
+            return self._get_meta(f"tasklist:{month}:{group}", conn)
+
+    def set_tasklist_guid(self, month: str, group: str, guid: str) -> None:
+        with self._transaction():
+            self._set_meta(f"tasklist:{month}:{group}", guid)
+
+    def poll_state(self, task_id: str) -> Optional[Dict[str, float]]:
+        """单个任务的 last_checked / next_check"""
+        with self._reading() as conn:
+            row = conn.execute(
+                "SELECT last_checked, next_check FROM task_polls WHERE task_id = ?", (task_id,)
+            ).fetchone()
+            return dict(row) if row else None
+
+    # ---------------------- 远端重试队列 ----------------------
+
+    def enqueue_remote_retry(self, task_id: str, action: str, next_attempt: float, error: str = "") -> None:
+        """登记失败的飞书写操作；已在队列中时只更新错误信息，不重置重试次数"""
+        with self._transaction():
+            self._conn.execute(
+                "INSERT INTO remote_retries (task_id, action, next_attempt, last_error, created_at) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT(task_id, action) DO UPDATE SET last_error = excluded.last_error",
+                (task_id, action, next_attempt, error[:500], self._now_iso()),
+            )
+
+    def due_remote_retries(self, now: float, limit: int = 50) -> List[Dict[str, Any]]:
+        """到期需要重试的远端操作（按到期时间先后）"""
+        with self._reading() as conn:
+            rows = conn.execute(
+                "SELECT * FROM remote_retries WHERE next_attempt <= ? ORDER BY next_attempt LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            return [dict(row) for row in rows]
+
+    def reschedule_remote_retry(self, task_id: str, action: str, next_attempt: float, error: str = "") -> int:
+        """重试再次失败：次数加一并推迟，返回累计重试次数"""
+        with self._transaction():
+            self._conn.execute(
+                "UPDATE remote_retries SET attempts = attempts + 1, next_attempt = ?, last_error = ? "
+                "WHERE task_id = ? AND action = ?",
+                (next_attempt, error[:500], task_id, action),
+            )
+            row = self._conn.execute(
+                "SELECT attempts FROM remote_retries WHERE task_id = ? AND action = ?", (task_id, action)
+            ).fetchone()
+        return int(row["attempts"]) if row else 0
+
+    def remove_remote_retry(self, task_id: str, action: str) -> None:
+        with self._transaction():
+            self._conn.execute("DELETE FROM remote_retries WHERE task_id = ? AND action = ?", (task_id, action))
+
+    def remote_retry_count(self) -> int:
+        with self._reading() as conn:
+            return int(conn.execute("SELECT COUNT(*) FROM remote_retries").fetchone()[0])
+
+    # ---------------------- 任务创建进度 ----------------------
+
+    def creation_progress(self, month: str) -> Dict[str, Dict[str, Any]]:
+        """某月各任务的创建记录：标题 -> {client_token, task_guid, attempts, last_error}"""
+        with self._reading() as conn:
+            rows = conn.execute(
+                "SELECT title, client_token, task_guid, attempts, last_error FROM task_creations WHERE month = ?",
+                (month,),
+            ).fetchall()
+            return {row["title"]: {key: row[key] for key in row.keys() if key != "title"} for row in rows}
+
+    def record_creation(self, month: str, title: str, client_token: str,
+                        task_guid: Optional[str] = None, error: str = "") -> None:
+        """记录一次创建尝试；成功时写入 task_guid，已成功的记录不会被后续失败覆盖"""
+        with self._transaction():
+            self._conn.execute(
+                "INSERT INTO task_creations (month, title, client_token, task_guid, attempts, last_error, updated_at) "
+                "VALUES (?, ?, ?, ?, 1, ?, ?) ON CONFLICT(month, title) DO UPDATE SET "
+                "attempts = attempts + 1, client_token = excluded.client_token, "
+                "task_guid = COALESCE(task_guid, excluded.task_guid), "
+                "last_error = excluded.last_error, updated_at = excluded.updated_at",
+                (month, title, client_token, task_guid, error[:500], self._now_iso()),
+            )
+
+    def record_created_task(self, month: str, title: str, client_token: str, task_guid: str,
+                            assignees: List[str], task_type: str = DEFAULT_TASK_TYPE) -> None:
+        """任务创建成功：统计行与创建进度在同一事务中提交
+
+        两者分开写入时，进程在中间退出会留下"已创建"的创建记录而统计中没有该任务，重跑会跳过它。
+        """
+        with self._transaction():
+            self.upsert_task(task_guid, title, assignees, task_type=task_type)
+            self.record_creation(month, title, client_token, task_guid=task_guid)
+
+    def pending_creations(self, month: str, max_attempts: Optional[int] = None) -> List[str]:
+        """尝试过但尚未成功创建的任务标题；给出 max_attempts 时不含已尝试满该次数（放弃补建）的任务"""
+        with self._reading() as conn:
+            rows = conn.execute(
+                "SELECT title FROM task_creations WHERE month = ? AND task_guid IS NULL AND attempts < ? ORDER BY rowid",
+                (month, max_attempts if max_attempts is not None else 2 ** 31),
+            ).fetchall()
+            return [row["title"] for row in rows]
+
+    def record_event(self, event: str, payload: Optional[Dict[str, Any]] = None, task_id: Optional[str] = None) -> None:
+        """记录不改变任务状态的审计事件（如一次同步的结果）"""
+        with self._transaction():
+            self._append_event(event, task_id, payload)
+
+    # ---------------------- 事件日志：查询、快照与重放 ----------------------
+
+    def events(self, month: Optional[str] = None, task_id: Optional[str] = None,
+               after_seq: int = 0) -> List[Dict[str, Any]]:
+        """按顺序返回事件（可按月份、任务过滤），用于审计与趋势统计"""
+        sql = "SELECT * FROM task_events WHERE seq > ?"
+        params: List[Any] = [after_seq]
+        if month is not None:
+            sql += " AND month = ?"
+            params.append(month)
+        if task_id is not None:
+            sql += " AND task_id = ?"
+            params.append(task_id)
+        with self._reading() as conn:
+            rows = conn.execute(sql + " ORDER BY seq", params).fetchall()
+        return [
+            {
+                "seq": row["seq"],
+                "ts": row["ts"],
+                "month": row["month"],
+                "event": row["event"],
+                "task_id": row["task_id"],
+                "payload": json.loads(row["payload"] or "{}"),
+            }
+            for row in rows
+        ]
+
+    def _last_seq(self) -> int:
+        row = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM task_events").fetchone()
+        return int(row[0])
+
+    def events_since_snapshot(self) -> int:
+        """最近一次快照之后追加的事件数"""
+        with self._reading() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) FROM task_events WHERE seq > (SELECT COALESCE(MAX(seq), 0) FROM snapshots)"
+            ).fetchone()
+        return int(row[0])
+
+    def compact(self, keep_snapshots: int = 3) -> int:
+        """生成快照并压缩事件日志，返回快照对应的事件序号
+
+        - 当前状态写入 snapshots（对应最新事件序号）
+        - 只保留最近 keep_snapshots 个快照
+        - 早于最旧保留快照、且不属于当前月份的事件被删除（当月事件保留供审计与趋势统计）
+        - 若配置了 json_path，同时原子地导出一份 task_stats.json 快照
+        """
+        stats = self.load()
+        with self._transaction():
+            seq = self._last_seq()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshots (seq, month, created_at, data) VALUES (?, ?, ?, ?)",
+                (
+                    seq,
+                    stats["current_month"],
+                    self._now_iso(),
+                    json.dumps({"current_month": stats["current_month"], "tasks": stats["tasks"]}, ensure_ascii=False),
+                ),
+            )
+            self._conn.execute(
+                "DELETE FROM snapshots WHERE seq NOT IN (SELECT seq FROM snapshots ORDER BY seq DESC LIMIT ?)",
+                (max(1, keep_snapshots),),
+            )
+            oldest = self._conn.execute("SELECT MIN(seq) FROM snapshots").fetchone()[0]
+            cur = self._conn.execute(
+                "DELETE FROM task_events WHERE seq <= ? AND (month IS NULL OR month != ?)",
+                (oldest, stats["current_month"]),
+            )
+            pruned = cur.rowcount
+        if self.json_path:
+            try:
+                self.export_json(self.json_path)
+            except Exception as e:
+                logger.error("导出任务统计快照失败: %s", e)
+        logger.info("任务事件日志已压缩: 快照 seq=%d, 清理旧事件 %d 条", seq, pruned)
+        return seq
+
+    def replay(self) -> Dict[str, Any]:
+        """由最近快照 + 其后事件重放出 {"current_month", "tasks"} 状态"""
+        with self._lock:
+            snap = self._conn.execute("SELECT seq, data FROM snapshots ORDER BY seq DESC LIMIT 1").fetchone()
+            if snap:
+                state = json.loads(snap["data"])
+                after_seq = int(snap["seq"])
+            else:
+                state = {"current_month": None, "tasks": {}}
+                after_seq = 0
+            rows = self._conn.execute(
+                "SELECT month, event, task_id, payload FROM task_events WHERE seq > ? ORDER BY seq", (after_seq,)
+            ).fetchall()
+        for row in rows:
+            apply_event(state, row["event"], row["month"], row["task_id"], json.loads(row["payload"] or "{}"))
+        return state
+
+    def check_and_recover(self) -> bool:
+        """启动自检：数据库损坏或任务表与事件日志不一致时，以重放结果重建任务表
+
+        Returns:
+            True 表示状态正常或已成功恢复
+        """
+        try:
+            with self._lock:
+                result = self._conn.execute("PRAGMA quick_check").fetchone()[0]
+            if result != "ok":
+                logger.error("任务统计数据库自检失败: %s", result)
+            state = self.replay()
+            if state.get("current_month") is None:
+                return True  # 尚无事件（例如旧库刚升级），无可重放内容
+            current = self.load()
+            if result == "ok" and state["current_month"] == current["current_month"] \
+                    and _completion_flags(state["tasks"]) == _completion_flags(current["tasks"]):
+                return True
+            logger.warning("任务表与事件日志不一致，按事件日志重放恢复（%d 个任务）", len(state["tasks"]))
+            with self._transaction():
+                self._conn.execute("DELETE FROM tasks")
+                for task_id, task_info in state["tasks"].items():
+                    self._insert_task(task_id, task_info)
+                self._rebuild_indexes()
+                self._set_meta("current_month", state["current_month"])
+                self._touch()
+            return True
+        except Exception as e:
+            logger.error("任务统计恢复失败: %s", e)
+            return False
+
+    # ---------------------- 迁移与导出 ----------------------
+
+    def migrate_from_json(self, json_path: str) -> int:
+        """从旧版 task_stats.json 导入数据，返回导入的任务数"""
+        if not os.path.exists(json_path):
+            return 0
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                stats = json.load(f)
+        except Exception as e:
+            logger.error("读取旧版任务统计失败，跳过迁移: %s", e)
+            return 0
+        if not isinstance(stats, dict):
+            logger.error("旧版任务统计格式错误，跳过迁移: %s", json_path)
+            return 0
+
+        self.save(stats)
+        with self._transaction():
+            if stats.get("last_update"):
+                self._set_meta("last_update", str(stats["last_update"]))
+            self._set_meta("migrated_from_json", json_path)
+        count = len(stats.get("tasks") or {})
+        logger.info("已从 %s 迁移 %d 个任务到 %s", json_path, count, self.db_path)
+        return count
+
+    def export_json(self, json_path: str) -> None:
+        """导出为旧版 task_stats.json 结构（先写临时文件并 fsync，再原子替换，避免崩溃时留下半个文件）"""
+        stats = self.load()
+        tmp_path = f"{json_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(stats, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, json_path)
+
+    def close(self) -> None:
+        with self._lock, self._read_lock:
+            self._read_conn.close()
+            self._conn.close()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务变更事件（事件驱动的完成状态同步）
+
+通过官方 WS 订阅 task.task.updated_v1，有人在飞书任务中勾选完成/取消完成时，
+几秒内写入统计存储；整点轮询退化为低频对账：
+- obj_type 5/6（完成/取消完成）直接应用
+- 其他变更类型（详情、成员等）可选地按单个任务查询一次确认状态
+- 只处理本月统计中存在的任务，其他任务的事件忽略
+- LocalTaskEventSource 为本地假事件源，测试与联调时代替 WS 推送
+"""
+
+from __future__ import annotations
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# task.task.updated_v1 的 obj_type
+TASK_OBJ_DETAIL = 1
+TASK_OBJ_COMPLETED = 5
+TASK_OBJ_UNCOMPLETED = 6
+TASK_OBJ_DELETED = 7
+
+CHANGE_COMPLETED = "completed"
+CHANGE_REOPENED = "reopened"
+CHANGE_DELETED = "deleted"
+CHANGE_OTHER = "other"
+
+_OBJ_TYPE_CHANGES = {
+    TASK_OBJ_COMPLETED: CHANGE_COMPLETED,
+    TASK_OBJ_UNCOMPLETED: CHANGE_REOPENED,
+    TASK_OBJ_DELETED: CHANGE_DELETED,
+}
+
+
+def parse_task_update(data: Any) -> Optional[Tuple[str, str]]:
+    """事件对象 -> (task_id, 变更类型)；兼容 SDK 事件对象与 {"event": {...}} 字典"""
+    event = getattr(data, "event", None)
+    if event is None and isinstance(data, dict):
+        event = data.get("event", data)
+    if event is None:
+        return None
+    get = event.get if isinstance(event, dict) else (lambda key: getattr(event, key, None))
+
+    task_id = get("task_id")
+    if not task_id:
+        return None
+    try:
+        obj_type = int(get("obj_type") or 0)
+    except (TypeError, ValueError):
+        obj_type = 0
+    return task_id, _OBJ_TYPE_CHANGES.get(obj_type, CHANGE_OTHER)
+
+
+class TaskUpdateHandler:
+    """把任务变更事件应用到统计存储（经防抖写入器合并落盘）"""
+
+    def __init__(self, store: Any, writer: Any,
+                 verify: Optional[Callable[[str], Awaitable[Optional[bool]]]] = None):
+        """
+        Args:
+            store: TaskStatsStore，用于判断任务是否属于本月统计
+            writer: DebouncedStatsWriter（或同接口的 TaskStatsStore）
+            verify: 非完成类事件时查询单个任务完成状态的函数（None 表示忽略此类事件）
+        """
+        self.store = store
+        self.writer = writer
+        self.verify = verify
+        self.stats: Dict[str, int] = {"received": 0, "applied": 0, "ignored": 0}
+
+    async def handle(self, data: Any) -> Optional[str]:
+        """处理一条事件，返回实际应用的变更类型（未改变状态时返回 None）"""
+        self.stats["received"] += 1
+        parsed = parse_task_update(data)
+        if parsed is None:
+            self.stats["ignored"] += 1
+            return None
+        task_id, change = parsed
+
+        task = self.store.get_task(task_id)
+        if task is None:
+            self.stats["ignored"] += 1
+            logger.debug("忽略非本月统计任务的变更事件: %s", task_id)
+            return None
+
+        if change == CHANGE_OTHER and self.verify is not None:
+            status = await self.verify(task_id)
+            if status is not None:
+                change = CHANGE_COMPLETED if status else CHANGE_REOPENED
+
+        # 写入器中尚未落盘的状态优先于存储中的旧值
+        queued = getattr(self.writer, "queued_completion", lambda _: None)(task_id)
+        completed = task["completed"] if queued is None else queued
+
+        if change == CHANGE_COMPLETED and not completed:
+            self.writer.set_completed(task_id, True, source="event")
+        elif change == CHANGE_REOPENED and completed:
+            # 明确的“取消完成”事件才降级；轮询查询失败时从不降级
+            self.writer.set_completed(task_id, False, source="event")
+        else:
+            self.stats["ignored"] += 1
+            return None
+
+        self.stats["applied"] += 1
+        logger.info("任务变更事件已应用: %s -> %s (%s)", task.get("title", task_id), change, task_id)
+        return change
+
+
+class LocalTaskEventSource:
+    """本地假事件源：以与 WS 推送相同的事件结构驱动 TaskUpdateHandler"""
+
+    def __init__(self) -> None:
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    def emit(self, task_id: str, obj_type: int = TASK_OBJ_COMPLETED) -> None:
+        self._queue.put_nowait({"event": {"task_id": task_id, "obj_type": obj_type}})
+
+    async def drain(self, handler: TaskUpdateHandler) -> int:
+        """处理当前队列中的全部事件，返回处理条数"""
+        count = 0
+        while not self._queue.empty():
+            await handler.handle(self._queue.get_nowait())
+            count += 1
+        return count
+
+    async def run(self, handler: TaskUpdateHandler) -> None:
+        """持续消费事件（联调时作为后台任务运行）"""
+        while True:
+            await handler.handle(await self._queue.get())
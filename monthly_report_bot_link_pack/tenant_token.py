@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+租户访问令牌（tenant_access_token）共享提供者
+
+各 HTTP 路径（GitHub Actions、HTTP 回调、v1.1 WS 处理器）共用同一个令牌：
+- 进程内缓存到过期前 REFRESH_MARGIN 秒，期间不再请求鉴权接口
+- 剩余有效期不足 REFRESH_AHEAD 秒时后台刷新（飞书在剩余 30 分钟内才会签发新令牌），调用方不等待
+- 单飞（single-flight）：并发调用方共享一次刷新请求
+- 可选持久化到本地文件（FEISHU_TOKEN_CACHE），短生命周期脚本与 Actions 步骤之间复用
+
+用法：
+    provider = get_tenant_token_provider(APP_ID, APP_SECRET)
+    token = provider.get_token()          # 同步
+    token = await provider.aget_token()   # 异步（在线程中执行，不阻塞事件循环）
+"""
+
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import feishu_http
+
+logger = logging.getLogger(__name__)
+
+TOKEN_URL = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
+REFRESH_MARGIN = 300     # 剩余有效期不足该秒数时同步刷新
+REFRESH_AHEAD = 1800     # 剩余有效期不足该秒数时后台提前刷新
+TOKEN_CACHE_FILE = os.environ.get("FEISHU_TOKEN_CACHE", "").strip() or None
+
+# 令牌失效类错误码：调用方遇到时应 invalidate() 后重试（见 token_rejected）
+INVALID_TOKEN_CODES = {99991661, 99991663, 99991668}
+
+
+def token_rejected(response: Any) -> bool:
+    """开放平台响应的错误码表示令牌失效（失效令牌通常返回 4xx + JSON 错误码，不能只看状态码）"""
+    try:
+        data = response.json()
+    except Exception:
+        return False
+    return isinstance(data, dict) and data.get("code") in INVALID_TOKEN_CODES
+
+
+def fetch_tenant_token(app_id: str, app_secret: str, timeout: float = 30) -> Tuple[str, int]:
+    """请求鉴权接口，返回 (令牌, 有效秒数)；失败抛出异常"""
+    response = feishu_http.post(TOKEN_URL, json={"app_id": app_id, "app_secret": app_secret}, timeout=timeout)
+    response.raise_for_status()
+    data = response.json()
+    if data.get("code", 0) != 0:
+        raise RuntimeError(f"获取租户令牌失败: {data.get('msg', '未知错误')}")
+    return data["tenant_access_token"], int(data.get("expire", 7200))
+
+
+class TenantTokenProvider:
+    """带缓存、后台提前刷新与单飞的租户令牌提供者（线程安全）"""
+
+    def __init__(self, app_id: str, app_secret: str, cache_file: Optional[str] = None,
+                 fetch: Optional[Callable[[str, str], Tuple[str, int]]] = None,
+                 clock: Callable[[], float] = time.time):
+        self.app_id = app_id
+        self.app_secret = app_secret
+        self.cache_file = cache_file
+        self.fetch = fetch or fetch_tenant_token
+        self.clock = clock
+        self.token: Optional[str] = None
+        self.expires_at = 0.0
+        self.fetches = 0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._load_file()
+
+    # ---------------------- 文件持久化 ----------------------
+
+    def _load_file(self) -> None:
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                entry = (json.load(f) or {}).get(self.app_id) or {}
+            if entry.get("token") and float(entry.get("expires_at", 0)) > self.clock() + REFRESH_MARGIN:
+                self.token, self.expires_at = entry["token"], float(entry["expires_at"])
+                logger.info("复用本地缓存的租户令牌（剩余 %d 秒）", self.expires_at - self.clock())
+        except Exception as e:
+            logger.warning("读取租户令牌缓存失败: %s", e)
+
+    def _save_file(self) -> None:
+        if not self.cache_file:
+            return
+        try:
+            data: Dict[str, Any] = {}
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file, "r", encoding="utf-8") as f:
+                    data = json.load(f) or {}
+            data[self.app_id] = {"token": self.token, "expires_at": self.expires_at}
+            directory = os.path.dirname(os.path.abspath(self.cache_file))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".token_", suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self.cache_file)
+        except Exception as e:
+            logger.warning("写入租户令牌缓存失败: %s", e)
+
+    # ---------------------- 获取与刷新 ----------------------
+
+    def _remaining(self) -> float:
+        return self.expires_at - self.clock() if self.token else 0.0
+
+    def _refresh_locked(self) -> Optional[str]:
+        """在持有锁时刷新；失败时保留仍然有效的旧令牌"""
+        try:
+            token, expire = self.fetch(self.app_id, self.app_secret)
+            self.fetches += 1
+            self.token, self.expires_at = token, self.clock() + expire
+            logger.info("获取租户令牌成功（有效期 %d 秒）", expire)
+            self._save_file()
+        except Exception as e:
+            logger.error("获取租户令牌异常: %s", e)
+            if self._remaining() <= 0:
+                self.token = None
+        return self.token
+
+    def _background_refresh(self) -> None:
+        try:
+            with self._lock:
+                if self._remaining() <= REFRESH_AHEAD:
+                    self._refresh_locked()
+        finally:
+            self._refreshing = False
+
+    def get_token(self, force_refresh: bool = False) -> Optional[str]:
+        """返回有效令牌；失败返回 None"""
+        remaining = self._remaining()
+        if not force_refresh and remaining > REFRESH_MARGIN:
+            if remaining <= REFRESH_AHEAD and not self._refreshing:
+                # 仍然可用：后台换新，当前调用直接返回旧令牌
+                self._refreshing = True
+                threading.Thread(target=self._background_refresh, name="tenant-token-refresh", daemon=True).start()
+            return self.token
+        with self._lock:
+            # 单飞：等锁期间其他调用方可能已刷新完成
+            if not force_refresh and self._remaining() > REFRESH_MARGIN:
+                return self.token
+            return self._refresh_locked()
+
+    async def aget_token(self, force_refresh: bool = False) -> Optional[str]:
+        """异步获取：命中缓存时直接返回，需要刷新时在线程中执行"""
+        if not force_refresh and self._remaining() > REFRESH_AHEAD:
+            return self.token
+        return await asyncio.to_thread(self.get_token, force_refresh)
+
+    def invalidate(self) -> None:
+        """令牌被服务端判定失效时调用，下次获取强制刷新；本地缓存文件中的该令牌一并作废"""
+        with self._lock:
+            self.token, self.expires_at = None, 0.0
+            self._save_file()
+        logger.warning("租户令牌已失效，下次使用时重新获取")
+
+
+_providers: Dict[str, TenantTokenProvider] = {}
+_providers_lock = threading.Lock()
+
+
+def get_tenant_token_provider(app_id: str, app_secret: str,
+                              cache_file: Optional[str] = TOKEN_CACHE_FILE) -> TenantTokenProvider:
+    """进程内按 app_id 共享的令牌提供者"""
+    with _providers_lock:
+        provider = _providers.get(app_id)
+        if provider is None or provider.app_secret != app_secret:
+            provider = _providers[app_id] = TenantTokenProvider(app_id, app_secret, cache_file=cache_file)
+        return provider
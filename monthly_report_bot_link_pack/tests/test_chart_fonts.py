@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图表字体解析测试：
+1) 进程内只扫描一次字体，之后只应用 rcParams
+2) 新进程读取字体索引，不再扫描；字体文件 mtime 变化后重新扫描
+"""
+
+import os
+import sys
+
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+chart_generator = pytest.importorskip("chart_generator")
+plt = chart_generator.plt
+
+
+def test_chart_fonts__index_reuse_and_invalidation(tmp_path, monkeypatch):
+    font_file = tmp_path / "simhei.ttf"
+    font_file.write_bytes(b"font")
+    scans = []
+
+    def fake_discover():
+        scans.append(1)
+        return {"font_list": ["SimHei", "DejaVu Sans"], "font_files": [], "all_families": True}
+
+    monkeypatch.setattr(chart_generator, "FONT_INDEX_FILE", str(tmp_path / "cache" / "font_index.json"))
+    monkeypatch.setattr(chart_generator, "_discover_fonts", fake_discover)
+    monkeypatch.setattr(chart_generator, "_font_index_key", lambda: {str(font_file): font_file.stat().st_mtime_ns})
+    monkeypatch.setattr(chart_generator, "_font_config", None)
+
+    chart_generator.setup_chinese_fonts()
+    plt.rcParams['font.sans-serif'] = ['DejaVu Sans']  # 样式覆盖字体设置
+    chart_generator.setup_chinese_fonts()
+    assert len(scans) == 1 and plt.rcParams['font.sans-serif'][0] == "SimHei"
+
+    monkeypatch.setattr(chart_generator, "_font_config", None)  # 模拟新进程
+    chart_generator.setup_chinese_fonts()
+    assert len(scans) == 1
+
+    os.utime(font_file, ns=(0, 0))
+    monkeypatch.setattr(chart_generator, "_font_config", None)
+    chart_generator.setup_chinese_fonts()
+    assert len(scans) == 2
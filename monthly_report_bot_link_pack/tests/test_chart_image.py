@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内存图表测试：
+1) ChartImage 可 pickle（渲染进程传回机器人进程）
+2) save_chart_image 写入目录并返回路径，不留下临时文件
+3) 渲染配置按最大像素宽度限制 DPI，超出字节预算时降低 DPI 重新编码
+"""
+
+import os
+import pickle
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chart_image import (
+    KIND_ERROR, PROFILE_CARD, PROFILE_PRINT, ChartImage, RenderProfile, encode_within_budget, get_render_profile,
+    save_chart_image,
+)
+
+
+def test_chart_image__pickle_round_trip():
+    image = ChartImage("error_chart_20250601_170000.png", b"\x89PNG" + b"0" * 1024, KIND_ERROR)
+    copy = pickle.loads(pickle.dumps(image))
+    assert (copy.filename, copy.data, copy.kind) == (image.filename, image.data, KIND_ERROR)
+    assert len(copy) == 1028
+
+
+def test_chart_image__save_to_directory(tmp_path):
+    directory = str(tmp_path / "charts")
+    path = save_chart_image(ChartImage("dashboard_20250601_170000.png", b"png"), directory)
+    assert path == os.path.join(directory, "dashboard_20250601_170000.png")
+    with open(path, "rb") as f:
+        assert f.read() == b"png"
+    assert os.listdir(directory) == ["dashboard_20250601_170000.png"]
+
+
+def test_chart_image__profile_steps_down_to_byte_budget():
+    card = get_render_profile(PROFILE_CARD)
+    assert card.initial_dpi(18) == 100  # 18 英寸宽的仪表板限制在 1800 像素
+    assert card.initial_dpi(8) == card.dpi
+    assert get_render_profile("unknown") is card
+    assert get_render_profile(PROFILE_PRINT).initial_dpi(18) == 300
+
+    # 字节数与 DPI 的平方成正比：200 DPI 时 4000 字节
+    attempts = []
+
+    def encode(dpi):
+        attempts.append(dpi)
+        return b"0" * int(4000 * (dpi / 200) ** 2)
+
+    profile = RenderProfile("test", dpi=200, max_width_px=None, max_bytes=1000, min_dpi=50)
+    data, dpi = encode_within_budget(encode, profile, 10)
+    assert len(data) <= 1000 and 50 <= dpi < 100
+    assert attempts[0] == 200 and len(attempts) <= 3
+
+    # 降到最低 DPI 仍超出预算时返回最后一次结果
+    tight = RenderProfile("tight", dpi=200, max_width_px=None, max_bytes=10, min_dpi=150)
+    data, dpi = encode_within_budget(encode, tight, 10)
+    assert dpi == 150 and len(data) > 10
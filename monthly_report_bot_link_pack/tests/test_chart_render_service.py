@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图表渲染服务测试：
+1) 同时渲染数不超过进程数，渲染结果返回给事件循环
+2) 渲染超时后终止进程池并返回 None，之后的渲染自动重建进程池
+3) 工作进程（包括按任务数替换的新进程）不重新导入父进程的主模块
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import textwrap
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chart_render_service import ChartRenderService
+
+
+def _sleepy_renderer(method, args):
+    """工作进程中执行：按参数休眠后返回 (方法名, 开始时间, 结束时间)"""
+    started = time.time()
+    time.sleep(args[0])
+    return method, started, time.time()
+
+
+def _worker_main_state(method, args):
+    """工作进程中执行：返回 (进程号, 主模块文件路径)"""
+    return os.getpid(), getattr(sys.modules["__main__"], "__file__", None)
+
+
+def test_chart_render_service__caps_concurrency_at_worker_count():
+    async def scenario():
+        service = ChartRenderService(workers=2, timeout=30, memory_limit_mb=0, renderer=_sleepy_renderer)
+        try:
+            await service.start()
+            results = await asyncio.gather(*(service.render(f"chart{i}", 0.3) for i in range(4)))
+        finally:
+            service.close()
+        return service, results
+
+    service, results = asyncio.run(scenario())
+    assert [r[0] for r in results] == ["chart0", "chart1", "chart2", "chart3"]
+    events = sorted([(r[1], 1) for r in results] + [(r[2], -1) for r in results])
+    running, peak = 0, 0
+    for _, delta in events:
+        running += delta
+        peak = max(peak, running)
+    assert peak <= 2
+    assert service.metrics()["rendered"] == 4
+
+
+def test_chart_render_service__timeout_restarts_pool():
+    async def scenario():
+        service = ChartRenderService(workers=1, timeout=0.5, memory_limit_mb=0, renderer=_sleepy_renderer)
+        try:
+            slow = await service.render("slow", 10)
+            fast = await service.render("fast", 0)
+        finally:
+            service.close()
+        return service, slow, fast
+
+    service, slow, fast = asyncio.run(scenario())
+    assert slow is None
+    assert fast[0] == "fast"
+    metrics = service.metrics()
+    assert metrics["timeouts"] == 1 and metrics["restarts"] == 1 and metrics["rendered"] == 1
+
+
+def test_chart_render_service__workers_skip_parent_main(tmp_path):
+    marker = tmp_path / "main_imports.txt"
+    script = tmp_path / "heavy_main.py"
+    # 模拟机器人脚本：模块级代码有副作用（记录每次导入），并从 __main__ 启动渲染服务
+    script.write_text(textwrap.dedent(f"""
+        import asyncio, sys
+        with open({str(marker)!r}, "a") as f:
+            f.write(__name__ + "\\n")
+        sys.path[:0] = [{os.path.dirname(os.path.dirname(os.path.abspath(__file__)))!r},
+                        {os.path.dirname(os.path.abspath(__file__))!r}]
+        from chart_render_service import ChartRenderService
+        from test_chart_render_service import _worker_main_state
+
+        async def scenario():
+            service = ChartRenderService(workers=1, timeout=30, memory_limit_mb=0, tasks_per_worker=1,
+                                         renderer=_worker_main_state)
+            try:
+                return [await service.render("chart", 0) for _ in range(2)]
+            finally:
+                service.close()
+
+        if __name__ == "__main__":
+            print(asyncio.run(scenario()))
+    """), encoding="utf-8")
+
+    output = subprocess.run([sys.executable, str(script)], capture_output=True, text=True, timeout=120, check=True)
+    results = eval(output.stdout.strip().splitlines()[-1])
+    # 每个进程只执行一个任务：两次渲染由两个不同的工作进程完成，都没有导入主模块
+    assert len({pid for pid, _ in results}) == 2
+    assert [main_file for _, main_file in results] == [None, None]
+    assert marker.read_text().split() == ["__main__"]
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享 HTTP 客户端测试：
+1) 同步 post 复用同一个连接池客户端，并传递参数与单次请求超时
+2) 异步客户端在同一事件循环内复用，事件循环更换后重建
+"""
+
+import asyncio
+import os
+import sys
+
+import httpx
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import feishu_http
+
+
+def test_feishu_http__pooled_post_with_timeout(monkeypatch):
+    seen = []
+
+    def handler(request):
+        seen.append((request.url.params.get("receive_id_type"), request.extensions["timeout"]["read"]))
+        return httpx.Response(200, json={"code": 0})
+
+    monkeypatch.setattr(feishu_http, "_client", httpx.Client(transport=httpx.MockTransport(handler)))
+    client = feishu_http.get_client()
+
+    response = feishu_http.post("https://open.feishu.cn/open-apis/im/v1/messages", json={"a": 1},
+                                params={"receive_id_type": "user_id"}, timeout=10)
+    assert response.json() == {"code": 0}
+    feishu_http.post("https://open.feishu.cn/open-apis/im/v1/messages")
+    assert feishu_http.get_client() is client
+    assert seen == [("user_id", 10), (None, 30)]
+    feishu_http.close()
+
+
+def test_feishu_http__async_client_per_loop():
+    async def grab():
+        first = feishu_http.get_async_client()
+        assert feishu_http.get_async_client() is first
+        return first
+
+    first = asyncio.run(grab())
+    second = asyncio.run(grab())
+    assert first is not second
+    asyncio.run(feishu_http.aclose())
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+飞书调用容错测试：
+1) 熔断器连续失败后打开，冷却后放行一个探测请求，成功即关闭
+2) 调度器只对幂等调用重试网络异常与 5xx，并计入熔断
+3) 远端重试队列持久化：登记、到期查询、推迟与出队
+4) 被取消的探测请求释放探测名额；冷却期过后重试队列不经 check() 也能继续发送
+"""
+
+import os
+import sys
+import asyncio
+import importlib.util
+import types
+
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from feishu_resilience import (
+    BREAKER_CLOSED, BREAKER_HALF_OPEN, BREAKER_OPEN, CircuitBreaker, CircuitOpenError, RetryPolicy,
+    is_idempotent_call, requeue_delay,
+)
+from feishu_scheduler import FeishuRequestScheduler
+from task_stats_store import TaskStatsStore
+
+BOT_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "monthly_report_bot_ws_v1.1.py")
+
+
+def test_feishu_resilience__breaker_opens_and_probes():
+    now = [100.0]
+    breaker = CircuitBreaker("task.write", failure_threshold=2, reset_timeout=30, clock=lambda: now[0])
+    breaker.check()
+    breaker.record_failure()
+    assert breaker.state == BREAKER_CLOSED
+    breaker.record_failure()
+    assert breaker.state == BREAKER_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    now[0] += 31
+    breaker.check()  # 探测请求
+    assert breaker.state == BREAKER_HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.check()  # 探测期间其他请求仍被拒绝
+    breaker.record_failure()
+    assert breaker.state == BREAKER_OPEN and breaker.trips == 2
+
+    now[0] += 31
+    breaker.check()
+    breaker.record_success()
+    assert breaker.snapshot() == {"state": BREAKER_CLOSED, "failures": 0, "trips": 2}
+
+
+def test_feishu_resilience__scheduler_retries_only_idempotent_calls():
+    ok = types.SimpleNamespace(code=0, raw=types.SimpleNamespace(status_code=200, headers={}))
+    server_error = types.SimpleNamespace(code=0, raw=types.SimpleNamespace(status_code=502, headers={}))
+
+    def flaky(outcomes):
+        calls = []
+
+        async def func():
+            calls.append(1)
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        return func, calls
+
+    async def scenario():
+        scheduler = FeishuRequestScheduler(
+            retry_policy=RetryPolicy(retries=2, base=0.001, cap=0.01),
+            breaker_factory=lambda family: CircuitBreaker(family, failure_threshold=3),
+        )
+        func, calls = flaky([ConnectionError("reset"), server_error, ok])
+        assert await scheduler.call("task.read", func, idempotent=True) is ok
+        assert len(calls) == 3
+
+        func, calls = flaky([ConnectionError("timeout")])
+        with pytest.raises(ConnectionError):
+            await scheduler.call("im.message", func)
+        func, calls = flaky([server_error])
+        assert await scheduler.call("im.message", func) is server_error
+        func, calls = flaky([server_error])
+        await scheduler.call("im.message", func)
+        assert scheduler.breaker("im.message").state == BREAKER_OPEN
+        with pytest.raises(CircuitOpenError):
+            await scheduler.call("im.message", func)
+        return scheduler.metrics()
+
+    metrics = asyncio.run(scenario())
+    assert metrics["task.read"]["retries"] == 2
+    assert metrics["task.read"]["breaker"]["state"] == BREAKER_CLOSED
+    assert metrics["im.message"]["breaker"]["trips"] == 1
+
+    body = types.SimpleNamespace(uuid="u1")
+    assert is_idempotent_call(("im", "v1", "message", "acreate"), (types.SimpleNamespace(request_body=body),))
+    assert not is_idempotent_call(("task", "v2", "task", "acreate"), (types.SimpleNamespace(request_body=None),))
+    assert is_idempotent_call(("task", "v2", "task", "apatch"), ())
+    assert 60 <= requeue_delay(1, 60, 3600) <= 120 and requeue_delay(10, 60, 3600) <= 3600
+
+
+def test_feishu_resilience__remote_retry_queue_is_durable(tmp_path):
+    db_path = str(tmp_path / "task_stats.db")
+    store = TaskStatsStore(db_path)
+    store.enqueue_remote_retry("guid_1", "complete", 100.0, "patch failed")
+    store.enqueue_remote_retry("guid_2", "complete", 500.0)
+    store.enqueue_remote_retry("guid_1", "complete", 900.0, "again")  # 重复登记不重置
+    store.close()
+
+    store = TaskStatsStore(db_path)
+    due = store.due_remote_retries(200.0)
+    assert [item["task_id"] for item in due] == ["guid_1"]
+    assert due[0]["last_error"] == "again" and due[0]["next_attempt"] == 100.0
+    assert store.reschedule_remote_retry("guid_1", "complete", 1000.0, "still failing") == 1
+    assert store.due_remote_retries(600.0)[0]["task_id"] == "guid_2"
+    store.remove_remote_retry("guid_2", "complete")
+    assert store.remote_retry_count() == 1
+
+
+def test_feishu_resilience__cancelled_probe_releases_breaker():
+    now = [100.0]
+    breaker = CircuitBreaker("task.write", failure_threshold=1, reset_timeout=30, clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.is_open()
+    now[0] += 31
+    assert not breaker.is_open() and breaker.state == BREAKER_OPEN
+
+    async def scenario():
+        scheduler = FeishuRequestScheduler(breaker_factory=lambda family: breaker)
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.sleep(60)
+
+        probe = asyncio.create_task(scheduler.call("task.write", hang))
+        await started.wait()
+        assert breaker.state == BREAKER_HALF_OPEN and breaker.is_open()
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        async def ok():
+            return types.SimpleNamespace(code=0, raw=None)
+        return await scheduler.call("task.write", ok)
+
+    assert asyncio.run(scenario()).code == 0
+    assert breaker.state == BREAKER_CLOSED
+
+
+def test_feishu_resilience__retry_queue_drains_after_cooldown(tmp_path, monkeypatch):
+    spec = importlib.util.spec_from_file_location("monthly_report_bot_ws", BOT_FILE)
+    bot = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(bot)
+
+    now = [1000.0]
+    scheduler = FeishuRequestScheduler(breaker_factory=lambda family: CircuitBreaker(
+        family, failure_threshold=1, reset_timeout=30, clock=lambda: now[0]))
+    store = TaskStatsStore(str(tmp_path / "task_stats.db"))
+    store.reset_month("2025-10")
+    store.upsert_task("guid_1", "任务一", ["ou_a"])
+    store.set_completed("guid_1", True)
+    store.enqueue_remote_retry("guid_1", "complete", 0.0, "patch failed")
+    monkeypatch.setattr(bot, "_feishu_scheduler", scheduler)
+    monkeypatch.setattr(bot, "_stats_store", store)
+    monkeypatch.setattr(bot, "_stats_writer", None)
+
+    async def complete(task_id):
+        async def patch():
+            return types.SimpleNamespace(code=0, raw=None)
+        return (await scheduler.call("task.write", patch)).code == 0
+    monkeypatch.setattr(bot, "complete_task_on_feishu", complete)
+
+    scheduler.breaker("task.write").record_failure()
+    assert asyncio.run(bot.process_remote_retries(now=100.0))["due"] == 0
+    assert store.remote_retry_count() == 1
+
+    now[0] += 31  # 冷却期已过：队列是唯一的写入方，仍要放行探测
+    assert asyncio.run(bot.process_remote_retries(now=200.0))["succeeded"] == 1
+    assert store.remote_retry_count() == 0
+    assert scheduler.breaker("task.write").state == BREAKER_CLOSED
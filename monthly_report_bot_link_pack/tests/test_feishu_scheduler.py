@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+飞书请求调度器测试：
+1) 令牌耗尽时交互请求先于排队中的后台请求放行
+2) 限流响应暂停接口族并重试；代理按 SDK 路径归入接口族并记录指标
+"""
+
+import os
+import sys
+import asyncio
+import types
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from feishu_scheduler import (
+    FeishuRequestScheduler, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, ScheduledClient, endpoint_family,
+    parse_rate_limits,
+)
+
+
+def test_feishu_scheduler__interactive_preempts_background():
+    order = []
+
+    async def scenario():
+        scheduler = FeishuRequestScheduler({"task.read": (20.0, 1.0)})
+
+        async def request(name, priority):
+            await scheduler.acquire("task.read", priority)
+            order.append(name)
+
+        background = [asyncio.create_task(request(f"sync_{i}", PRIORITY_BACKGROUND)) for i in range(3)]
+        await asyncio.sleep(0.01)
+        assert scheduler.queue_depth("task.read") == 2
+        await request("reply", PRIORITY_INTERACTIVE)
+        await asyncio.gather(*background)
+        return scheduler.metrics()["task.read"]
+
+    metrics = asyncio.run(scenario())
+    assert order == ["sync_0", "reply", "sync_1", "sync_2"]
+    assert metrics["calls"] == 4 and metrics["depth"] == 0 and metrics["max_depth"] == 3
+    assert metrics["wait_max_ms"] > 0
+    assert set(metrics["wait_avg_ms_by_priority"]) == {"interactive", "background"}
+
+
+def test_feishu_scheduler__rate_limit_backoff_and_proxy():
+    assert parse_rate_limits("im.message=10:20, task.write=5,bad=x") == {
+        "im.message": (10.0, 20.0), "task.write": (5.0, 5.0)}
+    assert endpoint_family(("task", "v2", "task", "aget")) == "task.read"
+    assert endpoint_family(("task", "v2", "tasklist", "acreate")) == "task.write"
+    assert endpoint_family(("im", "v1", "image", "acreate")) == "im.image"
+
+    limited = types.SimpleNamespace(code=99991400, raw=types.SimpleNamespace(
+        status_code=400, headers={"x-ogw-ratelimit-reset": "0.05"}))
+    ok = types.SimpleNamespace(code=0, raw=None)
+    responses = [limited, ok]
+    calls = []
+
+    async def areply(request):
+        calls.append(request)
+        return responses.pop(0)
+
+    client = types.SimpleNamespace(im=types.SimpleNamespace(v1=types.SimpleNamespace(
+        message=types.SimpleNamespace(areply=areply))))
+
+    async def scenario():
+        scheduler = FeishuRequestScheduler()
+        api = ScheduledClient(client, scheduler, PRIORITY_INTERACTIVE)
+        started = asyncio.get_running_loop().time()
+        response = await api.im.v1.message.areply("req")
+        return response, asyncio.get_running_loop().time() - started, scheduler.metrics()
+
+    response, elapsed, metrics = asyncio.run(scenario())
+    assert response is ok and calls == ["req", "req"]
+    assert elapsed >= 0.04
+    assert metrics["im.message"]["rate_limited"] == 1 and metrics["im.message"]["calls"] == 2
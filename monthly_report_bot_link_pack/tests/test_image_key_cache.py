@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片 image_key 缓存测试：
+1) 相同内容命中，TTL 过期后失效；持久化后新实例仍可命中
+2) 超出容量时淘汰最近最少使用的条目
+3) 文件内容哈希在文件未改动时复用，改动后重新计算
+"""
+
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_key_cache import ImageKeyCache, content_hash
+
+
+def test_image_key_cache__hit_ttl_and_persistence(tmp_path):
+    now = [1000.0]
+    path = str(tmp_path / "image_keys.json")
+    cache = ImageKeyCache(path, ttl=3600, clock=lambda: now[0])
+    digest = content_hash(b"png-bytes")
+    assert digest != content_hash(b"png-bytes", image_type="avatar")
+
+    assert cache.get(digest) is None
+    cache.put(digest, "img_v3_1")
+    assert cache.get(content_hash(b"png-bytes")) == "img_v3_1"
+
+    reloaded = ImageKeyCache(path, ttl=3600, clock=lambda: now[0])
+    assert reloaded.get(digest) == "img_v3_1"
+
+    now[0] += 3600
+    assert reloaded.get(digest) is None and len(reloaded) == 0
+    assert ImageKeyCache(path, ttl=3600, clock=lambda: now[0]).get(digest) is None
+
+
+def test_image_key_cache__lru_eviction():
+    cache = ImageKeyCache(None, max_entries=2)
+    cache.put("a", "key-a")
+    cache.put("b", "key-b")
+    assert cache.get("a") == "key-a"  # a 成为最近使用
+    cache.put("c", "key-c")
+    assert cache.get("b") is None
+    assert cache.get("a") == "key-a" and cache.get("c") == "key-c"
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_image_key_cache__file_digest_memo(tmp_path):
+    path = tmp_path / "dashboard.png"
+    path.write_bytes(b"png-v1")
+    cache = ImageKeyCache(None)
+    assert cache.file_digest(str(path)) == content_hash(b"png-v1")
+    assert cache.file_digest(str(path)) == content_hash(b"png-v1")
+    path.write_bytes(b"png-v22")
+    assert cache.file_digest(str(path)) == content_hash(b"png-v22")
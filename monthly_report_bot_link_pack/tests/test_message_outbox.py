@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+出站消息队列测试：
+1) 慢速定时播报不阻塞交互回复；同一排序键内按入队顺序发送；去重键只入队一次
+2) 发送失败退避重试；重启后发送中的消息沿用原 uuid 重发
+"""
+
+import asyncio
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from feishu_scheduler import PRIORITY_BROADCAST, PRIORITY_INTERACTIVE
+from message_outbox import STATUS_INFLIGHT, MessageOutbox, OutboxStore
+
+
+def test_message_outbox__priority_order_and_dedup(tmp_path):
+    sent = []
+
+    async def deliver(kind, payload, uuid):
+        if kind == "card":
+            await asyncio.sleep(0.2)  # 慢速群播报
+        sent.append(payload["n"])
+        return True
+
+    async def run():
+        outbox = MessageOutbox(OutboxStore(str(tmp_path / "outbox.db")), deliver, workers=2)
+        outbox.start()
+        assert outbox.enqueue("card", {"n": "card-1"}, "chat", PRIORITY_BROADCAST, dedup_key="daily:1")
+        assert not outbox.enqueue("card", {"n": "card-1"}, "chat", PRIORITY_BROADCAST, dedup_key="daily:1")
+        outbox.enqueue("text", {"n": "text-2"}, "chat", PRIORITY_BROADCAST)
+        await asyncio.sleep(0.01)
+        outbox.enqueue("reply", {"n": "reply-a"}, "om_1", PRIORITY_INTERACTIVE)
+        outbox.enqueue("reply", {"n": "reply-b"}, "om_1", PRIORITY_INTERACTIVE)
+        await asyncio.sleep(0.05)
+        assert sent == ["reply-a", "reply-b"]  # 群卡片仍在发送中，回复不等待
+        assert await outbox.join(timeout=2)
+        await outbox.stop()
+        return outbox.metrics()
+
+    metrics = asyncio.run(run())
+    assert sent == ["reply-a", "reply-b", "card-1", "text-2"]
+    assert metrics["deduplicated"] == 1 and metrics["queue"] == {"sent": 4}
+
+
+def test_message_outbox__retry_and_restart(tmp_path):
+    db = str(tmp_path / "outbox.db")
+    store = OutboxStore(db)
+    message_id = store.add("text", {"text": "hi"}, "chat", PRIORITY_BROADCAST)
+    store.set_status(message_id, STATUS_INFLIGHT)  # 模拟发送途中进程退出
+    original_uuid = store.get(message_id)["uuid"]
+    store.close()
+
+    uuids = []
+
+    async def deliver(kind, payload, uuid):
+        uuids.append(uuid)
+        return len(uuids) > 1  # 第一次失败
+
+    async def run():
+        outbox = MessageOutbox(OutboxStore(db), deliver, workers=1, retry_base=0.05, retry_cap=0.1)
+        outbox.start()
+        for _ in range(100):
+            if outbox.stats["sent"]:
+                break
+            await asyncio.sleep(0.02)
+        await outbox.stop()
+        return outbox
+
+    outbox = asyncio.run(run())
+    assert uuids == [original_uuid, original_uuid]
+    assert outbox.stats["retried"] == 1 and outbox.store.get(message_id)["attempts"] == 2
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图表渲染缓存测试：
+1) 统计指纹与字典键顺序无关；指纹不变时只渲染一次，文件被清理后重新渲染
+2) 错误占位图不进入缓存；不同图表类型/渲染配置互不命中
+3) 内存中的图片同样可缓存，并发的异步请求只渲染一次
+4) 默认可缓存判断识别图片对象，默认渲染配置与 chart_image 一致
+"""
+
+import asyncio
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chart_image import DEFAULT_PROFILE, KIND_CHART, KIND_ERROR, ChartImage
+from render_cache import RenderCache, stats_fingerprint
+
+
+class _FakeRenderer:
+    def __init__(self, directory, prefix="dashboard"):
+        self.directory = directory
+        self.prefix = prefix
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        path = os.path.join(self.directory, f"{self.prefix}_{self.calls}.png")
+        with open(path, "wb") as f:
+            f.write(b"png")
+        return path
+
+
+def _async_value(value):
+    async def render():
+        return value
+    return render
+
+
+def test_render_cache__fingerprint_hit_and_rerender(tmp_path):
+    stats = {"current_month": "2025-06", "tasks": {"t1": {"completed": True, "assignees": ["ou_a"]}}}
+    reordered = {"tasks": {"t1": {"assignees": ["ou_a"], "completed": True}}, "current_month": "2025-06"}
+    assert stats_fingerprint(stats) == stats_fingerprint(reordered)
+    changed = {"current_month": "2025-06", "tasks": {"t1": {"completed": False, "assignees": ["ou_a"]}}}
+    assert stats_fingerprint(stats) != stats_fingerprint(changed)
+
+    async def scenario():
+        cache = RenderCache()
+        render = _FakeRenderer(str(tmp_path))
+        first = await cache.arender("dashboard", stats_fingerprint(stats), render)
+        assert await cache.arender("dashboard", stats_fingerprint(reordered), render) == first
+        assert render.calls == 1 and (cache.hits, cache.misses) == (1, 1)
+
+        assert await cache.arender("dashboard", stats_fingerprint(changed), render) != first
+        os.remove(first)
+        await cache.arender("dashboard", stats_fingerprint(stats), render)
+        assert render.calls == 3
+
+    asyncio.run(scenario())
+
+
+def test_render_cache__placeholders_and_keys(tmp_path):
+    async def scenario():
+        cache = RenderCache()
+        error_render = _FakeRenderer(str(tmp_path), prefix="error_chart")
+        not_error = lambda path: not os.path.basename(path).startswith("error_chart_")
+        await cache.arender("dashboard", "fp", error_render, cacheable=not_error)
+        await cache.arender("dashboard", "fp", error_render, cacheable=not_error)
+        assert error_render.calls == 2
+
+        render = _FakeRenderer(str(tmp_path))
+        await cache.arender("dashboard", "fp", render)
+        await cache.arender("history", "fp", render)
+        await cache.arender("dashboard", "fp", render, profile="print")
+        await cache.arender("dashboard", "fp", render)
+        assert render.calls == 3
+
+    asyncio.run(scenario())
+
+
+def test_render_cache__in_memory_images_share_one_render():
+    calls = []
+
+    async def render():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ChartImage("dashboard.png", b"png")
+
+    async def scenario():
+        cache = RenderCache()
+        is_chart = lambda image: image.kind == KIND_CHART
+        return await asyncio.gather(*(cache.arender("dashboard", "fp", render, cacheable=is_chart) for _ in range(3)))
+
+    images = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert images[0] is images[1] is images[2]
+
+
+def test_render_cache__default_cacheable_and_profile():
+    async def scenario():
+        cache = RenderCache()
+        await cache.arender("dashboard", "fp", _async_value(ChartImage("error_chart.png", b"png", KIND_ERROR)))
+        assert cache.get("dashboard", "fp") is None
+        image = await cache.arender("dashboard", "fp", _async_value(ChartImage("dashboard.png", b"png")))
+        return cache, image
+
+    cache, image = asyncio.run(scenario())
+    assert cache.get("dashboard", "fp", profile=DEFAULT_PROFILE) is image
+    assert cache.get("dashboard", "fp", profile="card") is image
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多月份统计归档测试：
+1) 月份切换时先归档再重置
+2) 按月、按类型、按负责人的区间查询
+3) 基于真实完成时间的逐日进度
+4) 机器人的进度趋势图叠加最近归档月份的逐日进度
+"""
+
+import os
+import sys
+import asyncio
+import importlib.util
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stats_archive import StatsArchive, daily_progress_from_stats
+from task_stats_store import TaskStatsStore
+
+BOT_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "monthly_report_bot_ws_v1.1.py")
+
+
+def _fill_month(store, month, completed_ids):
+    store.reset_month(month)
+    store.upsert_task("guid_1", "任务一", ["ou_a"])
+    store.upsert_task("guid_2", "任务二", ["ou_a", "ou_b"], task_type="重大项目月报")
+    store.upsert_task("guid_3", "任务三", ["ou_b"], task_type="重大项目月报")
+    for task_id in completed_ids:
+        store.set_completed(task_id, True, completed_at=f"{month}-{20 + int(task_id[-1])}T10:00:00-03:00")
+
+
+def test_stats_archive__archives_before_reset(tmp_path):
+    store = TaskStatsStore(str(tmp_path / "task_stats.db"))
+    archive = StatsArchive(str(tmp_path / "archives"))
+
+    _fill_month(store, "2025-09", ["guid_1", "guid_2", "guid_3"])
+    path = archive.archive_and_reset(store, "2025-10")
+    assert path and os.path.exists(path)
+    assert store.load()["tasks"] == {}
+
+    _fill_month(store, "2025-10", ["guid_2"])
+    archive.archive_and_reset(store, "2025-11")
+
+    # 空月份不写归档
+    assert archive.archive_and_reset(store, "2025-12") is None
+    assert archive.months() == ["2025-09", "2025-10"]
+
+    month = archive.load_month("2025-10")
+    assert month["dicts"]["task_type"] == ["月报", "重大项目月报"]
+    assert month["columns"]["assignees"] == [[0], [0, 1], [1]]
+    assert month["columns"]["completed"] == [0, 1, 0]
+
+
+def test_stats_archive__range_queries(tmp_path):
+    store = TaskStatsStore(str(tmp_path / "task_stats.db"))
+    archive = StatsArchive(str(tmp_path / "archives"))
+    _fill_month(store, "2025-09", ["guid_1", "guid_2", "guid_3"])
+    archive.archive_and_reset(store, "2025-10")
+    _fill_month(store, "2025-10", ["guid_2"])
+    archive.archive_and_reset(store, "2025-11")
+
+    assert [(r["month"], r["completion_rate"]) for r in archive.completion_by_month()] == [
+        ("2025-09", 100.0), ("2025-10", 33.33),
+    ]
+    assert [r["month"] for r in archive.completion_by_month(start="2025-10")] == ["2025-10"]
+
+    by_type = archive.completion_by_type("2025-10", "2025-10")
+    assert by_type["2025-10"]["重大项目月报"] == {"total": 2, "completed": 1, "completion_rate": 50.0}
+
+    by_assignee = archive.completion_by_assignee()
+    assert by_assignee["ou_b"] == {"total": 4, "completed": 3, "months": 2, "completion_rate": 75.0}
+
+
+def test_stats_archive__daily_progress_uses_completion_dates(tmp_path):
+    store = TaskStatsStore(str(tmp_path / "task_stats.db"))
+    archive = StatsArchive(str(tmp_path / "archives"))
+    _fill_month(store, "2025-09", ["guid_1", "guid_3"])
+
+    progress = daily_progress_from_stats(store.load())
+    assert progress[20] == (21, 33.33)
+    assert progress[-1] == (23, 66.67)
+
+    archive.archive_and_reset(store, "2025-10")
+    assert archive.daily_progress("2025-09") == progress
+
+
+def test_stats_archive__trend_chart_overlays_archived_months(tmp_path, monkeypatch):
+    spec = importlib.util.spec_from_file_location("monthly_report_bot_ws", BOT_FILE)
+    bot = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(bot)
+
+    store = TaskStatsStore(str(tmp_path / "task_stats.db"))
+    archive = StatsArchive(str(tmp_path / "archives"))
+    _fill_month(store, "2025-08", ["guid_1"])
+    archive.archive_and_reset(store, "2025-09")
+    _fill_month(store, "2025-10", ["guid_2"])
+    current = store.load()
+
+    rendered = []
+
+    async def fake_render(method, *args):
+        rendered.append((method, args))
+        return bot.ChartImage("progress_trend.png", b"png")
+
+    monkeypatch.setattr(bot, "chart_rendering_available", lambda: True)
+    monkeypatch.setattr(bot, "get_task_completion_stats", lambda: current)
+    monkeypatch.setattr(bot, "get_stats_archive", lambda: archive)
+    monkeypatch.setattr(bot, "_render_chart", fake_render)
+
+    chart = asyncio.run(bot.render_progress_trend_chart())
+    assert chart.filename == "progress_trend.png"
+    method, (stats, history, _profile) = rendered[0]
+    assert method == "render_progress_trend_chart"
+    assert stats is current
+    # 2025-09 未归档（空月份）不出现在对比曲线中
+    assert history == {"2025-08": archive.daily_progress("2025-08")}
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程内统计缓存测试：
+1) 版本不变时不重复加载，派生结果只计算一次
+2) 本进程写入与外部连接提交都会使缓存失效
+"""
+
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stats_cache import VersionedCache, file_version
+from task_stats_store import TaskStatsStore
+
+
+def test_stats_cache__reuses_data_until_version_changes():
+    state = {"version": 1, "loads": 0, "derives": 0}
+
+    def loader():
+        state["loads"] += 1
+        return {"value": state["version"]}
+
+    def derive(data):
+        state["derives"] += 1
+        return data["value"] * 10
+
+    cache = VersionedCache(loader, lambda: state["version"])
+    assert cache.derive("x10", derive) == 10
+    assert cache.derive("x10", derive) == 10
+    assert cache.get() == {"value": 1}
+    assert state["loads"] == 1 and state["derives"] == 1
+
+    state["version"] = 2
+    assert cache.derive("x10", derive) == 20
+    assert state["loads"] == 2 and state["derives"] == 2
+
+
+def test_stats_cache__invalidated_by_store_writes(tmp_path):
+    db_path = str(tmp_path / "task_stats.db")
+    store = TaskStatsStore(db_path)
+    store.reset_month("2025-10")
+    store.upsert_task("guid_1", "任务一", ["ou_a"])
+
+    cache = VersionedCache(store.load, store.version)
+    assert cache.get()["completed_tasks"] == 0
+
+    # 本进程写入
+    store.set_completed("guid_1", True)
+    assert cache.get()["completed_tasks"] == 1
+
+    # 外部脚本（另一连接）写入
+    external = TaskStatsStore(db_path)
+    external.set_completed("guid_1", False)
+    assert cache.get()["completed_tasks"] == 0
+    assert cache.misses == 3
+
+
+def test_stats_cache__file_version_tracks_mtime(tmp_path):
+    path = tmp_path / "created_tasks.json"
+    assert file_version(str(path)) is None
+    path.write_text("{}", encoding="utf-8")
+    v1 = file_version(str(path))
+    os.utime(path, ns=(v1[0] + 1_000_000_000, v1[0] + 1_000_000_000))
+    assert file_version(str(path)) != v1
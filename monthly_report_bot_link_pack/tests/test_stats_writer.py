@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+防抖统计写入器测试：
+1) 窗口内的多次变更合并为一次事务落盘
+2) flush() 立即写入；未启动时同步写入
+"""
+
+import os
+import sys
+import asyncio
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stats_writer import DebouncedStatsWriter
+from task_stats_store import TaskStatsStore
+
+
+def test_stats_writer__coalesces_burst_into_one_commit(tmp_path):
+    store = TaskStatsStore(str(tmp_path / "task_stats.db"))
+    store.reset_month("2025-10")
+
+    async def scenario():
+        writer = DebouncedStatsWriter(store, window=0.05)
+        writer.start()
+        version_before = store.version()[0]
+        for i in range(5):
+            writer.upsert_task(f"guid_{i}", f"任务{i}", ["ou_a"])
+        writer.set_completed("guid_1", True, source="user")
+        writer.set_completed("guid_1", False, source="user")
+        writer.set_completed("guid_1", True, source="user")
+        assert writer.queued_completion("guid_1") is True
+        assert store.counts()["total_tasks"] == 0  # 尚未落盘
+
+        await asyncio.sleep(0.2)
+        assert store.version()[0] == version_before + 1
+        assert writer.pending_count() == 0
+
+        writer.set_completed("guid_2", True)
+        await writer.stop()
+        return writer
+
+    writer = asyncio.run(scenario())
+    assert store.counts() == {"total_tasks": 5, "completed_tasks": 2, "completion_rate": 40.0}
+    assert [ev["event"] for ev in store.events(task_id="guid_1")] == ["create", "complete"]
+    assert writer.flushes == 2 and writer.coalesced == 3
+
+
+def test_stats_writer__flush_and_write_through(tmp_path):
+    store = TaskStatsStore(str(tmp_path / "task_stats.db"))
+    store.reset_month("2025-10")
+
+    # 未启动：直接同步写入
+    writer = DebouncedStatsWriter(store, window=60)
+    writer.upsert_task("guid_1", "任务一", ["ou_a"])
+    assert store.get_task("guid_1") is not None
+
+    async def scenario():
+        writer.start()
+        writer.set_completed("guid_1", True)
+        await writer.flush()
+        assert store.get_task("guid_1")["completed"] is True
+        await writer.stop()
+
+    asyncio.run(scenario())
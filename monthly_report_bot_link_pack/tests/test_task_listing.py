@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分页拉取任务测试：
+1) page_token 游标翻页直到 has_more 为 False
+2) updated_at 水位线过滤与本地差异比对
+3) 任务清单翻页与按名称复用/幂等创建
+"""
+
+import os
+import sys
+import asyncio
+import types
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from task_listing import (
+    diff_completions, ensure_tasklist, is_task_completed, list_tasklist_tasks_paginated,
+    list_tasks_paginated, tasklist_client_token,
+)
+
+
+def _task(guid, completed_at=0, updated_at=0, status=None):
+    return types.SimpleNamespace(guid=guid, completed_at=completed_at, updated_at=updated_at, status=status)
+
+
+class _FakeTaskAPI:
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    async def alist(self, request):
+        self.requests.append(request)
+        index = int(request.page_token or 0)
+        items, has_more = self.pages[index]
+        data = types.SimpleNamespace(items=items, has_more=has_more, page_token=str(index + 1) if has_more else "")
+        return types.SimpleNamespace(success=lambda: True, data=data, code=0, msg="")
+
+
+def _client(api):
+    return types.SimpleNamespace(task=types.SimpleNamespace(v2=types.SimpleNamespace(task=api)))
+
+
+def test_task_listing__follows_page_token():
+    api = _FakeTaskAPI([
+        ([_task("g1", 1, 100), _task("g2", 1, 200)], True),
+        ([_task("g3", 1, 300)], True),
+        ([_task("g4", 1, 400)], False),
+    ])
+    tasks = asyncio.run(list_tasks_paginated(_client(api), completed=True))
+    assert [t.guid for t in tasks] == ["g1", "g2", "g3", "g4"]
+    assert [r.page_token for r in api.requests] == [None, "1", "2"]
+    assert all(r.completed is True for r in api.requests)
+
+    api.requests.clear()
+    tasks = asyncio.run(list_tasks_paginated(_client(api), updated_after_ms=200))
+    assert [t.guid for t in tasks] == ["g3", "g4"]
+    assert len(api.requests) == 3
+
+
+def test_task_listing__diff_only_upgrades_pending_tasks():
+    local = {
+        "g1": {"title": "任务一", "completed": False},
+        "g2": {"title": "任务二", "completed": True},
+        "g3": {"title": "任务三", "completed": False},
+    }
+    remote = [
+        _task("g1", completed_at=1760900000000),
+        _task("g2", completed_at=1760900000000),
+        _task("g3", status="todo"),
+        _task("other", status="done"),
+    ]
+    assert is_task_completed(_task("x", status="done"))
+    changes = diff_completions(local, remote)
+    assert list(changes) == ["g1"]
+    assert changes["g1"].startswith("2025-10-")
+
+
+class _FakeTasklistAPI(_FakeTaskAPI):
+    def __init__(self, pages, tasklists):
+        super().__init__(pages)
+        self.tasklists = tasklists
+        self.created = []
+
+    async def atasks(self, request):
+        assert request.tasklist_guid == "tl_1"
+        return await self.alist(request)
+
+    async def alist(self, request):
+        if type(request).__name__ == "ListTasklistRequest":
+            data = types.SimpleNamespace(items=self.tasklists, has_more=False, page_token="")
+            return types.SimpleNamespace(success=lambda: True, data=data, code=0, msg="")
+        return await super().alist(request)
+
+    async def acreate(self, request):
+        self.created.append(request.request_body)
+        data = types.SimpleNamespace(tasklist=types.SimpleNamespace(guid="tl_new"))
+        return types.SimpleNamespace(success=lambda: True, data=data, code=0, msg="")
+
+
+def test_task_listing__tasklist_pages_and_reuse():
+    api = _FakeTasklistAPI(
+        [([_task("g1", 1)], True), ([_task("g2", 0)], False)],
+        [types.SimpleNamespace(guid="tl_old", name="2025-09 月报任务", archive_msec=0)],
+    )
+    client = types.SimpleNamespace(task=types.SimpleNamespace(v2=types.SimpleNamespace(tasklist=api)))
+
+    tasks = asyncio.run(list_tasklist_tasks_paginated(client, "tl_1"))
+    assert [t.guid for t in tasks] == ["g1", "g2"]
+
+    assert asyncio.run(ensure_tasklist(client, "2025-09 月报任务")) == "tl_old"
+    token = tasklist_client_token("2025-10", "oc_group")
+    assert token == tasklist_client_token("2025-10", "oc_group") != tasklist_client_token("2025-10", "oc_other")
+    assert asyncio.run(ensure_tasklist(client, "2025-10 月报任务", client_token=token)) == "tl_new"
+    assert api.created[0].name == "2025-10 月报任务" and api.created[0].client_token == token
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务统计存储测试：
+1) 旧版 task_stats.json 自动迁移
+2) 行级完成状态更新与统计计算
+3) 多连接（机器人 + 维护脚本）共享同一数据库
+4) 事件日志重放、快照压缩与启动恢复
+5) 负责人/任务类型索引与计数器
+6) 完成状态同步的轮询记录
+7) 任务创建进度（断点续建）
+8) 写事务提交期间读取不被阻塞（独立读连接，只看到已提交数据）
+"""
+
+import os
+import sys
+import json
+import threading
+
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from task_listing import task_client_token
+from task_stats_store import TaskStatsStore
+
+
+def _legacy_stats():
+    return {
+        "current_month": "2025-10",
+        "tasks": {
+            "guid_1": {
+                "title": "月报-设计工作进展",
+                "assignees": ["ou_a"],
+                "task_type": "月报",
+                "created_at": "2025-10-17T09:30:00-03:00",
+                "completed": True,
+                "completed_at": "2025-10-18T10:00:00-03:00",
+                "doc_url": "https://example.com/doc",
+            },
+            "guid_2": {
+                "title": "重大项目-进度",
+                "assignees": ["ou_a", "ou_b"],
+                "task_type": "重大项目月报",
+                "created_at": "2025-10-17T09:30:00-03:00",
+                "completed": False,
+                "completed_at": None,
+            },
+        },
+        "total_tasks": 2,
+        "completed_tasks": 1,
+        "completion_rate": 50.0,
+        "last_update": "2025-10-18T10:00:00-03:00",
+    }
+
+
+def test_task_stats_store__migrates_legacy_json(tmp_path):
+    json_path = tmp_path / "task_stats.json"
+    json_path.write_text(json.dumps(_legacy_stats(), ensure_ascii=False), encoding="utf-8")
+
+    store = TaskStatsStore(str(tmp_path / "task_stats.db"), json_path=str(json_path))
+    stats = store.load()
+
+    assert stats["current_month"] == "2025-10"
+    assert list(stats["tasks"]) == ["guid_1", "guid_2"]
+    assert stats["tasks"]["guid_1"]["doc_url"] == "https://example.com/doc"
+    assert stats["tasks"]["guid_2"]["assignees"] == ["ou_a", "ou_b"]
+    assert stats["total_tasks"] == 2
+    assert stats["completed_tasks"] == 1
+    assert stats["completion_rate"] == 50.0
+
+
+def test_task_stats_store__row_level_completion(tmp_path):
+    store = TaskStatsStore(str(tmp_path / "task_stats.db"))
+    store.reset_month("2025-10")
+    assert store.upsert_task("guid_1", "任务一", ["ou_a"]) is True
+    assert store.upsert_task("guid_1", "任务一（重复）", ["ou_b"]) is False
+    store.upsert_task("guid_2", "任务二", ["ou_b"], task_type="重大项目月报")
+
+    assert store.set_completed("guid_1", True) is True
+    assert store.set_completed("guid_1", True) is False  # 已完成，不重复计数
+
+    task = store.get_task("guid_1")
+    assert task["completed"] is True and task["completed_at"]
+    assert task["title"] == "任务一"
+    assert store.counts() == {"total_tasks": 2, "completed_tasks": 1, "completion_rate": 50.0}
+
+    assert store.set_completed("guid_1", False) is True
+    assert store.get_task("guid_1")["completed_at"] is None
+
+
+def test_task_stats_store__shared_between_connections(tmp_path):
+    db_path = str(tmp_path / "task_stats.db")
+    bot_store = TaskStatsStore(db_path)
+    bot_store.save(_legacy_stats())
+
+    script_store = TaskStatsStore(db_path)
+    script_store.set_completed("guid_2", True)
+
+    assert bot_store.load()["completed_tasks"] == 2
+
+    bot_store.reset_month("2025-11")
+    assert script_store.current_month() == "2025-11"
+    assert script_store.load()["tasks"] == {}
+
+
+def test_task_stats_store__journal_replay_and_compaction(tmp_path):
+    json_path = tmp_path / "task_stats.json"
+    store = TaskStatsStore(str(tmp_path / "task_stats.db"), json_path=str(json_path))
+    store.reset_month("2025-10")
+    store.upsert_task("guid_1", "任务一", ["ou_a"])
+    store.upsert_task("guid_2", "任务二", ["ou_b"])
+    store.set_completed("guid_1", True, source="user")
+
+    events = [ev["event"] for ev in store.events(month="2025-10")]
+    assert events == ["reset", "create", "create", "complete"]
+    assert store.events(task_id="guid_1")[-1]["payload"]["source"] == "user"
+
+    # 快照后继续写入，重放 = 快照 + 增量事件
+    store.compact()
+    assert json.loads(json_path.read_text(encoding="utf-8"))["completed_tasks"] == 1
+    store.set_completed("guid_2", True, source="sync")
+    assert store.events_since_snapshot() == 1
+    replayed = store.replay()
+    assert replayed["current_month"] == "2025-10"
+    assert replayed["tasks"]["guid_2"]["completed"] is True
+
+    # 当月事件保留用于审计
+    assert len(store.events(month="2025-10")) == 5
+
+
+def test_task_stats_store__recovers_from_journal(tmp_path):
+    store = TaskStatsStore(str(tmp_path / "task_stats.db"))
+    store.reset_month("2025-10")
+    store.upsert_task("guid_1", "任务一", ["ou_a"])
+    store.set_completed("guid_1", True)
+
+    # 模拟任务表被外部写坏（绕过事件日志）
+    store._conn.execute("DELETE FROM tasks")
+    assert store.check_and_recover() is True
+    assert store.get_task("guid_1")["completed"] is True
+
+
+def test_task_stats_store__assignee_and_type_indexes(tmp_path):
+    store = TaskStatsStore(str(tmp_path / "task_stats.db"))
+    store.reset_month("2025-10")
+    store.upsert_task("guid_1", "任务一", ["ou_a"])
+    store.upsert_task("guid_2", "任务二", ["ou_a", "ou_b"], task_type="重大项目月报")
+    store.upsert_task("guid_3", "任务三", ["ou_b"], task_type="重大项目月报")
+    store.set_completed("guid_2", True)
+
+    assert list(store.tasks_for_assignee("ou_a")) == ["guid_1", "guid_2"]
+    assert list(store.tasks_for_assignee("ou_a", pending_only=True)) == ["guid_1"]
+    assert list(store.tasks_by_type("重大项目月报", pending_only=True)) == ["guid_3"]
+    assert store.type_counts() == {
+        "月报": {"total": 1, "completed": 0},
+        "重大项目月报": {"total": 2, "completed": 1},
+    }
+    assert store.assignee_counts() == {
+        "ou_a": {"total": 2, "completed": 1},
+        "ou_b": {"total": 2, "completed": 1},
+    }
+    assert sorted(store.pending_assignees()) == ["ou_a", "ou_b"]
+    assert store.pending_assignees("月报") == ["ou_a"]
+
+    # 批量替换与月份重置后计数器与全量重算一致
+    store.save(store.load())
+    assert store.assignee_counts()["ou_b"] == {"total": 2, "completed": 1}
+    store.set_completed("guid_2", False)
+    assert store.type_counts()["重大项目月报"]["completed"] == 0
+    store.reset_month("2025-11")
+    assert store.type_counts() == {} and store.assignee_counts() == {}
+
+
+def test_task_stats_store__poll_bookkeeping_skips_completed(tmp_path):
+    store = TaskStatsStore(str(tmp_path / "task_stats.db"))
+    store.reset_month("2025-10")
+    store.upsert_task("guid_1", "任务一", ["ou_a"])
+    store.upsert_task("guid_2", "任务二", ["ou_b"])
+    store.upsert_task("guid_3", "任务三", ["ou_b"])
+    store.set_completed("guid_3", True)
+
+    # 从未查询过的未完成任务全部到期，已完成任务不再查询
+    assert list(store.due_for_check(1000.0)) == ["guid_1", "guid_2"]
+
+    store.mark_checked(["guid_1", "guid_2"], checked_at=1000.0, interval=3600)
+    assert store.poll_state("guid_1") == {"last_checked": 1000.0, "next_check": 4600.0}
+    assert store.due_for_check(2000.0) == {}
+    assert list(store.due_for_check(4600.0)) == ["guid_1", "guid_2"]
+    # 播报前：上次查询超过 max_age 即视为到期
+    assert list(store.due_for_check(2000.0, max_age=900)) == ["guid_1", "guid_2"]
+
+    store.set_completed("guid_2", True)
+    assert list(store.due_for_check(4600.0)) == ["guid_1"]
+
+    store.reset_month("2025-11")
+    assert store.poll_state("guid_1") is None
+
+
+def test_task_stats_store__creation_progress_resumes(tmp_path):
+    db_path = str(tmp_path / "task_stats.db")
+    store = TaskStatsStore(db_path)
+    token_a = task_client_token("2025-10", "月报-A")
+    assert token_a == task_client_token("2025-10", "月报-A") != task_client_token("2025-11", "月报-A")
+
+    store.record_creation("2025-10", "月报-A", token_a, task_guid="guid_a")
+    store.record_creation("2025-10", "月报-B", task_client_token("2025-10", "月报-B"), error="code=500")
+    store.record_creation("2025-10", "月报-A", token_a, error="late failure")  # 不覆盖已成功的结果
+    store.close()
+
+    store = TaskStatsStore(db_path)
+    progress = store.creation_progress("2025-10")
+    assert progress["月报-A"]["task_guid"] == "guid_a" and progress["月报-A"]["attempts"] == 2
+    assert store.pending_creations("2025-10") == ["月报-B"]
+    store.record_creation("2025-10", "月报-B", task_client_token("2025-10", "月报-B"), error="code=1470400")
+    assert store.pending_creations("2025-10", max_attempts=3) == ["月报-B"]
+    assert store.pending_creations("2025-10", max_attempts=2) == []  # 已尝试满上限，不再补建
+    store.record_creation("2025-10", "月报-B", task_client_token("2025-10", "月报-B"), task_guid="guid_b")
+    assert store.pending_creations("2025-10") == [] and store.creation_progress("2025-11") == {}
+
+
+def test_task_stats_store__created_task_commits_with_progress(tmp_path, monkeypatch):
+    store = TaskStatsStore(str(tmp_path / "task_stats.db"))
+    store.reset_month("2025-10")
+    token = task_client_token("2025-10", "月报-A")
+    store.record_created_task("2025-10", "月报-A", token, "guid_a", ["ou_a"], task_type="重大项目月报")
+    assert store.get_task("guid_a")["task_type"] == "重大项目月报"
+    assert store.creation_progress("2025-10")["月报-A"]["task_guid"] == "guid_a"
+
+    # 创建进度写入失败时统计行一同回滚，两者不会只落盘一个
+    def failing_record(*args, **kwargs):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(store, "record_creation", failing_record)
+    with pytest.raises(RuntimeError):
+        store.record_created_task("2025-10", "月报-B", token, "guid_b", ["ou_b"])
+    assert store.get_task("guid_b") is None
+    assert "月报-B" not in store.creation_progress("2025-10")
+
+
+def test_task_stats_store__reads_do_not_wait_for_commit(tmp_path):
+    store = TaskStatsStore(str(tmp_path / "task_stats.db"))
+    store.reset_month("2025-10")
+    store.upsert_task("guid_1", "任务一", ["ou_a"])
+    in_batch, release = threading.Event(), threading.Event()
+
+    def slow_writer():
+        # 模拟写入器在线程池中的批量提交：持有写锁期间迟迟不提交
+        with store.batch():
+            store.set_completed("guid_1", True)
+            in_batch.set()
+            release.wait(5)
+
+    writer = threading.Thread(target=slow_writer)
+    writer.start()
+    assert in_batch.wait(5)
+    results = []
+    reader = threading.Thread(target=lambda: results.append(
+        (store.version(), store.get_task("guid_1")["completed"], store.counts()["completed_tasks"])))
+    reader.start()
+    reader.join(2)
+    finished = not reader.is_alive()
+    release.set()
+    writer.join(5)
+    reader.join(5)
+
+    assert finished  # 读取没有等待写事务
+    version_during, completed_during, done_during = results[0]
+    assert completed_during is False and done_during == 0  # 只看到已提交的数据
+    assert store.get_task("guid_1")["completed"] is True
+    assert store.version() != version_during
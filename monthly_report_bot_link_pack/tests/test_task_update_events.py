@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务变更事件测试（本地假事件源代替 WS 推送）：
+1) 完成/取消完成事件经写入器直接落盘，非本月任务忽略
+2) 其他变更类型按单个任务查询确认，SDK 事件对象结构同样可解析
+3) 只有收到过任务事件才降为低频对账，长时间没有事件时恢复按截止日程轮询
+"""
+
+import os
+import sys
+import asyncio
+import importlib.util
+import types
+from datetime import datetime
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stats_writer import DebouncedStatsWriter
+from task_stats_store import TaskStatsStore
+from task_update_events import (
+    CHANGE_COMPLETED, LocalTaskEventSource, TASK_OBJ_COMPLETED, TASK_OBJ_DELETED, TASK_OBJ_DETAIL,
+    TASK_OBJ_UNCOMPLETED, TaskUpdateHandler, parse_task_update,
+)
+
+BOT_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "monthly_report_bot_ws_v1.1.py")
+
+
+def _store(tmp_path):
+    store = TaskStatsStore(str(tmp_path / "task_stats.db"))
+    store.reset_month("2025-10")
+    store.upsert_task("guid_1", "任务一", ["ou_a"])
+    store.upsert_task("guid_2", "任务二", ["ou_b"])
+    return store
+
+
+def test_task_update_events__fake_source_applies_completion(tmp_path):
+    store = _store(tmp_path)
+
+    async def scenario():
+        writer = DebouncedStatsWriter(store, window=0.05)
+        writer.start()
+        handler = TaskUpdateHandler(store, writer)
+        source = LocalTaskEventSource()
+        source.emit("guid_1", TASK_OBJ_COMPLETED)
+        source.emit("guid_1", TASK_OBJ_COMPLETED)   # 重复推送
+        source.emit("guid_2", TASK_OBJ_COMPLETED)
+        source.emit("guid_2", TASK_OBJ_UNCOMPLETED)  # 随后取消完成
+        source.emit("guid_x", TASK_OBJ_COMPLETED)   # 非本月统计任务
+        source.emit("guid_1", TASK_OBJ_DELETED)
+        assert await source.drain(handler) == 6
+        await writer.stop()
+        return handler
+
+    handler = asyncio.run(scenario())
+    assert store.get_task("guid_1")["completed"] is True
+    assert store.get_task("guid_2")["completed"] is False
+    assert handler.stats == {"received": 6, "applied": 3, "ignored": 3}
+    # guid_2 的完成与取消完成在同一写入窗口内合并，不产生状态变化事件
+    assert [ev["event"] for ev in store.events(task_id="guid_1")][-1] == "complete"
+    assert [ev["event"] for ev in store.events(task_id="guid_2")][-1] == "create"
+
+
+def test_task_update_events__other_changes_are_verified(tmp_path):
+    store = _store(tmp_path)
+    queried = []
+
+    async def verify(task_id):
+        queried.append(task_id)
+        return True
+
+    sdk_event = types.SimpleNamespace(event=types.SimpleNamespace(task_id="guid_2", obj_type=TASK_OBJ_DETAIL))
+    assert parse_task_update(sdk_event) == ("guid_2", "other")
+    assert parse_task_update(types.SimpleNamespace(event=None)) is None
+
+    handler = TaskUpdateHandler(store, store, verify=verify)
+    assert asyncio.run(handler.handle(sdk_event)) == CHANGE_COMPLETED
+    assert queried == ["guid_2"]
+    assert store.get_task("guid_2")["completed"] is True
+
+
+def test_task_update_events__poll_backs_off_only_after_events(monkeypatch):
+    spec = importlib.util.spec_from_file_location("monthly_report_bot_ws", BOT_FILE)
+    bot = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(bot)
+    near_deadline = bot.TZ.localize(datetime(2025, 10, 22, 10, 0))
+    normal = bot.task_poll_interval(near_deadline)
+    assert normal < bot.TASK_RECONCILE_INTERVAL
+
+    # 处理器已注册但尚未收到事件（未连上、卡在重连或未订阅）：保持正常轮询
+    monkeypatch.setattr(bot, "_task_events_registered", True)
+    assert bot.task_events_active(now=1000.0) is False
+    assert bot.task_poll_interval(near_deadline) == normal
+
+    bot.record_task_event_received(now=1000.0)
+    assert bot.task_events_active(now=1000.0 + bot.TASK_EVENTS_STALE_AFTER - 1) is True
+    assert bot.task_events_active(now=1000.0 + bot.TASK_EVENTS_STALE_AFTER) is False
+
+    monkeypatch.setattr(bot.time, "monotonic", lambda: 1001.0)
+    assert bot.task_poll_interval(near_deadline) == bot.TASK_RECONCILE_INTERVAL
+    monkeypatch.setattr(bot, "_task_events_registered", False)  # 长连接退出
+    assert bot.task_poll_interval(near_deadline) == normal
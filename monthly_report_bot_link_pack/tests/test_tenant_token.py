@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+租户令牌提供者测试：
+1) 有效期内命中缓存；并发调用方共享一次刷新（单飞）
+2) 临近过期时后台提前刷新，当前调用返回旧令牌
+3) 本地文件持久化，新进程（新实例）直接复用
+4) 发送消息遇到令牌失效错误码时作废缓存（含文件）并用新令牌重试一次
+"""
+
+import os
+import sys
+import threading
+import time
+import types
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import feishu_http
+import tenant_token
+from tenant_token import REFRESH_AHEAD, TenantTokenProvider, token_rejected
+
+
+class _FakeAuth:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, app_id, app_secret):
+        time.sleep(self.delay)
+        with self._lock:
+            self.calls += 1
+            return f"t-{self.calls}", 7200
+
+
+def test_tenant_token__cache_and_single_flight():
+    auth = _FakeAuth(delay=0.05)
+    provider = TenantTokenProvider("cli_a", "secret", fetch=auth)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(provider.get_token())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["t-1"] * 8 and auth.calls == 1
+
+    assert provider.get_token() == "t-1" and auth.calls == 1
+    assert provider.get_token(force_refresh=True) == "t-2"
+    provider.invalidate()
+    assert provider.get_token() == "t-3"
+
+
+def test_tenant_token__proactive_background_refresh():
+    now = [1000.0]
+    auth = _FakeAuth()
+    provider = TenantTokenProvider("cli_a", "secret", fetch=auth, clock=lambda: now[0])
+    assert provider.get_token() == "t-1"
+
+    now[0] += 7200 - REFRESH_AHEAD + 60  # 进入提前刷新窗口，旧令牌仍然有效
+    assert provider.get_token() == "t-1"
+    for _ in range(100):
+        if provider.token == "t-2":
+            break
+        time.sleep(0.01)
+    assert provider.get_token() == "t-2" and auth.calls == 2
+
+
+def test_tenant_token__file_persistence(tmp_path):
+    cache_file = str(tmp_path / "token_cache.json")
+    auth = _FakeAuth()
+    assert TenantTokenProvider("cli_a", "secret", cache_file=cache_file, fetch=auth).get_token() == "t-1"
+
+    # 新实例（如下一个 Actions 步骤）直接复用文件中的令牌
+    reused = TenantTokenProvider("cli_a", "secret", cache_file=cache_file, fetch=auth)
+    assert reused.get_token() == "t-1" and auth.calls == 1
+    other_app = TenantTokenProvider("cli_b", "secret", cache_file=cache_file, fetch=auth)
+    assert other_app.get_token() == "t-2"
+    assert oct(os.stat(cache_file).st_mode & 0o777) == "0o600"
+
+
+def test_tenant_token__rejected_token_is_invalidated_and_retried(tmp_path, monkeypatch):
+    from github_actions_bot import FeishuBot
+
+    cache_file = str(tmp_path / "token_cache.json")
+    auth = _FakeAuth()
+    provider = TenantTokenProvider("cli_t", "secret", cache_file=cache_file, fetch=auth)
+    monkeypatch.setitem(tenant_token._providers, "cli_t", provider)
+
+    def response(status, body):
+        return types.SimpleNamespace(status_code=status, text=str(body), json=lambda: body)
+
+    sent = []
+
+    def post(url, json=None, headers=None, **kwargs):
+        sent.append(headers["Authorization"])
+        if headers["Authorization"] == "Bearer t-1":
+            return response(400, {"code": 99991663, "msg": "Invalid access token"})
+        return response(200, {"code": 0, "msg_id": "om_1"})
+    monkeypatch.setattr(feishu_http, "post", post)
+
+    bot = FeishuBot({"FEISHU_APP_ID": "cli_t", "FEISHU_APP_SECRET": "secret",
+                     "FEISHU_VERIFICATION_TOKEN": "v", "CHAT_ID": "oc_1"})
+    assert bot.send_text("hello")
+    assert sent == ["Bearer t-1", "Bearer t-2"] and auth.calls == 2
+    # 文件中保存的是新令牌：其他进程不会再读到被吊销的令牌
+    assert TenantTokenProvider("cli_t", "secret", cache_file=cache_file, fetch=auth).get_token() == "t-2"
+
+    assert not token_rejected(response(200, {"code": 0}))
+    assert not token_rejected(types.SimpleNamespace(json=lambda: (_ for _ in ()).throw(ValueError())))
@@ -21,7 +21,8 @@ import hashlib
 import time
 from typing import Dict, Set, Optional, Any, Callable
 from datetime import datetime
-import requests
+
+from tenant_token import get_tenant_token_provider
 
 logger = logging.getLogger(__name__)
 
@@ -268,26 +269,9 @@ class FeishuWebSocketHandler:
             await asyncio.sleep(3600)  # 每小时检查一次
 
     async def _get_tenant_token(self) -> Optional[str]:
-        """获取租户访问令牌"""
+        """获取租户访问令牌（进程内共享缓存，临近过期时后台刷新）"""
         try:
-            url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
-            payload = {
-                "app_id": self.app_id,
-                "app_secret": self.app_secret
-            }
-            
-            response = requests.post(url, json=payload, timeout=30)
-            response.raise_for_status()
-            
-            data = response.json()
-            if data.get("code", 0) == 0:
-                token = data.get("tenant_access_token", "")
-                logger.info("获取租户令牌成功")
-                return token
-            else:
-                logger.error("获取租户令牌失败: %s", data.get("msg", "未知错误"))
-                return None
-                
+            return await get_tenant_token_provider(self.app_id, self.app_secret).aget_token()
         except Exception as e:
             logger.error("获取租户令牌异常: %s", e)
             return None